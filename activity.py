@@ -1,7 +1,5 @@
 """Centralized activity logging for analytics."""
-from datetime import datetime
-from app import db
-from models import UserActivity
+from utils.log_buffer import activity_buffer
 
 
 def log_activity(user_id: int, activity_type: str, entity_type: str = None, entity_id: int = None):
@@ -12,19 +10,18 @@ def log_activity(user_id: int, activity_type: str, entity_type: str = None, enti
         activity_type: Type of activity (view, post, comment, endorse, deal_create, ai_run, invite_accept, etc.)
         entity_type: Optional type of entity (deal, post, comment, digest, invite)
         entity_id: Optional ID of the related entity
+
+    Rows are queued and bulk-inserted by the activity writer, so this
+    never commits (or rolls back) the caller's session.
     """
     try:
-        activity = UserActivity(
+        activity_buffer.add(
             user_id=user_id,
             activity_type=activity_type,
             entity_type=entity_type,
             entity_id=entity_id,
-            created_at=datetime.utcnow()
         )
-        db.session.add(activity)
-        db.session.commit()
     except Exception as e:
-        db.session.rollback()
         print(f"Error logging activity: {e}")
 
 
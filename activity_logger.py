@@ -8,8 +8,7 @@ from __future__ import annotations
 import logging
 from typing import Optional
 
-from app import db
-from models import UserActivity
+from utils.log_buffer import activity_buffer
 
 
 def log_activity(
@@ -18,19 +17,14 @@ def log_activity(
     entity_type: Optional[str] = None,
     entity_id: Optional[int] = None,
 ) -> None:
-    """Log a user activity. Non-blocking; failures are logged but never raise."""
+    """Log a user activity. Non-blocking (queued for the batched writer);
+    failures are logged but never raise."""
     try:
-        activity = UserActivity(
+        activity_buffer.add(
             user_id=user_id,
             activity_type=activity_type,
             entity_type=entity_type,
             entity_id=entity_id,
         )
-        db.session.add(activity)
-        db.session.commit()
     except Exception as e:
         logging.error(f"Failed to log activity: {e}")
-        try:
-            db.session.rollback()
-        except Exception:
-            pass
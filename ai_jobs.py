@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import os
 import json
+import time
+import socket
 import hashlib
-from datetime import datetime
-from typing import Optional
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
 
 from app import app, db
 from models import AiJob, DealAnalysis, DealDetails, Post, Notification
@@ -13,6 +17,12 @@ from ai_service import summarize_text, analyze_deal
 AI_RATE_LIMIT_WINDOW_SECONDS = 60 * 60  # 1 hour
 AI_RATE_LIMIT_MAX_JOBS_PER_WINDOW = 12
 
+AI_JOB_VISIBILITY_TIMEOUT_SECONDS = 300  # lease length; workers renew it while a job runs
+AI_JOB_MAX_ATTEMPTS = 3
+AI_JOB_WAKEUP_KEY = "ai_jobs:wakeup"
+
+logger = logging.getLogger(__name__)
+
 
 def _fingerprint(
     *, job_type: str, created_by_id: int, post_id: Optional[int], deal_id: Optional[int], input_text: Optional[str]
@@ -105,9 +115,46 @@ def enqueue_ai_job(
     )
     db.session.add(job)
     db.session.commit()
+    signal_workers()
     return job
 
 
+def signal_workers(count: int = 1) -> None:
+    """Wake idle workers (one token per job) instead of making them poll."""
+    from utils.cache_service import get_redis_client
+
+    client = get_redis_client()
+    if not client or count <= 0:
+        return
+    try:
+        pipe = client.pipeline()
+        pipe.lpush(AI_JOB_WAKEUP_KEY, *(["1"] * min(count, 100)))
+        pipe.ltrim(AI_JOB_WAKEUP_KEY, 0, 999)
+        pipe.expire(AI_JOB_WAKEUP_KEY, AI_JOB_VISIBILITY_TIMEOUT_SECONDS)
+        pipe.execute()
+    except Exception as e:
+        logger.debug(f"AI job wakeup signal failed: {e}")
+
+
+def wait_for_jobs(timeout: float) -> bool:
+    """Block until a wakeup signal arrives or timeout passes. True if signalled."""
+    from utils.cache_service import get_redis_client
+
+    client = get_redis_client()
+    if client:
+        try:
+            # Stay under the client's 5s socket timeout
+            return client.blpop(AI_JOB_WAKEUP_KEY, timeout=max(1, min(int(timeout), 4))) is not None
+        except Exception as e:
+            logger.debug(f"AI job wakeup wait failed: {e}")
+    time.sleep(timeout)
+    return False
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
 def _notify_ai_complete(job: AiJob) -> None:
     """Create notification events when AI job completes."""
     try:
@@ -181,78 +228,225 @@ def _job_input_text(job: AiJob) -> str:
     return ""
 
 
-def process_job(job_id: int) -> AiJob:
-    """Execute a job synchronously (used by worker)."""
+def process_job(job_id: int, worker_id: Optional[str] = None) -> AiJob:
+    """Execute a job (used by the worker and the admin run endpoint).
+
+    worker_id is the lease owner for jobs claimed with claim_jobs(); without it
+    the job is claimed here. The DB session is released while the model runs,
+    and results are only written if this caller still holds the lease.
+    """
     with app.app_context():
         job: AiJob | None = AiJob.query.get(job_id)
         if not job:
             raise ValueError("job not found")
 
         if job.status not in ("queued", "running"):
-            return job
+            return _detached(job)
+
+        if worker_id is None:
+            worker_id = f"manual:{default_worker_id()}"
+            now = datetime.utcnow()
+            job.status = "running"
+            job.started_at = now
+            job.worker_id = worker_id
+            job.locked_until = now + timedelta(seconds=AI_JOB_VISIBILITY_TIMEOUT_SECONDS)
+            job.attempts = (job.attempts or 0) + 1
+            db.session.add(job)
+            db.session.commit()
+        elif job.worker_id != worker_id:
+            return _detached(job)
 
-        job.status = "running"
-        job.started_at = datetime.utcnow()
-        db.session.add(job)
+        job_type = job.job_type
+        try:
+            text = _job_input_text(job)
+        except Exception as e:
+            return _detached(_finish_job(job_id, worker_id, error=str(e)))
+        # Don't hold a connection for the length of the model call
         db.session.commit()
+        db.session.close()
 
         try:
-            text = _job_input_text(job)
             if not text:
                 raise ValueError("missing input_text")
-
-            if job.job_type == "summarize_thread":
+            if job_type == "summarize_thread":
                 result = summarize_text(text)
-                job.output_text = result.get("summary")
-                job.output_json = json.dumps(result)
-
-            elif job.job_type == "analyze_deal":
+            elif job_type == "analyze_deal":
                 result = analyze_deal(text)
-                job.output_text = result.get("analysis")
-                job.output_json = json.dumps(result)
-
-                if job.deal_id and job.output_text:
-                    analysis = DealAnalysis(
-                        deal_id=job.deal_id,
-                        created_by_id=job.created_by_id,
-                        provider=result.get("provider") or "openai",
-                        model=result.get("model"),
-                        output_text=job.output_text,
-                        output_json=job.output_json,
-                    )
-                    db.session.add(analysis)
-
             else:
-                raise ValueError(f"unknown job_type: {job.job_type}")
-
-            job.status = "done"
-            job.finished_at = datetime.utcnow()
-            db.session.add(job)
-            _notify_ai_complete(job)
-            db.session.commit()
-            return job
+                raise ValueError(f"unknown job_type: {job_type}")
         except Exception as e:
-            job.status = "failed"
-            job.error = str(e)
-            job.finished_at = datetime.utcnow()
-            db.session.add(job)
-            db.session.commit()
-            return job
+            return _detached(_finish_job(job_id, worker_id, error=str(e)))
 
+        return _detached(_finish_job(job_id, worker_id, result=result))
 
-def claim_next_job() -> Optional[AiJob]:
-    """Claim the next queued job. Simple DB-queue semantics."""
-    with app.app_context():
-        job = (
-            AiJob.query.filter_by(status="queued")
-            .order_by(AiJob.created_at.asc())
-            .with_for_update(skip_locked=True)
-            .first()
-        )
-        if not job:
-            return None
-        job.status = "running"
-        job.started_at = datetime.utcnow()
+
+def _detached(job: Optional[AiJob]) -> Optional[AiJob]:
+    """Load and detach a job so callers can read it after this app context ends."""
+    if job is not None:
+        db.session.refresh(job)
+        db.session.expunge(job)
+    return job
+
+
+def _finish_job(job_id: int, worker_id: str, result: Optional[dict] = None, error: Optional[str] = None) -> AiJob:
+    """Record a job's outcome if worker_id still owns it."""
+    job: AiJob | None = AiJob.query.get(job_id)
+    if job is None or job.status != "running" or job.worker_id != worker_id:
+        # Lease expired and the job was requeued/taken over; drop this result
+        logger.warning(f"AI job {job_id} lease lost by {worker_id}, discarding result")
+        return job
+
+    try:
+        if error is not None:
+            raise ValueError(error)
+
+        if job.job_type == "summarize_thread":
+            job.output_text = result.get("summary")
+            job.output_json = json.dumps(result)
+
+        elif job.job_type == "analyze_deal":
+            job.output_text = result.get("analysis")
+            job.output_json = json.dumps(result)
+
+            if job.deal_id and job.output_text:
+                analysis = DealAnalysis(
+                    deal_id=job.deal_id,
+                    created_by_id=job.created_by_id,
+                    provider=result.get("provider") or "openai",
+                    model=result.get("model"),
+                    output_text=job.output_text,
+                    output_json=job.output_json,
+                )
+                db.session.add(analysis)
+
+        job.status = "done"
+        job.finished_at = datetime.utcnow()
+        job.locked_until = None
         db.session.add(job)
+        _notify_ai_complete(job)
         db.session.commit()
         return job
+    except Exception as e:
+        db.session.rollback()
+        job = AiJob.query.get(job_id)
+        job.status = "failed"
+        job.error = str(e)
+        job.finished_at = datetime.utcnow()
+        job.locked_until = None
+        db.session.add(job)
+        db.session.commit()
+        return job
+
+
+def claim_jobs(limit: int, worker_id: str) -> List[int]:
+    """Atomically lease up to `limit` queued jobs, oldest first.
+
+    Uses FOR UPDATE SKIP LOCKED on Postgres so any number of workers on any
+    number of nodes can claim concurrently without blocking or double-claiming.
+    """
+    if limit <= 0:
+        return []
+    now = datetime.utcnow()
+    candidates = (
+        db.select(AiJob.id)
+        .where(AiJob.status == "queued")
+        .order_by(AiJob.created_at.asc(), AiJob.id.asc())
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    stmt = (
+        db.update(AiJob)
+        .where(AiJob.id.in_(candidates))
+        .where(AiJob.status == "queued")
+        .values(
+            status="running",
+            worker_id=worker_id,
+            started_at=now,
+            locked_until=now + timedelta(seconds=AI_JOB_VISIBILITY_TIMEOUT_SECONDS),
+            attempts=db.func.coalesce(AiJob.attempts, 0) + 1,
+        )
+        .returning(AiJob.id)
+    )
+    ids = [row[0] for row in db.session.execute(stmt, execution_options={"synchronize_session": False})]
+    db.session.commit()
+    return ids
+
+
+def extend_leases(job_ids: List[int], worker_id: str) -> int:
+    """Heartbeat: push out the lease on jobs this worker is still running."""
+    if not job_ids:
+        return 0
+    updated = (
+        AiJob.query.filter(AiJob.id.in_(job_ids), AiJob.worker_id == worker_id, AiJob.status == "running")
+        .update(
+            {"locked_until": datetime.utcnow() + timedelta(seconds=AI_JOB_VISIBILITY_TIMEOUT_SECONDS)},
+            synchronize_session=False,
+        )
+    )
+    db.session.commit()
+    return updated
+
+
+def release_jobs(job_ids: List[int], worker_id: str) -> int:
+    """Hand unfinished jobs back to the queue (graceful shutdown)."""
+    if not job_ids:
+        return 0
+    released = (
+        AiJob.query.filter(AiJob.id.in_(job_ids), AiJob.worker_id == worker_id, AiJob.status == "running")
+        .update(
+            {
+                "status": "queued",
+                "worker_id": None,
+                "locked_until": None,
+                # Being interrupted by a shutdown doesn't count as an attempt
+                "attempts": db.case((AiJob.attempts > 0, AiJob.attempts - 1), else_=0),
+            },
+            synchronize_session=False,
+        )
+    )
+    db.session.commit()
+    signal_workers(released)
+    return released
+
+
+def requeue_stale_jobs() -> dict:
+    """Requeue running jobs whose lease lapsed (crashed/stuck worker); fail them after AI_JOB_MAX_ATTEMPTS."""
+    now = datetime.utcnow()
+    legacy_cutoff = now - timedelta(seconds=AI_JOB_VISIBILITY_TIMEOUT_SECONDS)
+    expired = db.and_(
+        AiJob.status == "running",
+        db.or_(
+            AiJob.locked_until < now,
+            db.and_(AiJob.locked_until.is_(None), AiJob.started_at < legacy_cutoff),
+        ),
+    )
+
+    failed = (
+        AiJob.query.filter(expired, db.func.coalesce(AiJob.attempts, 0) >= AI_JOB_MAX_ATTEMPTS)
+        .update(
+            {
+                "status": "failed",
+                "error": "visibility timeout exceeded",
+                "finished_at": now,
+                "locked_until": None,
+            },
+            synchronize_session=False,
+        )
+    )
+    requeued = (
+        AiJob.query.filter(expired)
+        .update({"status": "queued", "worker_id": None, "locked_until": None}, synchronize_session=False)
+    )
+    db.session.commit()
+    if requeued:
+        logger.warning(f"Requeued {requeued} AI jobs with expired leases")
+        signal_workers(requeued)
+    return {"requeued": requeued, "failed": failed}
+
+
+def claim_next_job() -> Optional[AiJob]:
+    """Claim the next queued job. Simple DB-queue semantics."""
+    with app.app_context():
+        ids = claim_jobs(1, default_worker_id())
+        return AiJob.query.get(ids[0]) if ids else None
@@ -0,0 +1,537 @@
+from __future__ import annotations
+
+import json
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import case, func, or_
+
+from app import db
+from models import (
+    AnalyticsSnapshot,
+    Comment,
+    Course,
+    Event,
+    ExpertAMA,
+    InvestmentDeal,
+    Post,
+    User,
+    UserActivity,
+    UserActivityDaily,
+    UserLifecycleFact,
+)
+from utils.tdigest import TDigest
+
+
+# Snapshot names in analytics_snapshots
+SNAPSHOT_STATE = "rollup_state"
+SNAPSHOT_SKETCHES = "lifecycle_sketches"
+SNAPSHOT_COHORTS = "cohorts"
+SNAPSHOT_PLATFORM = "platform_stats"
+
+ACTIVATION_DAYS = 7         # first post/comment within this many days of verification
+COHORT_WEEKS = 12           # verification_week cohorts kept
+BACKFILL_DAYS = 90          # days rolled up on the first run
+ID_CHUNK = 1000             # ids per IN (...) query
+
+_COUNTERS = ("posts", "comments", "deal_posts", "deal_comments", "activity_events")
+
+
+def invite_source(invite_id: Optional[int]) -> str:
+    return "peer" if invite_id else "admin"
+
+
+def _day_bounds(day: date):
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+def _chunks(ids: list, size: int = ID_CHUNK):
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+
+# =============================================================================
+# SNAPSHOTS
+# =============================================================================
+
+def load_snapshot(name: str):
+    """Return (payload, computed_at) or (None, None)."""
+    row = AnalyticsSnapshot.query.filter_by(name=name).first()
+    if row is None or not row.payload:
+        return None, None
+    return json.loads(row.payload), row.computed_at
+
+
+def save_snapshot(name: str, payload: dict, *, commit: bool = True) -> None:
+    row = AnalyticsSnapshot.query.filter_by(name=name).first()
+    if row is None:
+        row = AnalyticsSnapshot(name=name)
+        db.session.add(row)
+    row.payload = json.dumps(payload)
+    row.computed_at = datetime.utcnow()
+    if commit:
+        db.session.commit()
+
+
+# =============================================================================
+# DAILY ACTIVITY FACTS
+# =============================================================================
+
+def collect_activity_facts(start: datetime, end: datetime) -> Dict[int, dict]:
+    """Per-user activity counters for [start, end) from a handful of grouped range scans."""
+    facts: Dict[int, dict] = defaultdict(lambda: {**dict.fromkeys(_COUNTERS, 0), "seen": False})
+
+    is_deal = case((Post.post_type == "deal", 1), else_=0)
+    posts = db.session.query(
+        Post.author_id, func.count(Post.id), func.sum(is_deal)
+    ).filter(Post.created_at >= start, Post.created_at < end).group_by(Post.author_id)
+    for uid, n, n_deal in posts:
+        facts[uid]["posts"] = int(n)
+        facts[uid]["deal_posts"] = int(n_deal or 0)
+
+    comments = db.session.query(
+        Comment.author_id, func.count(Comment.id), func.sum(is_deal)
+    ).outerjoin(Post, Post.id == Comment.post_id).filter(
+        Comment.created_at >= start, Comment.created_at < end
+    ).group_by(Comment.author_id)
+    for uid, n, n_deal in comments:
+        facts[uid]["comments"] = int(n)
+        facts[uid]["deal_comments"] = int(n_deal or 0)
+
+    events = db.session.query(UserActivity.user_id, func.count(UserActivity.id)).filter(
+        UserActivity.created_at >= start, UserActivity.created_at < end
+    ).group_by(UserActivity.user_id)
+    for uid, n in events:
+        facts[uid]["activity_events"] = int(n)
+
+    seen = db.session.query(User.id).filter(User.last_seen >= start, User.last_seen < end)
+    for (uid,) in seen:
+        facts[uid]["seen"] = True
+
+    user_ids = list(facts)
+    for chunk in _chunks(user_ids):
+        dims = db.session.query(
+            User.id, User.verification_status, User.specialty, User.invite_id
+        ).filter(User.id.in_(chunk))
+        for uid, status, specialty, invite_id in dims:
+            facts[uid]["is_verified"] = status == "verified"
+            facts[uid]["specialty"] = specialty
+            facts[uid]["invite_source"] = invite_source(invite_id)
+
+    return {uid: f for uid, f in facts.items() if "is_verified" in f}
+
+
+def rollup_day(day: date, *, commit: bool = True) -> int:
+    """Upsert UserActivityDaily rows for one day.
+
+    Counters are recomputed from source; `seen` is sticky because last_seen
+    only moves forward, so an earlier run is the only evidence of a visit.
+    """
+    start, end = _day_bounds(day)
+    facts = collect_activity_facts(start, end)
+    existing = {r.user_id: r for r in UserActivityDaily.query.filter_by(day=day).all()}
+
+    for uid, f in facts.items():
+        row = existing.pop(uid, None)
+        if row is None:
+            row = UserActivityDaily(day=day, user_id=uid, seen=False)
+            db.session.add(row)
+        row.is_verified = f["is_verified"]
+        row.specialty = f["specialty"]
+        row.invite_source = f["invite_source"]
+        row.seen = bool(row.seen) or f["seen"]
+        for key in _COUNTERS:
+            setattr(row, key, f[key])
+
+    # Users whose rows no longer have any source activity (deleted posts etc.)
+    for row in existing.values():
+        for key in _COUNTERS:
+            setattr(row, key, 0)
+        if not row.seen:
+            db.session.delete(row)
+
+    if commit:
+        db.session.commit()
+    return len(facts)
+
+
+def rollup_days(start_day: date, end_day: Optional[date] = None) -> int:
+    end_day = end_day or datetime.utcnow().date()
+    total = 0
+    day = start_day
+    while day <= end_day:
+        total += rollup_day(day)
+        day += timedelta(days=1)
+    return total
+
+
+def active_user_count(start_day: date, predicate, live: Dict[int, dict], live_filter) -> int:
+    """Distinct users matching predicate in the rolled-up days plus today's live facts."""
+    rolled = db.session.query(func.count(func.distinct(UserActivityDaily.user_id))).filter(
+        UserActivityDaily.day >= start_day,
+        UserActivityDaily.day < datetime.utcnow().date(),
+        predicate,
+    ).scalar() or 0
+
+    live_ids = [uid for uid, f in live.items() if live_filter(f)]
+    already = 0
+    for chunk in _chunks(live_ids):
+        already += db.session.query(func.count(func.distinct(UserActivityDaily.user_id))).filter(
+            UserActivityDaily.day >= start_day,
+            UserActivityDaily.day < datetime.utcnow().date(),
+            predicate,
+            UserActivityDaily.user_id.in_(chunk),
+        ).scalar() or 0
+    return int(rolled) + len(live_ids) - int(already)
+
+
+# =============================================================================
+# LIFECYCLE FACTS + SKETCHES
+# =============================================================================
+
+def _first_times(user_ids: list) -> Dict[int, dict]:
+    """First post/comment/deal-post time per user, restricted to user_ids."""
+    firsts: Dict[int, dict] = defaultdict(dict)
+    for chunk in _chunks(user_ids):
+        posts = db.session.query(
+            Post.author_id,
+            func.min(Post.created_at),
+            func.min(case((Post.post_type == "deal", Post.created_at), else_=None)),
+        ).filter(Post.author_id.in_(chunk)).group_by(Post.author_id)
+        for uid, first_post, first_deal in posts:
+            firsts[uid]["post"] = first_post
+            firsts[uid]["deal"] = first_deal
+
+        comments = db.session.query(Comment.author_id, func.min(Comment.created_at)).filter(
+            Comment.author_id.in_(chunk)
+        ).group_by(Comment.author_id)
+        for uid, first_comment in comments:
+            firsts[uid]["comment"] = first_comment
+    return firsts
+
+
+def refresh_lifecycle_facts(since: Optional[datetime] = None) -> int:
+    """Upsert UserLifecycleFact rows.
+
+    With since=None every verified (or verification-submitted) user is
+    rebuilt; otherwise only users updated or active since `since`.
+    """
+    candidates = db.session.query(User.id).filter(
+        or_(User.verified_at.isnot(None), User.verification_status == "verified")
+    )
+    if since is not None:
+        candidates = candidates.filter(User.updated_at >= since)
+    user_ids = {uid for (uid,) in candidates}
+
+    if since is not None:
+        for model in (Post, Comment):
+            authors = db.session.query(model.author_id).filter(model.created_at >= since).distinct()
+            user_ids.update(uid for (uid,) in authors)
+
+    user_ids = sorted(user_ids)
+    for chunk in _chunks(user_ids):
+        users = db.session.query(
+            User.id, User.specialty, User.invite_id, User.verification_status,
+            User.verification_submitted_at, User.verified_at,
+        ).filter(
+            User.id.in_(chunk),
+            or_(User.verified_at.isnot(None), User.verification_status == "verified"),
+        ).all()
+        if not users:
+            continue
+        ids = [u.id for u in users]
+        firsts = _first_times(ids)
+        existing = {f.user_id: f for f in UserLifecycleFact.query.filter(UserLifecycleFact.user_id.in_(ids))}
+
+        for u in users:
+            fact = existing.get(u.id)
+            if fact is None:
+                fact = UserLifecycleFact(user_id=u.id)
+                db.session.add(fact)
+            first = firsts.get(u.id, {})
+            actions = [t for t in (first.get("post"), first.get("comment")) if t]
+            fact.specialty = u.specialty
+            fact.invite_source = invite_source(u.invite_id)
+            fact.is_verified = u.verification_status == "verified"
+            fact.verification_submitted_at = u.verification_submitted_at
+            fact.verified_at = u.verified_at
+            fact.first_action_at = min(actions) if actions else None
+            fact.first_deal_post_at = first.get("deal")
+        db.session.commit()
+
+    return len(user_ids)
+
+
+def _hours(delta: timedelta) -> float:
+    return delta.total_seconds() / 3600.0
+
+
+def _is_activated(fact) -> bool:
+    return bool(
+        fact.first_action_at and fact.verified_at
+        and fact.first_action_at <= fact.verified_at + timedelta(days=ACTIVATION_DAYS)
+    )
+
+
+def rebuild_snapshots() -> dict:
+    """Percentile sketches and cohort tables from one scan of user_lifecycle_facts."""
+    ttfv = TDigest()
+    sla = TDigest()
+    cohorts = {
+        "specialty": defaultdict(lambda: {"users": 0, "activated": 0, "deal_posters": 0}),
+        "invite_source": defaultdict(lambda: {"users": 0, "activated": 0, "deal_posters": 0}),
+        "verification_week": defaultdict(lambda: {"users": 0, "activated": 0}),
+    }
+
+    for fact in UserLifecycleFact.query.yield_per(ID_CHUNK):
+        if fact.verified_at:
+            if fact.first_action_at and fact.first_action_at > fact.verified_at:
+                ttfv.add(_hours(fact.first_action_at - fact.verified_at))
+            if fact.verification_submitted_at:
+                sla.add(_hours(fact.verified_at - fact.verification_submitted_at))
+
+            week = (fact.verified_at.date() - timedelta(days=fact.verified_at.weekday())).isoformat()
+            bucket = cohorts["verification_week"][week]
+            bucket["users"] += 1
+            bucket["activated"] += int(_is_activated(fact))
+
+        if fact.is_verified:
+            for dimension, key in (("specialty", fact.specialty or "Unknown"),
+                                   ("invite_source", fact.invite_source)):
+                bucket = cohorts[dimension][key]
+                bucket["users"] += 1
+                bucket["activated"] += int(_is_activated(fact))
+                bucket["deal_posters"] += int(fact.first_deal_post_at is not None)
+
+    weeks = sorted(cohorts["verification_week"], reverse=True)[:COHORT_WEEKS]
+    cohort_payload = {
+        "specialty": dict(cohorts["specialty"]),
+        "invite_source": dict(cohorts["invite_source"]),
+        "verification_week": {w: cohorts["verification_week"][w] for w in weeks},
+    }
+
+    save_snapshot(SNAPSHOT_SKETCHES, {"ttfv_hours": ttfv.to_dict(), "sla_hours": sla.to_dict()}, commit=False)
+    save_snapshot(SNAPSHOT_COHORTS, cohort_payload, commit=False)
+    db.session.commit()
+    return {"ttfv_samples": len(ttfv), "sla_samples": len(sla)}
+
+
+# =============================================================================
+# PLATFORM COUNTERS (admin dashboard)
+# =============================================================================
+
+def compute_platform_stats(now: Optional[datetime] = None) -> dict:
+    now = now or datetime.utcnow()
+    week_ago = now - timedelta(days=7)
+    month_ago = now - timedelta(days=30)
+    yesterday = now - timedelta(days=1)
+
+    def count_if(condition):
+        return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+    users = db.session.query(
+        func.count(User.id),
+        count_if(User.subscription_tier.in_(["pro", "premium"])),
+        count_if(User.subscription_tier == "elite"),
+        count_if(User.created_at >= week_ago),
+        count_if(User.created_at >= month_ago),
+        count_if(User.verification_status == "pending"),
+        count_if(User.last_login >= yesterday),
+        count_if(User.last_login >= week_ago),
+    ).one()
+    posts = db.session.query(func.count(Post.id), count_if(Post.created_at >= week_ago)).one()
+    deals = dict(
+        db.session.query(InvestmentDeal.status, func.count(InvestmentDeal.id))
+        .filter(InvestmentDeal.status.in_(["active", "review"]))
+        .group_by(InvestmentDeal.status)
+        .all()
+    )
+
+    total_users, pro_users, elite_users, new_week, new_month, pending, dau, wau = (int(v) for v in users)
+    stats = {
+        "total_users": total_users,
+        "premium_users": pro_users + elite_users,
+        "pro_users": pro_users,
+        "elite_users": elite_users,
+        "new_users_week": new_week,
+        "new_users_month": new_month,
+        "total_posts": int(posts[0]),
+        "posts_week": int(posts[1]),
+        "active_deals": int(deals.get("active", 0)),
+        "pending_deals": int(deals.get("review", 0)),
+        "upcoming_amas": ExpertAMA.query.filter(ExpertAMA.status == "scheduled").count(),
+        "total_courses": Course.query.filter_by(is_published=True).count(),
+        "total_events": Event.query.filter_by(is_published=True).count(),
+        "pending_verifications": pending,
+        "dau": dau,
+        "wau": wau,
+    }
+    if total_users > 0:
+        stats["premium_rate"] = (stats["premium_users"] / total_users) * 100
+        stats["dau_rate"] = (dau / total_users) * 100
+    else:
+        stats["premium_rate"] = 0
+        stats["dau_rate"] = 0
+
+    # Estimate monthly revenue (pro $29 + elite $99)
+    stats["monthly_revenue"] = (pro_users * 29) + (elite_users * 99)
+    return stats
+
+
+def refresh_platform_stats() -> dict:
+    stats = compute_platform_stats()
+    save_snapshot(SNAPSHOT_PLATFORM, stats)
+    return stats
+
+
+def get_platform_stats() -> dict:
+    """Latest rolled-up dashboard counters; computed (and stored) on first use."""
+    stats, _ = load_snapshot(SNAPSHOT_PLATFORM)
+    if stats is None:
+        stats = refresh_platform_stats()
+    return stats
+
+
+# =============================================================================
+# JOB ENTRY POINTS
+# =============================================================================
+
+def run_rollups(now: Optional[datetime] = None) -> dict:
+    """Incremental refresh: re-roll yesterday and today, lifecycle facts changed
+    since the last run, then sketches, cohorts and platform counters."""
+    now = now or datetime.utcnow()
+    state, _ = load_snapshot(SNAPSHOT_STATE)
+    last_run = datetime.fromisoformat(state["last_run"]) if state else None
+
+    if last_run is None:
+        start_day = now.date() - timedelta(days=BACKFILL_DAYS)
+    else:
+        # Catch up on any days missed while the job was not running
+        start_day = min(last_run.date(), now.date() - timedelta(days=1))
+
+    days = rollup_days(start_day, now.date())
+    # Small overlap so rows committed during the previous run are not missed
+    lifecycle = refresh_lifecycle_facts(last_run - timedelta(minutes=5) if last_run else None)
+    sketches = rebuild_snapshots()
+    refresh_platform_stats()
+    save_snapshot(SNAPSHOT_STATE, {"last_run": now.isoformat()})
+
+    return {"user_days": days, "lifecycle_users": lifecycle, **sketches}
+
+
+def backfill(days: int = BACKFILL_DAYS) -> dict:
+    """Full rebuild: re-roll the last `days` days and every lifecycle fact."""
+    now = datetime.utcnow()
+    user_days = rollup_days(now.date() - timedelta(days=days), now.date())
+    lifecycle = refresh_lifecycle_facts(None)
+    sketches = rebuild_snapshots()
+    refresh_platform_stats()
+    save_snapshot(SNAPSHOT_STATE, {"last_run": now.isoformat()})
+    return {"user_days": user_days, "lifecycle_users": lifecycle, **sketches}
+
+
+# =============================================================================
+# READ PATH
+# =============================================================================
+
+def _sketches() -> Optional[dict]:
+    """Percentile sketches, or None until the rollup job has built them (never scanned here)."""
+    sketches, _ = load_snapshot(SNAPSHOT_SKETCHES)
+    if sketches is None:
+        return None
+    return {name: TDigest.from_dict(data) for name, data in sketches.items()}
+
+
+def overview_metrics(window_days: int = 7) -> dict:
+    """Overview KPIs: rolled-up days in the window plus today's facts computed live."""
+    now = datetime.utcnow()
+    today_start, _ = _day_bounds(now.date())
+    start_day = (now - timedelta(days=window_days)).date()
+    live = collect_activity_facts(today_start, now + timedelta(seconds=1))
+
+    verified_wau = active_user_count(
+        start_day,
+        UserActivityDaily.is_verified.is_(True) & or_(
+            UserActivityDaily.seen.is_(True), UserActivityDaily.posts > 0, UserActivityDaily.comments > 0
+        ),
+        live,
+        lambda f: f["is_verified"] and (f["seen"] or f["posts"] or f["comments"]),
+    )
+    deal_wau = active_user_count(
+        start_day,
+        UserActivityDaily.is_verified.is_(True) & or_(
+            UserActivityDaily.deal_posts > 0, UserActivityDaily.deal_comments > 0
+        ),
+        live,
+        lambda f: f["is_verified"] and (f["deal_posts"] or f["deal_comments"]),
+    )
+
+    sketches = _sketches()
+    warming = sketches is None
+    if warming:
+        sketches = {"ttfv_hours": TDigest(), "sla_hours": TDigest()}
+    return {
+        "verified_wau": verified_wau,
+        "deal_wau": deal_wau,
+        "ttfv_p50": sketches["ttfv_hours"].quantile(0.5) or 0,
+        "sla_p50": sketches["sla_hours"].quantile(0.5) or 0,
+        "sla_p95": sketches["sla_hours"].quantile(0.95) or 0,
+        "warming": warming,
+        "window_start": now - timedelta(days=window_days),
+        "now": now,
+    }
+
+
+def _cohort_activity(dimension: str, window_days: int) -> Dict[str, int]:
+    """Distinct verified users with user_activity in the window, per cohort key."""
+    now = datetime.utcnow()
+    start_day = (now - timedelta(days=window_days)).date()
+    column = UserActivityDaily.specialty if dimension == "specialty" else UserActivityDaily.invite_source
+
+    def cohort_key(key):
+        return key or "Unknown" if dimension == "specialty" else key
+
+    keyed: Dict[str, set] = defaultdict(set)
+    rows = db.session.query(column, UserActivityDaily.user_id).filter(
+        UserActivityDaily.day >= start_day,
+        UserActivityDaily.day < now.date(),
+        UserActivityDaily.is_verified.is_(True),
+        UserActivityDaily.activity_events > 0,
+    ).distinct()
+    for key, uid in rows:
+        keyed[cohort_key(key)].add(uid)
+
+    today_start, _ = _day_bounds(now.date())
+    for uid, f in collect_activity_facts(today_start, now + timedelta(seconds=1)).items():
+        if f["is_verified"] and f["activity_events"]:
+            key = f[dimension]
+            keyed[cohort_key(key)].add(uid)
+
+    return {key: len(ids) for key, ids in keyed.items()}
+
+
+def cohort_metrics(dimension: str, metric: str, window_days: int = 7) -> list:
+    """Rows of {key, users, activated} for the cohorts endpoint; empty until the rollup job has run."""
+    cohorts, _ = load_snapshot(SNAPSHOT_COHORTS)
+    if cohorts is None:
+        return []
+
+    buckets = cohorts.get(dimension, {})
+    if dimension == "verification_week":
+        return [
+            {"key": week, "users": b["users"], "activated": b["activated"]}
+            for week, b in sorted(buckets.items(), reverse=True)
+        ]
+
+    if metric == "wau":
+        active = _cohort_activity(dimension, window_days)
+        counts = {key: active.get(key, 0) for key in buckets}
+    else:
+        field = "activated" if metric == "activation" else "deal_posters"
+        counts = {key: b[field] for key, b in buckets.items()}
+
+    rows = [{"key": key, "users": b["users"], "activated": counts[key]} for key, b in buckets.items()]
+    rows.sort(key=lambda r: r["users"], reverse=True)
+    return rows
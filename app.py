@@ -1,6 +1,7 @@
 import os
 import logging
 from datetime import timedelta
+from utils.startup import boot_checkpoint, verify_schema
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
@@ -66,12 +67,16 @@ app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 # Initialize the app with the extension
 db.init_app(app)
 
+boot_checkpoint('app_config')
+
 # Import models to register them with SQLAlchemy metadata
 with app.app_context():
     import models  # noqa: F401
+    boot_checkpoint('models')
     
-    # Verify and create any missing database tables on startup
-    from utils.db_verify import verify_and_create_tables
-    created = verify_and_create_tables(db, app)
+    # Verify and create any missing database tables on startup (skipped when
+    # this migration revision was already verified against these models)
+    created = verify_schema(db, app)
     if created:
         logger.warning(f"Created missing database tables on startup: {created}")
+    boot_checkpoint('schema_verify')
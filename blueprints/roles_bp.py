@@ -3,7 +3,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from flask_login import login_required, current_user
 from app import db
 from models import User, CustomRole
-from utils.roles_permissions import RoleManager, PERMISSIONS, get_user_permissions
+from utils.roles_permissions import RoleManager, PERMISSIONS, PermissionResolver, get_user_permissions
 import json
 
 roles_bp = Blueprint('roles', __name__, url_prefix='/admin/roles')
@@ -62,6 +62,7 @@ def create_role():
         )
         db.session.add(role)
         db.session.commit()
+        PermissionResolver.invalidate()
         
         flash('Role created successfully.', 'success')
         return redirect(url_for('roles.list_roles'))
@@ -86,6 +87,7 @@ def edit_role(role_id):
         role.permissions = ','.join(request.form.getlist('permissions'))
         
         db.session.commit()
+        PermissionResolver.invalidate()
         flash('Role updated successfully.', 'success')
         return redirect(url_for('roles.list_roles'))
     
@@ -106,6 +108,7 @@ def delete_role(role_id):
     
     db.session.delete(role)
     db.session.commit()
+    PermissionResolver.invalidate()
     
     flash('Role deleted.', 'success')
     return redirect(url_for('roles.list_roles'))
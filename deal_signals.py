@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import math
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import func
+
+from app import db
+from models import Comment, DealDetails, DealSignalScore, Post, ReputationEvent, User
+
+
+# Signal weights. Keep in sync with the trending formula shown to users.
+SIGNAL_WEIGHTS = {
+    "endorsement": 10.0,
+    "comment": 2.0,
+    "author_reputation": 0.1,
+}
+
+# Score decays as exp(-age_days / DECAY_DAYS)
+DECAY_DAYS = 7.0
+
+_EPOCH = datetime(1970, 1, 1)
+_ZERO_RANK = -1.0e9
+_NEGATIVE_RANK = -2.0e9
+
+
+def raw_signal(endorsements: int, comments: int, author_reputation: int) -> float:
+    return (
+        SIGNAL_WEIGHTS["endorsement"] * endorsements
+        + SIGNAL_WEIGHTS["comment"] * comments
+        + SIGNAL_WEIGHTS["author_reputation"] * author_reputation
+    )
+
+
+def decayed_score(raw: float, created_at: Optional[datetime], now: Optional[datetime] = None) -> float:
+    """Signal score as of now: raw * exp(-age_days / DECAY_DAYS)."""
+    if not created_at:
+        return float(raw)
+    now = now or datetime.utcnow()
+    age_days = (now - created_at).total_seconds() / 86400.0
+    return float(raw) * math.exp(-age_days / DECAY_DAYS)
+
+
+def rank_key(raw: float, created_at: Optional[datetime]) -> float:
+    """Time-invariant sort key for decayed_score.
+
+    raw * exp((created - now) / tau) orders the same as
+    log(raw) + created / tau for every `now`, so the key never needs
+    recomputing as deals age. Zero and negative scores sort below.
+    """
+    created_days = ((created_at or _EPOCH) - _EPOCH).total_seconds() / 86400.0
+    if raw > 0:
+        return math.log(raw) + created_days / DECAY_DAYS
+    if raw == 0:
+        return _ZERO_RANK
+    return _NEGATIVE_RANK - (math.log(-raw) + created_days / DECAY_DAYS)
+
+
+def _apply(row: DealSignalScore) -> None:
+    row.raw_score = raw_signal(row.endorsement_count or 0, row.comment_count or 0, row.author_reputation or 0)
+    row.rank_key = rank_key(row.raw_score, row.deal_created_at)
+
+
+def refresh_deal_signals(deal_ids: Optional[Iterable[int]] = None, *, commit: bool = True) -> int:
+    """Recompute materialized signal inputs with one grouped query.
+
+    Refreshes every deal when deal_ids is None (and drops rows for deals
+    that no longer exist); otherwise only the given deals.
+    """
+    endorsements = db.session.query(
+        ReputationEvent.related_post_id.label("post_id"),
+        func.count(ReputationEvent.id).label("n"),
+    ).filter(ReputationEvent.event_type == "post_upvote")
+    comments = db.session.query(
+        Comment.post_id.label("post_id"),
+        func.count(Comment.id).label("n"),
+    )
+
+    deals = db.session.query(DealDetails.id, DealDetails.post_id, DealDetails.created_at)
+    if deal_ids is not None:
+        deal_ids = list(deal_ids)
+        if not deal_ids:
+            return 0
+        post_ids = [p for (p,) in db.session.query(DealDetails.post_id).filter(DealDetails.id.in_(deal_ids))]
+        endorsements = endorsements.filter(ReputationEvent.related_post_id.in_(post_ids))
+        comments = comments.filter(Comment.post_id.in_(post_ids))
+        deals = deals.filter(DealDetails.id.in_(deal_ids))
+
+    endorsements = endorsements.group_by(ReputationEvent.related_post_id).subquery()
+    comments = comments.group_by(Comment.post_id).subquery()
+
+    rows = (
+        deals.add_columns(
+            func.coalesce(endorsements.c.n, 0),
+            func.coalesce(comments.c.n, 0),
+            func.coalesce(User.reputation_score, 0),
+        )
+        .outerjoin(Post, Post.id == DealDetails.post_id)
+        .outerjoin(User, User.id == Post.author_id)
+        .outerjoin(endorsements, endorsements.c.post_id == DealDetails.post_id)
+        .outerjoin(comments, comments.c.post_id == DealDetails.post_id)
+        .all()
+    )
+
+    existing_q = DealSignalScore.query
+    if deal_ids is not None:
+        existing_q = existing_q.filter(DealSignalScore.deal_id.in_(deal_ids))
+    existing = {r.deal_id: r for r in existing_q.all()}
+
+    seen = set()
+    for deal_id, post_id, created_at, n_endorse, n_comment, author_rep in rows:
+        seen.add(deal_id)
+        row = existing.get(deal_id)
+        if row is None:
+            row = DealSignalScore(deal_id=deal_id)
+            db.session.add(row)
+        row.post_id = post_id
+        row.deal_created_at = created_at
+        row.endorsement_count = int(n_endorse)
+        row.comment_count = int(n_comment)
+        row.author_reputation = int(author_rep)
+        _apply(row)
+
+    if deal_ids is None:
+        for deal_id, row in existing.items():
+            if deal_id not in seen:
+                db.session.delete(row)
+
+    if commit:
+        db.session.commit()
+    return len(rows)
+
+
+def bump_deal_signal(post_id: Optional[int], *, endorsements: int = 0, comments: int = 0) -> None:
+    """Incrementally adjust a deal's counts inside the caller's transaction.
+
+    No-op for posts that are not deals. Call before the caller commits.
+    """
+    if not post_id:
+        return
+    row = DealSignalScore.query.filter_by(post_id=post_id).first()
+    if row is None:
+        deal = DealDetails.query.filter_by(post_id=post_id).first()
+        if deal is not None:
+            refresh_deal_signals([deal.id], commit=False)
+        return
+    row.endorsement_count = int(row.endorsement_count or 0) + endorsements
+    row.comment_count = int(row.comment_count or 0) + comments
+    _apply(row)
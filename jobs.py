@@ -188,16 +188,11 @@ def snapshot_engagement():
                 db.session.add(snapshot)
                 created += 1
         
-        # Clean up old snapshots (older than 7 days)
-        cleanup_cutoff = now - timedelta(days=7)
-        deleted = EngagementSnapshot.query.filter(
-            EngagementSnapshot.snapshot_hour < cleanup_cutoff
-        ).delete()
-        
+        # Snapshots older than 7 days expire with their partition (enforce_retention)
         db.session.commit()
-        print(f"[{datetime.utcnow()}] Snapshot complete. Created: {created}, Cleaned up: {deleted}")
+        print(f"[{datetime.utcnow()}] Snapshot complete. Created: {created}")
         
-        return {'created': created, 'deleted': deleted}
+        return {'created': created}
 
 
 # =============================================================================
@@ -350,6 +345,235 @@ def update_trending_hashtags():
         return {'hashtags_updated': len(hashtags)}
 
 
+# =============================================================================
+# DEAL SIGNAL SCORES (Run every 15 minutes)
+# =============================================================================
+
+def update_deal_signal_scores():
+    """
+    Recompute materialized deal signal scores used by trending deal lists
+    Comments and endorsements update scores incrementally; this reconciles
+    counts and picks up author reputation changes
+    """
+    with app.app_context():
+        from deal_signals import refresh_deal_signals
+        
+        print(f"[{datetime.utcnow()}] Updating deal signal scores...")
+        refreshed = refresh_deal_signals()
+        print(f"[{datetime.utcnow()}] Deal signal scores updated: {refreshed}")
+        
+        return {'deals_updated': refreshed}
+
+
+# =============================================================================
+# PEOPLE YOU MAY KNOW (Full rebuild daily, incremental every 15 minutes)
+# =============================================================================
+
+def rebuild_people_suggestions():
+    """
+    Precompute ranked people-you-may-know lists for all active users
+    Friend-of-friend paths over the follow/connection graph plus specialty,
+    license state and activity signals
+    """
+    with app.app_context():
+        from utils.people_suggestions import recompute_all_suggestions
+        
+        print(f"[{datetime.utcnow()}] Rebuilding people suggestions...")
+        result = recompute_all_suggestions()
+        print(f"[{datetime.utcnow()}] People suggestions rebuilt for {result['users']} users")
+        
+        return result
+
+
+def refresh_people_suggestions():
+    """
+    Recompute suggestions for users whose follows/connections changed
+    since the last run (dirty set in Redis, or suggestion_dirty_users
+    without Redis, so web workers' changes reach the scheduler process)
+    """
+    with app.app_context():
+        from utils.people_suggestions import refresh_dirty_suggestions
+        
+        result = refresh_dirty_suggestions()
+        if result['users']:
+            print(f"[{datetime.utcnow()}] People suggestions refreshed for {result['users']} users")
+        
+        return result
+
+
+# =============================================================================
+# ADMIN ANALYTICS ROLLUPS (Incremental hourly, full reconcile nightly)
+# =============================================================================
+
+def update_analytics_rollups():
+    """
+    Roll per-user daily activity facts, lifecycle facts, percentile sketches
+    and dashboard counters used by the admin analytics endpoints
+    """
+    with app.app_context():
+        from analytics_rollups import run_rollups
+        
+        print(f"[{datetime.utcnow()}] Updating analytics rollups...")
+        result = run_rollups()
+        print(f"[{datetime.utcnow()}] Analytics rollups updated: {result}")
+        
+        return result
+
+
+def rebuild_analytics_rollups(days=7):
+    """
+    Re-roll the last few days and every lifecycle fact from source
+    Picks up deletions and late edits the incremental run does not see
+    """
+    with app.app_context():
+        from analytics_rollups import backfill
+        
+        print(f"[{datetime.utcnow()}] Rebuilding analytics rollups ({days} days)...")
+        result = backfill(days)
+        print(f"[{datetime.utcnow()}] Analytics rollups rebuilt: {result}")
+        
+        return result
+
+
+# =============================================================================
+# ACHIEVEMENTS (Counters maintained on write, reconciled nightly)
+# =============================================================================
+
+def reconcile_achievement_counters():
+    """
+    Rebuild per-user counters from source tables and award any
+    achievements the incremental path missed
+    """
+    with app.app_context():
+        from utils.achievements import reconcile_all_counters
+        
+        print(f"[{datetime.utcnow()}] Reconciling achievement counters...")
+        result = reconcile_all_counters()
+        print(f"[{datetime.utcnow()}] Counters reconciled for {result['users']} users, "
+              f"{result['awarded']} achievements awarded")
+        
+        return result
+
+
+# =============================================================================
+# FEED WIDGETS (External sources prefetched off the request path)
+# =============================================================================
+
+def refresh_feed_widgets(only_stale=True):
+    """
+    Refresh news, Bloomberg, YouTube Shorts and MIA widget snapshots
+    Each source is re-fetched once its own refresh interval has passed
+    """
+    with app.app_context():
+        from utils.widget_prefetch import WidgetPrefetcher
+        
+        print(f"[{datetime.utcnow()}] Refreshing feed widgets...")
+        result = WidgetPrefetcher.refresh_all(only_stale=only_stale)
+        refreshed = [name for name, ok in result.items() if ok]
+        failed = [name for name, ok in result.items() if ok is False]
+        print(f"[{datetime.utcnow()}] Widgets refreshed: {refreshed or 'none'}, failed: {failed or 'none'}")
+        
+        return result
+
+
+# =============================================================================
+# MEDIA (Image derivatives)
+# =============================================================================
+
+def process_media_variants(batch_size=200, backfill=False):
+    """
+    Generate resized/WebP variants for image attachments that have none
+    Catches uploads whose background processing was lost; with backfill=True
+    keeps going until every existing image has been processed
+    """
+    with app.app_context():
+        from utils.image_variants import ImageVariants
+        
+        print(f"[{datetime.utcnow()}] Processing image variants...")
+        totals = {'processed': 0, 'skipped': 0, 'failed': 0}
+        while True:
+            result = ImageVariants.process_pending(limit=batch_size)
+            for key in totals:
+                totals[key] += result[key]
+            # Failed rows stay pending and would come straight back; retry them next run
+            if not backfill or result['failed'] or result['processed'] + result['skipped'] < batch_size:
+                break
+        print(f"[{datetime.utcnow()}] Image variants: {totals['processed']} processed, "
+              f"{totals['skipped']} skipped, {totals['failed']} failed (will retry)")
+        
+        return totals
+
+
+# =============================================================================
+# OP-MEDINVEST (Ghost CMS sync)
+# =============================================================================
+
+def sync_ghost_articles(full=False):
+    """
+    Import Ghost posts created or edited since the last sync
+    Pages from the stored updated_at high-water mark; full=True re-checks every post
+    """
+    with app.app_context():
+        from utils.ghost_sync import GhostSync
+        
+        print(f"[{datetime.utcnow()}] Syncing Ghost articles...")
+        result = GhostSync.sync(full=full)
+        if result is None:
+            print(f"[{datetime.utcnow()}] Ghost sync skipped (not configured or already running)")
+        else:
+            print(f"[{datetime.utcnow()}] Ghost sync: {result['created']} created, "
+                  f"{result['updated']} updated, {result['unchanged']} unchanged, "
+                  f"{result['errors']} errors")
+        
+        return result
+
+
+# =============================================================================
+# WEBHOOK INBOX (Stored provider events applied off the request path)
+# =============================================================================
+
+def process_webhook_inbox(source='stripe'):
+    """
+    Apply pending webhook events and purge old processed ones
+    Backstop for the drain kicked by each delivery (restarts, failures, retries)
+    """
+    with app.app_context():
+        from utils.webhook_inbox import WebhookInbox
+        
+        print(f"[{datetime.utcnow()}] Processing {source} webhook inbox...")
+        result = WebhookInbox.drain(source)
+        if result is None:
+            print(f"[{datetime.utcnow()}] {source} inbox busy in another worker, skipping")
+        else:
+            print(f"[{datetime.utcnow()}] {source} inbox: {result['processed']} processed, "
+                  f"{result['retrying']} retrying, {result['failed']} failed")
+        purged = WebhookInbox.purge()
+        if purged:
+            print(f"[{datetime.utcnow()}] Purged {purged} old webhook events")
+        
+        return result
+
+
+# =============================================================================
+# SCHEDULER COORDINATION (Leader-elected, run history in job_runs)
+# =============================================================================
+
+def show_job_history(job_name=None, limit=50):
+    """Print recent scheduled job runs, newest first"""
+    with app.app_context():
+        from utils.job_coordinator import JobCoordinator, LeaderElection
+        
+        print(f"[{datetime.utcnow()}] Scheduler leader: {LeaderElection.leader() or 'unknown'}")
+        runs = JobCoordinator.history(job_name, limit=limit)
+        for run in runs:
+            duration = f"{run['duration_ms']}ms" if run['duration_ms'] is not None else '-'
+            print(f"  {run['started_at']}  {run['job']:<30} {run['status']:<10} {duration:>9}  {run['node']}")
+            if run['error'] and run['status'] == 'failed':
+                print(f"    {run['error'].strip().splitlines()[-1]}")
+        
+        return runs
+
+
 # =============================================================================
 # CLEANUP JOBS
 # =============================================================================
@@ -362,19 +586,61 @@ def cleanup_old_scores():
     with app.app_context():
         print(f"[{datetime.utcnow()}] Cleaning up old scores...")
         
-        # Remove scores for posts older than 30 days
+        # Remove scores for posts older than 30 days. Scores are one row per
+        # post rather than a time series, so they can't be partitioned; delete
+        # in short batches instead of one long transaction
         cutoff = datetime.utcnow() - timedelta(days=30)
         
-        deleted = db.session.query(PostScore).join(Post).filter(
-            Post.created_at < cutoff
-        ).delete(synchronize_session=False)
+        deleted = 0
+        while True:
+            ids = [row.id for row in db.session.query(PostScore.id).join(Post).filter(
+                Post.created_at < cutoff
+            ).limit(5000).all()]
+            if not ids:
+                break
+            deleted += PostScore.query.filter(PostScore.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
         
-        db.session.commit()
         print(f"[{datetime.utcnow()}] Cleanup complete. Deleted: {deleted}")
         
         return {'deleted': deleted}
 
 
+def cleanup_exports():
+    """
+    Delete background CSV exports older than a day, including the copies
+    other workers published to Object Storage
+    Run hourly
+    """
+    with app.app_context():
+        from utils.exports import BackgroundExport
+        
+        removed = BackgroundExport.cleanup()
+        print(f"[{datetime.utcnow()}] Export cleanup complete. Deleted: {removed}")
+        
+        return {'deleted': removed}
+
+
+def enforce_retention():
+    """
+    Expire old log rows (activity, notifications, ad impressions, snapshots,
+    scheduled job runs)
+    Creates upcoming time partitions and drops/archives expired ones on
+    PostgreSQL; deletes in batches elsewhere
+    Run daily
+    """
+    with app.app_context():
+        print(f"[{datetime.utcnow()}] Enforcing data retention...")
+        
+        from utils.retention import RetentionManager
+        results = RetentionManager.run()
+        
+        for table, counts in results.items():
+            print(f"[{datetime.utcnow()}] {table}: {counts}")
+        
+        return results
+
+
 # =============================================================================
 # SCHEDULER SETUP (Using APScheduler or similar)
 # =============================================================================
@@ -423,6 +689,112 @@ def setup_scheduler():
             replace_existing=True
         )
         
+        # Reconcile deal signal scores every 15 minutes
+        scheduler.add_job(
+            update_deal_signal_scores,
+            IntervalTrigger(minutes=15),
+            id='update_deal_signals',
+            replace_existing=True
+        )
+        
+        # Refresh people suggestions for changed neighbourhoods every 15 minutes
+        scheduler.add_job(
+            refresh_people_suggestions,
+            IntervalTrigger(minutes=15),
+            id='refresh_people_suggestions',
+            replace_existing=True
+        )
+        
+        # Rebuild all people suggestions daily at 2 AM
+        scheduler.add_job(
+            rebuild_people_suggestions,
+            CronTrigger(hour=2),
+            id='rebuild_people_suggestions',
+            replace_existing=True
+        )
+        
+        # Roll up admin analytics every hour
+        scheduler.add_job(
+            update_analytics_rollups,
+            IntervalTrigger(hours=1),
+            id='update_analytics_rollups',
+            replace_existing=True
+        )
+        
+        # Reconcile analytics rollups daily at 3 AM
+        scheduler.add_job(
+            rebuild_analytics_rollups,
+            CronTrigger(hour=3),
+            id='rebuild_analytics_rollups',
+            replace_existing=True
+        )
+        
+        # Reconcile achievement counters daily at 3:30 AM
+        scheduler.add_job(
+            reconcile_achievement_counters,
+            CronTrigger(hour=3, minute=30),
+            id='reconcile_achievement_counters',
+            replace_existing=True
+        )
+        
+        # Refresh external feed widgets (each source on its own interval)
+        scheduler.add_job(
+            refresh_feed_widgets,
+            IntervalTrigger(minutes=1),
+            id='refresh_feed_widgets',
+            replace_existing=True
+        )
+        
+        # Sweep image attachments missing variants every 10 minutes
+        scheduler.add_job(
+            process_media_variants,
+            IntervalTrigger(minutes=10),
+            id='process_media_variants',
+            replace_existing=True
+        )
+        
+        # Pull new and edited Op-MedInvest articles from Ghost every 15 minutes
+        scheduler.add_job(
+            sync_ghost_articles,
+            IntervalTrigger(minutes=15),
+            id='sync_ghost_articles',
+            replace_existing=True
+        )
+        
+        # Apply any stored Stripe webhook events not yet processed every minute
+        scheduler.add_job(
+            process_webhook_inbox,
+            IntervalTrigger(minutes=1),
+            args=['stripe'],
+            id='process_stripe_webhooks',
+            replace_existing=True
+        )
+        
+        # Apply any stored Facebook webhook payloads not yet processed every minute
+        scheduler.add_job(
+            process_webhook_inbox,
+            IntervalTrigger(minutes=1),
+            args=['facebook'],
+            id='process_facebook_webhooks',
+            replace_existing=True
+        )
+        
+        # Roll time partitions and expire old log data daily at 3:30 AM
+        scheduler.add_job(
+            enforce_retention,
+            CronTrigger(hour=3, minute=30),
+            id='enforce_retention',
+            replace_existing=True
+        )
+        
+        # Delete expired background exports (they can hold personal data) hourly
+        scheduler.add_job(
+            cleanup_exports,
+            IntervalTrigger(hours=1),
+            id='cleanup_exports',
+            replace_existing=True
+        )
+        
         # Cleanup weekly on Sunday at 4 AM
         scheduler.add_job(
             cleanup_old_scores,
@@ -431,6 +803,11 @@ def setup_scheduler():
             replace_existing=True
         )
         
+        # Every worker may run this; only the elected leader fires each job,
+        # never overlapping a run still in progress, with history in job_runs
+        from utils.job_coordinator import JobCoordinator
+        JobCoordinator.coordinate(scheduler)
+        
         scheduler.start()
         print("Background scheduler started with all jobs.")
         return scheduler
@@ -472,7 +849,20 @@ if __name__ == '__main__':
         print("  snapshot_engagement - Take engagement snapshot (run hourly)")
         print("  update_trending    - Update trending hashtags (run hourly)")
         print("  decay_interests    - Decay user interests (run daily)")
+        print("  update_deal_signals - Update deal signal scores (run every 15 min)")
+        print("  rebuild_suggestions - Rebuild people you may know (run daily)")
+        print("  refresh_suggestions - Refresh changed people suggestions (run every 15 min)")
+        print("  update_analytics   - Update admin analytics rollups (run hourly)")
+        print("  backfill_analytics [days] - Rebuild analytics rollups (default 90 days)")
+        print("  reconcile_counters - Reconcile achievement counters (run daily)")
+        print("  refresh_widgets    - Refresh external feed widgets (run every minute)")
+        print("  backfill_media_variants [batch] - Generate image variants for existing uploads")
+        print("  sync_ghost [full]  - Sync Op-MedInvest articles from Ghost (run every 15 min)")
+        print("  process_webhooks [source] - Apply stored webhook events (stripe or facebook, default stripe)")
+        print("  retention          - Roll partitions and expire old log data (run daily)")
+        print("  job_history [job]  - Show recent scheduled job runs")
         print("  cleanup            - Clean old data (run weekly)")
+        print("  cleanup_exports    - Delete expired background exports (run hourly)")
         print("  run_all            - Run all jobs once")
         print("  start_scheduler    - Start background scheduler")
         sys.exit(1)
@@ -487,8 +877,34 @@ if __name__ == '__main__':
         update_trending_hashtags()
     elif command == 'decay_interests':
         decay_interests()
+    elif command == 'update_deal_signals':
+        update_deal_signal_scores()
+    elif command == 'rebuild_suggestions':
+        rebuild_people_suggestions()
+    elif command == 'refresh_suggestions':
+        refresh_people_suggestions()
+    elif command == 'update_analytics':
+        update_analytics_rollups()
+    elif command == 'backfill_analytics':
+        rebuild_analytics_rollups(int(sys.argv[2]) if len(sys.argv) > 2 else 90)
+    elif command == 'reconcile_counters':
+        reconcile_achievement_counters()
+    elif command == 'refresh_widgets':
+        refresh_feed_widgets(only_stale=False)
+    elif command == 'backfill_media_variants':
+        process_media_variants(int(sys.argv[2]) if len(sys.argv) > 2 else 200, backfill=True)
+    elif command == 'sync_ghost':
+        sync_ghost_articles(full=len(sys.argv) > 2 and sys.argv[2] == 'full')
+    elif command == 'process_webhooks':
+        process_webhook_inbox(sys.argv[2] if len(sys.argv) > 2 else 'stripe')
+    elif command == 'retention':
+        enforce_retention()
+    elif command == 'job_history':
+        show_job_history(sys.argv[2] if len(sys.argv) > 2 else None)
     elif command == 'cleanup':
         cleanup_old_scores()
+    elif command == 'cleanup_exports':
+        cleanup_exports()
     elif command == 'run_all':
         run_all_jobs()
     elif command == 'start_scheduler':
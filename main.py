@@ -3,6 +3,7 @@ import logging
 from flask import session
 from app import app, db
 from models import User
+from utils.startup import boot_checkpoint, log_boot_timings
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
 
 # Configure logging for production
@@ -30,6 +31,7 @@ def make_session_permanent():
 
 # Register Replit Auth blueprint
 app.register_blueprint(make_replit_blueprint(), url_prefix="/auth")
+boot_checkpoint('auth')
 
 # Register blueprints
 from routes.main import main_bp
@@ -103,6 +105,7 @@ app.register_blueprint(two_factor_bp)
 app.register_blueprint(moderation_bp)
 app.register_blueprint(webhook_admin_bp)
 app.register_blueprint(roles_bp)
+boot_checkpoint('blueprints')
 
 
 @app.template_filter('get_user')
@@ -130,6 +133,7 @@ def localtime_filter(dt, format_type='short'):
 
 # Import legacy routes for backwards compatibility
 import routes  # noqa: F401
+boot_checkpoint('legacy_routes')
 
 # Initialize background scheduler for hourly code reviews
 try:
@@ -137,6 +141,8 @@ try:
     init_scheduler(app)
 except Exception as e:
     logging.warning(f"Failed to initialize scheduler: {e}")
+boot_checkpoint('scheduler')
+log_boot_timings()
 
 # For deployment compatibility - Cloud Run and Gunicorn need this
 if __name__ == "__main__":
@@ -0,0 +1,35 @@
+"""Add worker lease columns to ai_jobs for concurrent workers
+
+Revision ID: add_ai_job_leases
+Revises: add_opmed_ghost_updated_at
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_ai_job_leases'
+down_revision = 'add_opmed_ghost_updated_at'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if 'ai_jobs' not in inspector.get_table_names():
+        return
+
+    columns = [col['name'] for col in inspector.get_columns('ai_jobs')]
+    if 'attempts' not in columns:
+        op.add_column('ai_jobs', sa.Column('attempts', sa.Integer(), nullable=True, server_default='0'))
+    if 'worker_id' not in columns:
+        op.add_column('ai_jobs', sa.Column('worker_id', sa.String(length=100), nullable=True))
+    if 'locked_until' not in columns:
+        op.add_column('ai_jobs', sa.Column('locked_until', sa.DateTime(), nullable=True))
+        op.create_index('ix_ai_jobs_status_locked_until', 'ai_jobs', ['status', 'locked_until'])
+
+def downgrade():
+    op.drop_index('ix_ai_jobs_status_locked_until', table_name='ai_jobs')
+    op.drop_column('ai_jobs', 'locked_until')
+    op.drop_column('ai_jobs', 'worker_id')
+    op.drop_column('ai_jobs', 'attempts')
@@ -0,0 +1,27 @@
+"""Index comments.created_at for the analytics rollup range scans
+
+Revision ID: add_comment_created_at_index
+Revises: add_job_runs
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_comment_created_at_index'
+down_revision = 'add_job_runs'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if 'comments' not in inspector.get_table_names():
+        return
+
+    indexes = [ix['name'] for ix in inspector.get_indexes('comments')]
+    if 'ix_comments_created_at' not in indexes:
+        op.create_index('ix_comments_created_at', 'comments', ['created_at'])
+
+def downgrade():
+    op.drop_index('ix_comments_created_at', table_name='comments')
@@ -0,0 +1,35 @@
+"""Add job_runs table for coordinated scheduler run history
+
+Revision ID: add_job_runs
+Revises: partition_log_tables
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_job_runs'
+down_revision = 'partition_log_tables'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if 'job_runs' not in inspector.get_table_names():
+        op.create_table('job_runs',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('job_name', sa.String(100), nullable=False),
+            sa.Column('node', sa.String(120), nullable=True),
+            sa.Column('status', sa.String(20), nullable=True),
+            sa.Column('started_at', sa.DateTime(), nullable=True),
+            sa.Column('finished_at', sa.DateTime(), nullable=True),
+            sa.Column('duration_ms', sa.Integer(), nullable=True),
+            sa.Column('error', sa.Text(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_job_runs_job_started', 'job_runs', ['job_name', 'started_at'])
+
+def downgrade():
+    op.drop_index('ix_job_runs_job_started', table_name='job_runs')
+    op.drop_table('job_runs')
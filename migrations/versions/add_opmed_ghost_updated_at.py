@@ -0,0 +1,29 @@
+"""Add ghost_updated_at to opmed_articles for incremental Ghost sync
+
+Revision ID: add_opmed_ghost_updated_at
+Revises: add_post_media_variants
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_opmed_ghost_updated_at'
+down_revision = 'add_post_media_variants'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if 'opmed_articles' not in inspector.get_table_names():
+        return
+
+    columns = [col['name'] for col in inspector.get_columns('opmed_articles')]
+    if 'ghost_updated_at' not in columns:
+        op.add_column('opmed_articles', sa.Column('ghost_updated_at', sa.DateTime(), nullable=True))
+        op.create_index('ix_opmed_articles_ghost_updated_at', 'opmed_articles', ['ghost_updated_at'])
+
+def downgrade():
+    op.drop_index('ix_opmed_articles_ghost_updated_at', table_name='opmed_articles')
+    op.drop_column('opmed_articles', 'ghost_updated_at')
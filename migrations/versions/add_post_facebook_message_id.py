@@ -0,0 +1,29 @@
+"""Add facebook_message_id to posts so retried Messenger batches post once
+
+Revision ID: add_post_facebook_message_id
+Revises: add_suggestion_dirty_users
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_post_facebook_message_id'
+down_revision = 'add_suggestion_dirty_users'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if 'posts' not in inspector.get_table_names():
+        return
+
+    columns = [col['name'] for col in inspector.get_columns('posts')]
+    if 'facebook_message_id' not in columns:
+        op.add_column('posts', sa.Column('facebook_message_id', sa.String(length=100), nullable=True))
+        op.create_index('ix_posts_facebook_message_id', 'posts', ['facebook_message_id'], unique=True)
+
+def downgrade():
+    op.drop_index('ix_posts_facebook_message_id', table_name='posts')
+    op.drop_column('posts', 'facebook_message_id')
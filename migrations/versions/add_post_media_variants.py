@@ -0,0 +1,27 @@
+"""Add variants_json to post_media for resized/WebP image derivatives
+
+Revision ID: add_post_media_variants
+Revises: add_user_points_period_keys
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_post_media_variants'
+down_revision = 'add_user_points_period_keys'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if 'post_media' not in inspector.get_table_names():
+        return
+
+    columns = [col['name'] for col in inspector.get_columns('post_media')]
+    if 'variants_json' not in columns:
+        op.add_column('post_media', sa.Column('variants_json', sa.Text(), nullable=True))
+
+def downgrade():
+    op.drop_column('post_media', 'variants_json')
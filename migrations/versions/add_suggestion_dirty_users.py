@@ -0,0 +1,27 @@
+"""Add suggestion_dirty_users table, the shared dirty set without Redis
+
+Revision ID: add_suggestion_dirty_users
+Revises: add_comment_created_at_index
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_suggestion_dirty_users'
+down_revision = 'add_comment_created_at_index'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if 'suggestion_dirty_users' not in inspector.get_table_names():
+        op.create_table('suggestion_dirty_users',
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('marked_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('user_id')
+        )
+
+def downgrade():
+    op.drop_table('suggestion_dirty_users')
@@ -0,0 +1,41 @@
+"""Add week_key/month_key to user_points for lazy period resets
+
+Revision ID: add_user_points_period_keys
+Revises: add_doctor_invite
+Create Date: 2026-10-18
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_user_points_period_keys'
+down_revision = 'add_doctor_invite'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if 'user_points' not in inspector.get_table_names():
+        return
+
+    columns = [col['name'] for col in inspector.get_columns('user_points')]
+    if 'week_key' not in columns:
+        op.add_column('user_points', sa.Column('week_key', sa.String(10), nullable=True))
+    if 'month_key' not in columns:
+        op.add_column('user_points', sa.Column('month_key', sa.String(7), nullable=True))
+
+    # Existing totals belong to the current period; left NULL they would drop
+    # off the weekly/monthly boards and be zeroed by the next award
+    now = datetime.utcnow()
+    year, week, _ = now.isocalendar()
+    conn.execute(sa.text("UPDATE user_points SET week_key = :key WHERE week_key IS NULL"),
+                 {'key': f'{year}-W{week:02d}'})
+    conn.execute(sa.text("UPDATE user_points SET month_key = :key WHERE month_key IS NULL"),
+                 {'key': now.strftime('%Y-%m')})
+
+def downgrade():
+    op.drop_column('user_points', 'month_key')
+    op.drop_column('user_points', 'week_key')
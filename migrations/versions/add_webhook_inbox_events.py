@@ -0,0 +1,40 @@
+"""Add webhook_inbox_events table for asynchronous webhook processing
+
+Revision ID: add_webhook_inbox_events
+Revises: add_ai_job_leases
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_webhook_inbox_events'
+down_revision = 'add_ai_job_leases'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if 'webhook_inbox_events' not in inspector.get_table_names():
+        op.create_table('webhook_inbox_events',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('source', sa.String(30), nullable=False),
+            sa.Column('external_id', sa.String(120), nullable=False),
+            sa.Column('event_type', sa.String(100), nullable=True),
+            sa.Column('ordering_key', sa.String(120), nullable=True),
+            sa.Column('event_created', sa.Integer(), nullable=True),
+            sa.Column('payload', sa.Text(), nullable=False),
+            sa.Column('status', sa.String(20), nullable=True),
+            sa.Column('attempts', sa.Integer(), nullable=True),
+            sa.Column('error', sa.Text(), nullable=True),
+            sa.Column('received_at', sa.DateTime(), nullable=True),
+            sa.Column('processed_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('source', 'external_id', name='uq_webhook_inbox_source_external_id')
+        )
+        op.create_index('ix_webhook_inbox_pending', 'webhook_inbox_events', ['source', 'status', 'event_created'])
+
+def downgrade():
+    op.drop_index('ix_webhook_inbox_pending', table_name='webhook_inbox_events')
+    op.drop_table('webhook_inbox_events')
@@ -0,0 +1,113 @@
+"""Range-partition the high-volume log tables by time (PostgreSQL only)
+
+Revision ID: partition_log_tables
+Revises: add_webhook_inbox_events
+Create Date: 2026-10-18
+
+"""
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'partition_log_tables'
+down_revision = 'add_webhook_inbox_events'
+branch_labels = None
+depends_on = None
+
+# Frozen at the time of this revision: (table, partition column, granularity, premade partitions)
+TABLES = (
+    ('user_activity', 'created_at', 'month', 2),
+    ('notifications', 'created_at', 'month', 2),
+    ('ad_impressions', 'created_at', 'month', 2),
+    ('engagement_snapshots', 'snapshot_hour', 'day', 3),
+)
+
+def upgrade():
+    conn = op.get_bind()
+    if conn.dialect.name != 'postgresql':
+        return  # SQLite keeps plain tables; RetentionManager deletes in batches
+
+    inspector = sa.inspect(conn)
+    tables = inspector.get_table_names()
+    for table, column, granularity, premake in TABLES:
+        if table in tables and not _is_partitioned(conn, table):
+            _convert(conn, table, column, granularity, premake)
+
+def downgrade():
+    # Partitioned tables keep working as ordinary tables for the app;
+    # un-partitioning would mean copying every row, so it is left manual
+    pass
+
+
+def _convert(conn, table, column, granularity, premake):
+    """
+    Attach the existing table unchanged as "<table>_legacy", covering
+    everything up to the end of the current period (no data is copied).
+    The primary key becomes (id, column), as PostgreSQL requires the
+    partition key in every unique constraint.
+    """
+    text = sa.text
+    legacy = f'{table}_legacy'
+    boundary = _next_period(_period_start(datetime.utcnow(), granularity), granularity)
+
+    foreign_keys = conn.execute(text(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = CAST(:table AS regclass) AND contype = 'f'"
+    ), {'table': table}).all()
+
+    conn.execute(text(f'UPDATE {table} SET {column} = now() WHERE {column} IS NULL'))
+    conn.execute(text(f'ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL'))
+    conn.execute(text(f'ALTER TABLE {table} DROP CONSTRAINT {table}_pkey'))
+    conn.execute(text(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, {column})'))
+    for name, _ in foreign_keys:
+        conn.execute(text(f'ALTER TABLE {table} DROP CONSTRAINT {name}'))
+    conn.execute(text(f'ALTER TABLE {table} RENAME CONSTRAINT {table}_pkey TO {legacy}_pkey'))
+    conn.execute(text(f'ALTER TABLE {table} RENAME TO {legacy}'))
+
+    conn.execute(text(
+        f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING INDEXES) '
+        f'PARTITION BY RANGE ({column})'
+    ))
+    conn.execute(text(f'ALTER SEQUENCE IF EXISTS {table}_id_seq OWNED BY {table}.id'))
+    # Bounds the legacy partition so it can be attached without a full scan
+    conn.execute(text(
+        f"ALTER TABLE {legacy} ADD CONSTRAINT {legacy}_bound CHECK ({column} < '{boundary.isoformat(' ')}')"
+    ))
+    conn.execute(text(
+        f"ALTER TABLE {table} ATTACH PARTITION {legacy} FOR VALUES FROM (MINVALUE) TO ('{boundary.isoformat(' ')}')"
+    ))
+    conn.execute(text(f'ALTER TABLE {legacy} DROP CONSTRAINT {legacy}_bound'))
+    for name, definition in foreign_keys:
+        conn.execute(text(f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition}'))
+
+    start = boundary
+    for _ in range(premake):
+        end = _next_period(start, granularity)
+        name = f"{table}_p{start.strftime('%Y%m%d' if granularity == 'day' else '%Y%m')}"
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{start.isoformat(' ')}') TO ('{end.isoformat(' ')}')"
+        ))
+        start = end
+    # Catches rows outside every range if maintenance falls behind
+    conn.execute(text(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT'))
+
+
+def _is_partitioned(conn, table):
+    kind = conn.execute(sa.text(
+        "SELECT c.relkind FROM pg_class c "
+        "WHERE c.relname = :table AND c.relnamespace = 'public'::regnamespace"
+    ), {'table': table}).scalar()
+    return kind == 'p'
+
+
+def _period_start(moment, granularity):
+    start = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return start if granularity == 'day' else start.replace(day=1)
+
+
+def _next_period(start, granularity):
+    if granularity == 'day':
+        return start + timedelta(days=1)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
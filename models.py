@@ -423,6 +423,7 @@ class Post(db.Model):
     media_count = db.Column(db.Integer, default=0)
     is_pinned = db.Column(db.Boolean, default=False)
     facebook_post_id = db.Column(db.String(100), unique=True, nullable=True)  # For FB sync deduplication
+    facebook_message_id = db.Column(db.String(100), unique=True, nullable=True)  # Messenger mid, posted once
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -501,9 +502,36 @@ class PostMedia(db.Model):
     
     order_index = db.Column(db.Integer, default=0)  # For carousel ordering
     
+    # Resized/WebP derivatives generated by utils/image_variants.py (JSON list)
+    variants_json = db.Column(db.Text)
+    
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     post = db.relationship('Post', back_populates='media')
+    
+    @property
+    def variants(self):
+        import json
+        try:
+            return json.loads(self.variants_json) if self.variants_json else []
+        except ValueError:
+            return []
+    
+    def variant_url(self, width=640, fmt='webp'):
+        """Smallest derivative at least `width` wide, else the largest; original if none"""
+        candidates = sorted((v for v in self.variants if v.get('format') == fmt),
+                            key=lambda v: v['width'])
+        if not candidates:
+            return self.file_path
+        for variant in candidates:
+            if variant['width'] >= width:
+                return variant['url']
+        return candidates[-1]['url']
+    
+    def srcset(self, fmt='webp'):
+        """srcset attribute value for responsive <img> tags"""
+        return ', '.join(f"{v['url']} {v['width']}w" for v in
+                         sorted(self.variants, key=lambda v: v['width']) if v.get('format') == fmt)
 
 
 class Comment(db.Model):
@@ -515,7 +543,7 @@ class Comment(db.Model):
     parent_id = db.Column(db.Integer, db.ForeignKey('comments.id'))
     content = db.Column(db.Text, nullable=False)
     is_anonymous = db.Column(db.Boolean, default=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
@@ -554,6 +582,7 @@ class Follow(db.Model):
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
+    # Time-partitioned on PostgreSQL; expiry in utils/retention.py
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -819,6 +848,31 @@ class DealAnalysis(db.Model):
     created_by = db.relationship('User', foreign_keys=[created_by_id])
 
 
+class DealSignalScore(db.Model):
+    """Materialized deal signal inputs for trending deal lists.
+
+    rank_key orders deals by their time-decayed signal score without
+    changing as time passes, so trending pages are keyset queries on it.
+    """
+
+    __tablename__ = 'deal_signal_scores'
+
+    id = db.Column(db.Integer, primary_key=True)
+    deal_id = db.Column(db.Integer, db.ForeignKey('deal_details.id'), nullable=False, unique=True)
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id'), index=True)
+
+    endorsement_count = db.Column(db.Integer, default=0)
+    comment_count = db.Column(db.Integer, default=0)
+    author_reputation = db.Column(db.Integer, default=0)
+    raw_score = db.Column(db.Float, default=0.0)
+    rank_key = db.Column(db.Float, nullable=False, index=True)
+
+    deal_created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    deal = db.relationship('DealDetails', backref=db.backref('signal_score', uselist=False, cascade='all, delete-orphan'))
+
+
 class AiJob(db.Model):
     """DB-backed job queue for AI tasks.
 
@@ -847,6 +901,11 @@ class AiJob(db.Model):
     started_at = db.Column(db.DateTime)
     finished_at = db.Column(db.DateTime)
 
+    # Worker lease: a running job whose lease lapses is requeued (visibility timeout)
+    attempts = db.Column(db.Integer, default=0)
+    worker_id = db.Column(db.String(100))
+    locked_until = db.Column(db.DateTime)
+
     created_by = db.relationship('User', foreign_keys=[created_by_id])
     post = db.relationship('Post', foreign_keys=[post_id])
     deal = db.relationship('DealDetails', foreign_keys=[deal_id])
@@ -855,6 +914,7 @@ class AiJob(db.Model):
 class UserActivity(db.Model):
     """Lightweight activity log for accurate WAU/DAU and cohort analytics."""
     __tablename__ = 'user_activity'
+    # Time-partitioned on PostgreSQL; expiry in utils/retention.py
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
@@ -866,6 +926,60 @@ class UserActivity(db.Model):
     user = db.relationship('User', foreign_keys=[user_id])
 
 
+class UserActivityDaily(db.Model):
+    """Per-user, per-day activity facts rolled up for admin analytics."""
+    __tablename__ = 'user_activity_daily'
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+
+    # Dimensions copied from the user at rollup time
+    is_verified = db.Column(db.Boolean, default=False)
+    specialty = db.Column(db.String(100))
+    invite_source = db.Column(db.String(10))  # admin, peer
+
+    seen = db.Column(db.Boolean, default=False)  # last_seen fell on this day
+    posts = db.Column(db.Integer, default=0)
+    comments = db.Column(db.Integer, default=0)
+    deal_posts = db.Column(db.Integer, default=0)
+    deal_comments = db.Column(db.Integer, default=0)
+    activity_events = db.Column(db.Integer, default=0)  # user_activity rows
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('day', 'user_id', name='unique_user_activity_day'),
+    )
+
+
+class UserLifecycleFact(db.Model):
+    """Per-user verification and activation milestones for cohort analytics."""
+    __tablename__ = 'user_lifecycle_facts'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    specialty = db.Column(db.String(100))
+    invite_source = db.Column(db.String(10))  # admin, peer
+    is_verified = db.Column(db.Boolean, default=False)  # verification_status == 'verified'
+
+    verification_submitted_at = db.Column(db.DateTime)
+    verified_at = db.Column(db.DateTime, index=True)
+    first_action_at = db.Column(db.DateTime)  # first post or comment
+    first_deal_post_at = db.Column(db.DateTime)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class AnalyticsSnapshot(db.Model):
+    """Named analytics rollup payload (percentile sketches, cohort tables, counters)."""
+    __tablename__ = 'analytics_snapshots'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    payload = db.Column(db.Text)  # JSON
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
 class NotificationPreference(db.Model):
     """User notification preferences for different channels"""
     __tablename__ = 'notification_preferences'
@@ -1816,6 +1930,23 @@ class UserAchievement(db.Model):
     __table_args__ = (db.UniqueConstraint('user_id', 'achievement_id', name='unique_user_achievement'),)
 
 
+class UserCounter(db.Model):
+    """Incrementally maintained per-user counters for achievements and the dashboard"""
+    __tablename__ = 'user_counters'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    posts = db.Column(db.Integer, default=0, nullable=False)
+    followers = db.Column(db.Integer, default=0, nullable=False)
+    following = db.Column(db.Integer, default=0, nullable=False)
+    deal_interests = db.Column(db.Integer, default=0, nullable=False)
+    course_enrollments = db.Column(db.Integer, default=0, nullable=False)
+    likes_received = db.Column(db.Integer, default=0, nullable=False)
+    comments_received = db.Column(db.Integer, default=0, nullable=False)
+    login_streak = db.Column(db.Integer, default=0, nullable=False)
+    reconciled_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class UserPoints(db.Model):
     """Track user points and levels"""
     __tablename__ = 'user_points'
@@ -1826,6 +1957,8 @@ class UserPoints(db.Model):
     level = db.Column(db.Integer, default=1)
     weekly_points = db.Column(db.Integer, default=0)
     monthly_points = db.Column(db.Integer, default=0)
+    week_key = db.Column(db.String(10))  # ISO week weekly_points belongs to, e.g. 2026-W07
+    month_key = db.Column(db.String(7))  # month monthly_points belongs to, e.g. 2026-02
     streak_days = db.Column(db.Integer, default=0)
     last_activity_date = db.Column(db.Date)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1966,6 +2099,7 @@ class AdCreative(db.Model):
 class AdImpression(db.Model):
     """Track ad impressions"""
     __tablename__ = 'ad_impressions'
+    # Time-partitioned on PostgreSQL; expiry in utils/retention.py
     
     id = db.Column(db.Integer, primary_key=True)
     creative_id = db.Column(db.Integer, db.ForeignKey('ad_creatives.id'), nullable=False, index=True)
@@ -2079,6 +2213,35 @@ class UserFeedPreference(db.Model):
     user = db.relationship('User', backref=db.backref('feed_preferences', uselist=False))
 
 
+class PeopleSuggestion(db.Model):
+    """Pre-calculated people-you-may-know suggestions (top N per user)"""
+    __tablename__ = 'people_suggestions'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    suggested_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+
+    rank = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float, default=0.0)
+    mutual_count = db.Column(db.Integer, default=0)
+
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'suggested_user_id', name='unique_people_suggestion'),
+        db.Index('idx_people_suggestion_rank', 'user_id', 'rank'),
+    )
+
+
+class SuggestionDirtyUser(db.Model):
+    """Users whose follow/connection neighbourhood changed since the last suggestion refresh
+    (shared dirty set when there is no Redis)"""
+    __tablename__ = 'suggestion_dirty_users'
+
+    user_id = db.Column(db.Integer, primary_key=True)
+    marked_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
 # =============================================================================
 # PROFILE ENHANCEMENT MODELS
 # =============================================================================
@@ -2145,6 +2308,7 @@ class Recommendation(db.Model):
 class EngagementSnapshot(db.Model):
     """Hourly snapshots of post engagement for velocity calculation"""
     __tablename__ = 'engagement_snapshots'
+    # Time-partitioned on PostgreSQL; expiry in utils/retention.py
     
     id = db.Column(db.Integer, primary_key=True)
     post_id = db.Column(db.Integer, db.ForeignKey('posts.id'), nullable=False, index=True)
@@ -2180,6 +2344,7 @@ class OpMedArticle(db.Model):
     
     # Ghost integration
     ghost_id = db.Column(db.String(100), unique=True, index=True)  # Ghost post ID for syncing
+    ghost_updated_at = db.Column(db.DateTime, index=True)  # Ghost's updated_at (sync high-water mark)
     
     # Media
     cover_image_url = db.Column(db.String(500))
@@ -2726,6 +2891,48 @@ class WebhookDelivery(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
+class WebhookInboxEvent(db.Model):
+    """Inbound webhook payloads persisted on receipt and applied by a background consumer"""
+    __tablename__ = 'webhook_inbox_events'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(30), nullable=False)  # stripe, facebook
+    external_id = db.Column(db.String(120), nullable=False)  # provider event ID (dedup key)
+    event_type = db.Column(db.String(100))
+    ordering_key = db.Column(db.String(120))  # events sharing a key are applied in order (e.g. Stripe customer)
+    event_created = db.Column(db.Integer)  # provider timestamp (epoch seconds)
+    payload = db.Column(db.Text, nullable=False)
+    
+    status = db.Column(db.String(20), default='pending')  # pending, processed, failed
+    attempts = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        db.UniqueConstraint('source', 'external_id', name='uq_webhook_inbox_source_external_id'),
+        db.Index('ix_webhook_inbox_pending', 'source', 'status', 'event_created'),
+    )
+
+
+class JobRun(db.Model):
+    """One execution (or skip) of a scheduled job, recorded by the job coordinator"""
+    __tablename__ = 'job_runs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_name = db.Column(db.String(100), nullable=False)
+    node = db.Column(db.String(120))  # host:pid that ran (or skipped) the job
+    status = db.Column(db.String(20), default='running')  # running, succeeded, failed, skipped
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    duration_ms = db.Column(db.Integer)
+    error = db.Column(db.Text)
+    
+    __table_args__ = (
+        db.Index('ix_job_runs_job_started', 'job_name', 'started_at'),
+    )
+
+
 class CustomRole(db.Model):
     """Custom user roles with configurable permissions"""
     __tablename__ = 'custom_roles'
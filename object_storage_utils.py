@@ -3,25 +3,33 @@ Object Storage Utilities - Handle persistent file storage using Replit Object St
 """
 import os
 import logging
+import importlib.util
 from io import BytesIO
 
+from utils.startup import LazyClient
+
+# Checked without importing; the SDK itself loads with the first client
 try:
-    from replit.object_storage import Client
-    OBJECT_STORAGE_AVAILABLE = True
+    OBJECT_STORAGE_AVAILABLE = importlib.util.find_spec('replit.object_storage') is not None
 except ImportError:
     OBJECT_STORAGE_AVAILABLE = False
+if not OBJECT_STORAGE_AVAILABLE:
     logging.warning("Replit Object Storage not available, falling back to local storage")
 
 
+def _build_storage_client():
+    from replit.object_storage import Client
+    return Client()
+
+
+_storage_client = LazyClient(_build_storage_client)
+
+
 def get_storage_client():
-    """Get the Object Storage client"""
+    """Get the Object Storage client (built once per process)"""
     if not OBJECT_STORAGE_AVAILABLE:
         return None
-    try:
-        return Client()
-    except Exception as e:
-        logging.error(f"Failed to initialize Object Storage client: {e}")
-        return None
+    return _storage_client.get()
 
 
 def upload_file(file_data, object_path):
@@ -55,6 +63,34 @@ def upload_file(file_data, object_path):
     return False
 
 
+def upload_file_from_path(local_path, object_path, skip_existing=True):
+    """
+    Upload a local file to Object Storage, streamed from disk
+
+    Args:
+        local_path: File on local disk
+        object_path: Path in object storage
+        skip_existing: Don't re-upload content-addressed objects that already exist
+
+    Returns:
+        bool: True if the object is in storage afterwards, False otherwise
+    """
+    client = get_storage_client()
+
+    if client:
+        try:
+            if skip_existing and client.exists(object_path):
+                return True
+            client.upload_from_filename(object_path, local_path)
+            logging.info(f"Uploaded to Object Storage: {object_path}")
+            return True
+        except Exception as e:
+            logging.error(f"Failed to upload to Object Storage: {e}")
+            return False
+
+    return False
+
+
 def download_file(object_path):
     """
     Download a file from Object Storage
@@ -78,6 +114,34 @@ def download_file(object_path):
     return None
 
 
+def download_to_path(object_path, dest_path):
+    """
+    Stream a file from Object Storage to a local path without holding it in memory
+
+    Args:
+        object_path: Path in object storage
+        dest_path: Local file to write; replaced atomically on success
+
+    Returns:
+        bool: True if downloaded, False if not found or unavailable
+    """
+    client = get_storage_client()
+
+    if client:
+        tmp_path = f"{dest_path}.{os.getpid()}.part"
+        try:
+            client.download_to_filename(object_path, tmp_path)
+            os.replace(tmp_path, dest_path)
+            return True
+        except Exception as e:
+            logging.debug(f"Object not found in storage: {object_path} ({e})")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+    return False
+
+
 def delete_file(object_path):
     """
     Delete a file from Object Storage
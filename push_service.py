@@ -5,7 +5,6 @@ import os
 import logging
 import json
 from threading import Thread
-from pywebpush import webpush, WebPushException
 
 VAPID_PRIVATE_KEY = os.environ.get('VAPID_PRIVATE_KEY', '').strip().replace('\\n', '').replace('\n', '')
 VAPID_PUBLIC_KEY = os.environ.get('VAPID_PUBLIC_KEY', '').strip().replace('\\n', '').replace('\n', '')
@@ -21,6 +20,9 @@ def send_push_notification(subscription, title, body, url='/', icon=None, image=
         logging.debug("VAPID keys not configured, skipping push notification")
         return False
     
+    # Imported on first send; pywebpush pulls in aiohttp and crypto at import
+    from pywebpush import webpush, WebPushException
+    
     try:
         subscription_info = {
             "endpoint": subscription.endpoint,
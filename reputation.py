@@ -4,6 +4,7 @@ import json
 from typing import Any, Optional
 
 from app import db
+from deal_signals import bump_deal_signal
 from models import ReputationEvent, User
 
 
@@ -44,4 +45,8 @@ def record_reputation_event(
     # Update cached score (fast read path)
     user.reputation_score = int(user.reputation_score or 0) + int(weight)
     db.session.add(user)
+
+    # Deal endorsements feed the materialized trending score
+    if event_type == "post_upvote":
+        bump_deal_signal(related_post_id, endorsements=1)
     return ev
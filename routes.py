@@ -2,7 +2,7 @@ from flask import render_template, request, redirect, url_for, flash, session, j
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.security import check_password_hash
 from app import app, db
-from models import User, Module, UserProgress, ForumTopic, ForumPost, PortfolioTransaction, Resource, Post, Comment, Like, Follow, Notification, Group, GroupMembership, Connection, DealDetails, DealAnalysis, AiJob, ReputationEvent, Invite, Digest, DigestItem, UserActivity, Alert, ExpertAMA, AMAQuestion, AMARegistration, InvestmentDeal, DealInterest, Mentorship, MentorshipSession, Course, CourseModule, CourseEnrollment, Event, EventSession, EventRegistration, Referral, Subscription, Payment, VerificationQueueEntry, OnboardingPrompt, UserPromptDismissal, InviteCreditEvent, CohortNorm, ModerationEvent, ContentReport, DealOutcome, SponsorProfile, SponsorReview, InvestmentRoom, RoomMembership, Hashtag, PostHashtag, Achievement, UserAchievement, UserPoints, PointTransaction, AdAdvertiser, AdCampaign, AdCreative, AdImpression, AdClick
+from models import User, Module, UserProgress, ForumTopic, ForumPost, PortfolioTransaction, Resource, Post, Comment, Like, Follow, Notification, Group, GroupMembership, Connection, DealDetails, DealAnalysis, AiJob, ReputationEvent, Invite, Digest, DigestItem, UserActivity, Alert, ExpertAMA, AMAQuestion, AMARegistration, InvestmentDeal, DealInterest, Mentorship, MentorshipSession, Course, CourseModule, CourseEnrollment, Event, EventSession, EventRegistration, Referral, Subscription, Payment, VerificationQueueEntry, OnboardingPrompt, UserPromptDismissal, InviteCreditEvent, CohortNorm, ModerationEvent, ContentReport, DealOutcome, SponsorProfile, SponsorReview, InvestmentRoom, RoomMembership, Hashtag, PostHashtag, Achievement, UserAchievement, UserPoints, PointTransaction, AdAdvertiser, AdCampaign, AdCreative, AdImpression, AdClick, DealSignalScore
 import hmac
 import hashlib
 from datetime import datetime, timedelta
@@ -22,6 +22,10 @@ from access_control import require_verified, require_roles
 from ai_service import summarize_text, analyze_deal
 from authorization import can, Actions, deny_response
 from ai_jobs import enqueue_ai_job, process_job
+from utils.social_graph import SocialGraph
+from utils.achievements import increment_counters
+from utils.ad_server import AdServer
+from deal_signals import bump_deal_signal, decayed_score, raw_signal, refresh_deal_signals
 
 
 def get_sendgrid_credentials():
@@ -683,6 +687,7 @@ def create_post():
             if room:
                 room.post_count = (room.post_count or 0) + 1
         
+        increment_counters(current_user.id, posts=1)
         db.session.commit()
         flash('Post created successfully!', 'success')
     except Exception as e:
@@ -766,6 +771,8 @@ def comment_post(post_id):
     
     try:
         db.session.add(comment)
+        bump_deal_signal(post_id, comments=1)
+        increment_counters(post.author_id, comments_received=1)
         db.session.commit()
         flash('Comment added successfully!', 'success')
     except Exception as e:
@@ -802,8 +809,16 @@ def follow_user(user_id):
         notification.message = f'{current_user.full_name} started following you'
         db.session.add(notification)
     
+    delta = 1 if action == 'followed' else -1
+    increment_counters(user_id, followers=delta)
+    increment_counters(current_user.id, following=delta)
+    
     try:
         db.session.commit()
+        if action == 'followed':
+            SocialGraph.on_follow(current_user.id, user_id)
+        else:
+            SocialGraph.on_unfollow(current_user.id, user_id)
         return jsonify({
             'success': True, 
             'action': action,
@@ -1516,6 +1531,9 @@ def deal_wizard_submit():
         status='open'
     )
     db.session.add(deal)
+    db.session.flush()
+    refresh_deal_signals([deal.id], commit=False)
+    increment_counters(current_user.id, posts=1)
     db.session.commit()
     
     try:
@@ -1574,17 +1592,14 @@ def _exp_decay(age_days: float, halflife_days: float = 7.0) -> float:
 
 
 def compute_deal_signal_score(deal: DealDetails) -> float:
+    """Live signal score for one deal (trending lists read DealSignalScore instead)."""
     post = Post.query.get(deal.post_id)
     endorsements = ReputationEvent.query.filter_by(related_post_id=deal.post_id, event_type='post_upvote').count()
     comment_count = Comment.query.filter_by(post_id=deal.post_id).count()
     author_rep = 0
     if post and post.author:
         author_rep = int(post.author.reputation_score or 0)
-    age_days = 0.0
-    if deal.created_at:
-        age_days = (datetime.utcnow() - deal.created_at).total_seconds() / 86400.0
-    score = (10.0 * endorsements) + (2.0 * comment_count) + (0.1 * author_rep)
-    return float(score) * _exp_decay(age_days, 7.0)
+    return decayed_score(raw_signal(endorsements, comment_count, author_rep), deal.created_at)
 
 
 def compute_comment_impact_score(c: Comment) -> float:
@@ -1608,14 +1623,38 @@ def api_deals():
         status = (request.args.get('status') or '').strip() or None
         sort = (request.args.get('sort') or '').strip() or 'new'
 
-        q = DealDetails.query
         if sort == 'trending':
-            deals = q.all()
-            scored = [(d, compute_deal_signal_score(d)) for d in deals]
-            scored.sort(key=lambda x: x[1], reverse=True)
-            offset = int(request.args.get('offset') or 0)
-            limit = int(request.args.get('limit') or 25)
-            scored_page = scored[offset:offset+limit]
+            # Keyset pagination over materialized scores (see deal_signals.rank_key);
+            # `cursor` is the next_cursor of the previous page, `offset` is still accepted
+            try:
+                limit = max(1, min(int(request.args.get('limit') or 25), 100))
+                offset = max(0, int(request.args.get('offset') or 0))
+            except ValueError:
+                return jsonify({'error': 'invalid_limit'}), 400
+            q = db.session.query(DealDetails, DealSignalScore).join(
+                DealSignalScore, DealSignalScore.deal_id == DealDetails.id
+            )
+            cursor = (request.args.get('cursor') or '').strip()
+            if cursor:
+                try:
+                    cursor_key, cursor_id = cursor.rsplit(':', 1)
+                    cursor_key, cursor_id = float(cursor_key), int(cursor_id)
+                except ValueError:
+                    return jsonify({'error': 'invalid_cursor'}), 400
+                q = q.filter(db.or_(
+                    DealSignalScore.rank_key < cursor_key,
+                    db.and_(DealSignalScore.rank_key == cursor_key, DealDetails.id < cursor_id),
+                ))
+            q = q.order_by(DealSignalScore.rank_key.desc(), DealDetails.id.desc())
+            if offset and not cursor:
+                q = q.offset(offset)
+            page = q.limit(limit).all()
+
+            now = datetime.utcnow()
+            next_cursor = None
+            if page and len(page) == limit:
+                last_deal, last_score = page[-1]
+                next_cursor = f'{last_score.rank_key!r}:{last_deal.id}'
             return jsonify({'results': [
                 {
                     'id': d.id,
@@ -1627,10 +1666,11 @@ def api_deals():
                     'thesis': d.thesis,
                     'status': d.status,
                     'created_at': d.created_at.isoformat() if d.created_at else None,
-                    'signal_score': s,
-                } for d, s in scored_page
-            ]}), 200
+                    'signal_score': decayed_score(s.raw_score, s.deal_created_at, now),
+                } for d, s in page
+            ], 'next_cursor': next_cursor}), 200
 
+        q = db.session.query(DealDetails, Post.content).outerjoin(Post, Post.id == DealDetails.post_id)
         if asset_class:
             q = q.filter(DealDetails.asset_class == asset_class)
         if status:
@@ -1638,8 +1678,7 @@ def api_deals():
         deals = q.order_by(DealDetails.created_at.desc()).limit(50).all()
 
         out = []
-        for d in deals:
-            p = Post.query.get(d.post_id) if d.post_id else None
+        for d, post_content in deals:
             out.append({
                 'deal_id': d.id,
                 'post_id': d.post_id,
@@ -1653,7 +1692,7 @@ def api_deals():
                 'sponsor_name': d.sponsor_name,
                 'status': d.status,
                 'thesis': d.thesis,
-                'post_content': (p.content if p else None),
+                'post_content': post_content,
                 'created_at': d.created_at.isoformat() if d.created_at else None,
             })
         return jsonify({'deals': out}), 200
@@ -1722,6 +1761,9 @@ def api_deals():
         status=status,
     )
     db.session.add(deal)
+    db.session.flush()
+    refresh_deal_signals([deal.id], commit=False)
+    increment_counters(current_user.id, posts=1)
     db.session.commit()
     return jsonify({'status': 'created', 'deal_id': deal.id, 'post_id': post.id}), 201
 
@@ -1848,10 +1890,12 @@ def generate_weekly_digest(period_days: int = 7) -> Digest:
     end = datetime.utcnow()
     start = end - timedelta(days=period_days)
 
-    deals = DealDetails.query.filter(DealDetails.created_at >= start).all()
-    deal_scored = [(d, compute_deal_signal_score(d)) for d in deals]
-    deal_scored.sort(key=lambda x: x[1], reverse=True)
-    top_deals = deal_scored[:3]
+    top_deal_rows = db.session.query(DealDetails, DealSignalScore).join(
+        DealSignalScore, DealSignalScore.deal_id == DealDetails.id
+    ).filter(DealDetails.created_at >= start).order_by(
+        DealSignalScore.rank_key.desc(), DealDetails.id.desc()
+    ).limit(3).all()
+    top_deals = [(d, decayed_score(s.raw_score, s.deal_created_at, end)) for d, s in top_deal_rows]
 
     comments = Comment.query.filter(Comment.created_at >= start).all()
     comment_scored = [(c, compute_comment_impact_score(c)) for c in comments]
@@ -1930,79 +1974,20 @@ def admin_analytics():
 @require_roles('admin')
 def api_admin_analytics_overview():
     from sqlalchemy import text
-    
-    now = datetime.utcnow()
-    window_start = now - timedelta(days=7)
-
-    # 1) Verified WAU - unique verified physicians active in last 7 days
-    # Active = post, comment, or last_seen
-    verified_wau_result = db.session.execute(text("""
-        SELECT COUNT(DISTINCT u.id)
-        FROM users u
-        LEFT JOIN posts p ON p.author_id = u.id AND p.created_at >= :start
-        LEFT JOIN comments c ON c.author_id = u.id AND c.created_at >= :start
-        WHERE u.verification_status = 'verified'
-          AND (
-            u.last_seen >= :start
-            OR p.id IS NOT NULL
-            OR c.id IS NOT NULL
-          )
-    """), {"start": window_start})
-    verified_wau = verified_wau_result.scalar() or 0
-
-    # 2) Deal WAU - verified physicians who created or commented on a deal in last 7 days
-    deal_wau_result = db.session.execute(text("""
-        SELECT COUNT(DISTINCT u.id)
-        FROM users u
-        LEFT JOIN posts p ON p.author_id = u.id AND p.post_type = 'deal' AND p.created_at >= :start
-        LEFT JOIN comments c ON c.author_id = u.id AND c.created_at >= :start
-        LEFT JOIN posts cp ON cp.id = c.post_id AND cp.post_type = 'deal'
-        WHERE u.verification_status = 'verified'
-          AND (
-            p.id IS NOT NULL
-            OR cp.id IS NOT NULL
-          )
-    """), {"start": window_start})
-    deal_wau = deal_wau_result.scalar() or 0
-
-    # 3) Time to First Value (p50) - median hours from verified_at to first post/comment
-    ttfv_result = db.session.execute(text("""
-        SELECT
-          PERCENTILE_CONT(0.5)
-          WITHIN GROUP (ORDER BY EXTRACT(EPOCH FROM (first_action_at - verified_at))/3600)
-        FROM (
-          SELECT
-            u.id,
-            u.verified_at,
-            LEAST(
-              MIN(p.created_at),
-              MIN(c.created_at)
-            ) AS first_action_at
-          FROM users u
-          LEFT JOIN posts p ON p.author_id = u.id
-          LEFT JOIN comments c ON c.author_id = u.id
-          WHERE u.verified_at IS NOT NULL
-          GROUP BY u.id, u.verified_at
-        ) t
-        WHERE first_action_at IS NOT NULL
-          AND first_action_at > verified_at
-    """))
-    ttfv = ttfv_result.scalar() or 0
-
-    # 4) Verification SLA p50 / p95 - hours from submission to approval
-    sla_result = db.session.execute(text("""
-        SELECT
-          PERCENTILE_CONT(0.5)
-            WITHIN GROUP (ORDER BY EXTRACT(EPOCH FROM (verified_at - verification_submitted_at))/3600) AS p50,
-          PERCENTILE_CONT(0.95)
-            WITHIN GROUP (ORDER BY EXTRACT(EPOCH FROM (verified_at - verification_submitted_at))/3600) AS p95
-        FROM users
-        WHERE verified_at IS NOT NULL
-          AND verification_submitted_at IS NOT NULL
-    """))
-    sla = sla_result.fetchone()
-    sla_p50 = float(sla.p50 or 0) if sla and sla.p50 else 0
-    sla_p95 = float(sla.p95 or 0) if sla and sla.p95 else 0
+    from analytics_rollups import overview_metrics
+
+    # 1-4) WAU counts, TTFV and verification SLA come from the hourly rollups
+    # (user_activity_daily + t-digest sketches); only today is computed live.
+    # Verified WAU: post, comment, or last_seen. Deal WAU: created or
+    # commented on a deal.
+    metrics = overview_metrics(window_days=7)
+    now = metrics['now']
+    window_start = metrics['window_start']
+    verified_wau = metrics['verified_wau']
+    deal_wau = metrics['deal_wau']
+    ttfv = metrics['ttfv_p50']
+    sla_p50 = float(metrics['sla_p50'])
+    sla_p95 = float(metrics['sla_p95'])
 
     # 5) Invites 7d - issued vs accepted with conversion
     invites_result = db.session.execute(text("""
@@ -2033,7 +2018,9 @@ def api_admin_analytics_overview():
         'window': {
             'start': window_start.isoformat() + 'Z',
             'end': now.isoformat() + 'Z'
-        }
+        },
+        # Percentiles read 0 until the rollup job has built its first snapshot
+        'warming': metrics['warming']
     }), 200
 
 
@@ -2042,166 +2029,29 @@ def api_admin_analytics_overview():
 @require_roles('admin')
 def api_admin_analytics_cohorts():
     """Per-cohort analytics by invite_source, specialty, or verification_week."""
-    from sqlalchemy import text
+    from analytics_rollups import cohort_metrics
     
     dimension = request.args.get('dimension', 'specialty')
     metric = request.args.get('metric', 'activation')
     window_days = int(request.args.get('window_days', 7))
     
-    now = datetime.utcnow()
-    window_start = now - timedelta(days=window_days)
-    
     if dimension not in ('invite_source', 'specialty', 'verification_week'):
         return jsonify({'error': 'invalid_dimension'}), 400
     if metric not in ('activation', 'deal_post', 'wau'):
         return jsonify({'error': 'invalid_metric'}), 400
     
+    # Cohort sizes and activation come from the rollup snapshot; wau adds
+    # today's activity live on top of user_activity_daily.
     results = []
-    
-    if dimension == 'specialty':
-        if metric == 'activation':
-            rows = db.session.execute(text("""
-                SELECT 
-                    u.specialty AS key,
-                    COUNT(DISTINCT u.id) AS users,
-                    COUNT(DISTINCT CASE WHEN first_action.first_at IS NOT NULL THEN u.id END) AS activated
-                FROM users u
-                LEFT JOIN (
-                    SELECT author_id, MIN(created_at) AS first_at
-                    FROM posts
-                    GROUP BY author_id
-                    UNION ALL
-                    SELECT author_id, MIN(created_at) AS first_at
-                    FROM comments
-                    GROUP BY author_id
-                ) first_action ON first_action.author_id = u.id
-                    AND first_action.first_at <= u.verified_at + INTERVAL '7 days'
-                WHERE u.verification_status = 'verified'
-                GROUP BY u.specialty
-                ORDER BY users DESC
-            """))
-        elif metric == 'deal_post':
-            rows = db.session.execute(text("""
-                SELECT 
-                    u.specialty AS key,
-                    COUNT(DISTINCT u.id) AS users,
-                    COUNT(DISTINCT CASE WHEN p.id IS NOT NULL THEN u.id END) AS activated
-                FROM users u
-                LEFT JOIN posts p ON p.author_id = u.id AND p.post_type = 'deal'
-                WHERE u.verification_status = 'verified'
-                GROUP BY u.specialty
-                ORDER BY users DESC
-            """))
-        else:  # wau
-            rows = db.session.execute(text("""
-                SELECT 
-                    u.specialty AS key,
-                    COUNT(DISTINCT u.id) AS users,
-                    COUNT(DISTINCT CASE WHEN ua.user_id IS NOT NULL THEN u.id END) AS activated
-                FROM users u
-                LEFT JOIN user_activity ua ON ua.user_id = u.id AND ua.created_at >= :start
-                WHERE u.verification_status = 'verified'
-                GROUP BY u.specialty
-                ORDER BY users DESC
-            """), {"start": window_start})
-        
-        for row in rows:
-            users_count = int(row.users or 0)
-            activated_count = int(row.activated or 0)
-            pct = round((activated_count / users_count * 100) if users_count else 0, 1)
-            results.append({
-                'key': row.key or 'Unknown',
-                'users': users_count,
-                'activated_pct': pct
-            })
-    
-    elif dimension == 'invite_source':
-        if metric == 'activation':
-            rows = db.session.execute(text("""
-                SELECT 
-                    CASE WHEN u.invite_id IS NULL THEN 'admin' ELSE 'peer' END AS key,
-                    COUNT(DISTINCT u.id) AS users,
-                    COUNT(DISTINCT CASE WHEN first_action.first_at IS NOT NULL THEN u.id END) AS activated
-                FROM users u
-                LEFT JOIN (
-                    SELECT author_id, MIN(created_at) AS first_at
-                    FROM posts
-                    GROUP BY author_id
-                    UNION ALL
-                    SELECT author_id, MIN(created_at) AS first_at
-                    FROM comments
-                    GROUP BY author_id
-                ) first_action ON first_action.author_id = u.id
-                    AND first_action.first_at <= u.verified_at + INTERVAL '7 days'
-                WHERE u.verification_status = 'verified'
-                GROUP BY CASE WHEN u.invite_id IS NULL THEN 'admin' ELSE 'peer' END
-            """))
-        elif metric == 'deal_post':
-            rows = db.session.execute(text("""
-                SELECT 
-                    CASE WHEN u.invite_id IS NULL THEN 'admin' ELSE 'peer' END AS key,
-                    COUNT(DISTINCT u.id) AS users,
-                    COUNT(DISTINCT CASE WHEN p.id IS NOT NULL THEN u.id END) AS activated
-                FROM users u
-                LEFT JOIN posts p ON p.author_id = u.id AND p.post_type = 'deal'
-                WHERE u.verification_status = 'verified'
-                GROUP BY CASE WHEN u.invite_id IS NULL THEN 'admin' ELSE 'peer' END
-            """))
-        else:  # wau
-            rows = db.session.execute(text("""
-                SELECT 
-                    CASE WHEN u.invite_id IS NULL THEN 'admin' ELSE 'peer' END AS key,
-                    COUNT(DISTINCT u.id) AS users,
-                    COUNT(DISTINCT CASE WHEN ua.user_id IS NOT NULL THEN u.id END) AS activated
-                FROM users u
-                LEFT JOIN user_activity ua ON ua.user_id = u.id AND ua.created_at >= :start
-                WHERE u.verification_status = 'verified'
-                GROUP BY CASE WHEN u.invite_id IS NULL THEN 'admin' ELSE 'peer' END
-            """), {"start": window_start})
-        
-        for row in rows:
-            users_count = int(row.users or 0)
-            activated_count = int(row.activated or 0)
-            pct = round((activated_count / users_count * 100) if users_count else 0, 1)
-            results.append({
-                'key': row.key,
-                'users': users_count,
-                'activated_pct': pct
-            })
-    
-    elif dimension == 'verification_week':
-        rows = db.session.execute(text("""
-            SELECT 
-                DATE_TRUNC('week', u.verified_at) AS week_start,
-                COUNT(DISTINCT u.id) AS users,
-                COUNT(DISTINCT CASE WHEN first_action.first_at IS NOT NULL THEN u.id END) AS activated
-            FROM users u
-            LEFT JOIN (
-                SELECT author_id, MIN(created_at) AS first_at
-                FROM posts
-                GROUP BY author_id
-                UNION ALL
-                SELECT author_id, MIN(created_at) AS first_at
-                FROM comments
-                GROUP BY author_id
-            ) first_action ON first_action.author_id = u.id
-                AND first_action.first_at <= u.verified_at + INTERVAL '7 days'
-            WHERE u.verified_at IS NOT NULL
-            GROUP BY DATE_TRUNC('week', u.verified_at)
-            ORDER BY week_start DESC
-            LIMIT 12
-        """))
-        
-        for row in rows:
-            users_count = int(row.users or 0)
-            activated_count = int(row.activated or 0)
-            pct = round((activated_count / users_count * 100) if users_count else 0, 1)
-            week_key = row.week_start.strftime('%Y-%m-%d') if row.week_start else 'Unknown'
-            results.append({
-                'key': week_key,
-                'users': users_count,
-                'activated_pct': pct
-            })
+    for row in cohort_metrics(dimension, metric, window_days):
+        users_count = int(row['users'] or 0)
+        activated_count = int(row['activated'] or 0)
+        pct = round((activated_count / users_count * 100) if users_count else 0, 1)
+        results.append({
+            'key': row['key'],
+            'users': users_count,
+            'activated_pct': pct
+        })
     
     return jsonify({
         'dimension': dimension,
@@ -2371,6 +2221,7 @@ def deal_express_interest(deal_id):
     )
     db.session.add(interest)
     deal.interest_count = (deal.interest_count or 0) + 1
+    increment_counters(current_user.id, deal_interests=1)
     db.session.commit()
     
     flash('Your interest has been recorded. The sponsor will contact you.', 'success')
@@ -3120,6 +2971,7 @@ def create_room_post(room_id):
     try:
         db.session.add(post)
         room.post_count = (room.post_count or 0) + 1
+        increment_counters(current_user.id, posts=1)
         db.session.commit()
         flash('Post created successfully!', 'success')
     except Exception as e:
@@ -3436,25 +3288,30 @@ def log_ad_impression():
     if not creative_id:
         return jsonify({"error": "creative_id required"}), 400
     
-    # Idempotency guard
+    # Idempotency guard (Redis marker, since buffered rows aren't queryable yet)
     if page_view_id:
-        existing = AdImpression.query.filter_by(
-            user_id=current_user.id,
-            creative_id=creative_id,
-            page_view_id=page_view_id
-        ).first()
-        if existing:
+        from utils.cache_service import CacheService, get_redis_client
+        key = f"ads:imp:{current_user.id}:{creative_id}:{page_view_id}"
+        client = get_redis_client()
+        seen = None
+        if client:
+            try:
+                seen = not client.set(key, 1, nx=True, ex=86400)
+            except Exception:
+                seen = None
+        if seen is None:
+            # No Redis: per-process marker, plus the DB for rows already flushed
+            seen = CacheService.exists(key) or AdImpression.query.filter_by(
+                user_id=current_user.id,
+                creative_id=creative_id,
+                page_view_id=page_view_id
+            ).first() is not None
+            CacheService.set(key, 1, ttl=86400)
+        if seen:
             return jsonify({"status": "ok"})
     
-    impression = AdImpression(
-        creative_id=creative_id,
-        user_id=current_user.id,
-        placement=placement,
-        page_view_id=page_view_id,
-        created_at=datetime.utcnow()
-    )
-    db.session.add(impression)
-    db.session.commit()
+    from utils.ad_server import ImpressionBuffer
+    ImpressionBuffer.add(creative_id, current_user.id, placement=placement, page_view_id=page_view_id)
     return jsonify({"status": "ok"})
 
 
@@ -3542,6 +3399,7 @@ def ads_admin_campaigns():
         )
         db.session.add(campaign)
         db.session.commit()
+        AdServer.invalidate()
         return jsonify({
             "id": campaign.id,
             "advertiser_id": campaign.advertiser_id,
@@ -3584,6 +3442,7 @@ def ads_admin_creatives():
         )
         db.session.add(creative)
         db.session.commit()
+        AdServer.invalidate()
         return jsonify({
             "id": creative.id,
             "campaign_id": creative.campaign_id,
@@ -12,6 +12,8 @@ from models import (User, Post, Room, ExpertAMA, AMAStatus, InvestmentDeal,
                    AdCampaign, AdCreative, AdImpression, AdClick, MentorApplication, LTITool,
                    SiteSettings, CodeQualityIssue, CodeReviewRun, Petition, PetitionSignature,
                    UserMedicalLicense, DoctorInvite)
+from utils.ad_server import AdServer
+from utils.exports import BackgroundExport, iter_query, register_export, stream_csv
 import json
 import hmac
 import hashlib
@@ -45,50 +47,10 @@ def dashboard():
 @admin_required
 def analytics():
     """Platform analytics"""
-    now = datetime.utcnow()
-    week_ago = now - timedelta(days=7)
-    month_ago = now - timedelta(days=30)
-    
-    yesterday = now - timedelta(days=1)
-    
-    # Count premium users (pro + elite)
-    pro_users = User.query.filter(User.subscription_tier.in_(['pro', 'premium'])).count()
-    elite_users = User.query.filter(User.subscription_tier == 'elite').count()
-    premium_total = pro_users + elite_users
-    
-    # Daily active users (users who logged in within last 24 hours)
-    dau = User.query.filter(User.last_login >= yesterday).count()
-    wau = User.query.filter(User.last_login >= week_ago).count()
-    
-    stats = {
-        'total_users': User.query.count(),
-        'premium_users': premium_total,
-        'pro_users': pro_users,
-        'elite_users': elite_users,
-        'new_users_week': User.query.filter(User.created_at >= week_ago).count(),
-        'new_users_month': User.query.filter(User.created_at >= month_ago).count(),
-        'total_posts': Post.query.count(),
-        'posts_week': Post.query.filter(Post.created_at >= week_ago).count(),
-        'active_deals': InvestmentDeal.query.filter(InvestmentDeal.status == 'active').count(),
-        'pending_deals': InvestmentDeal.query.filter(InvestmentDeal.status == 'review').count(),
-        'upcoming_amas': ExpertAMA.query.filter(ExpertAMA.status == 'scheduled').count(),
-        'total_courses': Course.query.filter_by(is_published=True).count(),
-        'total_events': Event.query.filter_by(is_published=True).count(),
-        'pending_verifications': User.query.filter(User.verification_status == 'pending').count(),
-        'dau': dau,
-        'wau': wau,
-    }
-    
-    # Calculate rates
-    if stats['total_users'] > 0:
-        stats['premium_rate'] = (stats['premium_users'] / stats['total_users']) * 100
-        stats['dau_rate'] = (dau / stats['total_users']) * 100
-    else:
-        stats['premium_rate'] = 0
-        stats['dau_rate'] = 0
-    
-    # Estimate monthly revenue (pro $29 + elite $99)
-    stats['monthly_revenue'] = (pro_users * 29) + (elite_users * 99)
+    from analytics_rollups import get_platform_stats
+
+    # Counters are rolled up hourly by the analytics job (see jobs.py)
+    stats = get_platform_stats()
     
     return render_template('admin/analytics.html', stats=stats)
 
@@ -288,6 +250,16 @@ def youtube_check_live():
     return jsonify({'live': False})
 
 
+@admin_bp.route('/widgets/status')
+@login_required
+@admin_required
+def widgets_status():
+    """Freshness of prefetched external feed widgets"""
+    from utils.widget_prefetch import WidgetPrefetcher
+    
+    return jsonify(WidgetPrefetcher.status())
+
+
 @admin_bp.route('/users')
 @login_required
 @admin_required
@@ -912,48 +884,72 @@ def view_petition_signatures(petition_id):
     """View all signatures for a petition"""
     petition = Petition.query.get_or_404(petition_id)
     signatures = petition.signatures.order_by(PetitionSignature.signed_at.desc()).all()
-    return render_template('admin/petition_signatures.html', petition=petition, signatures=signatures)
+    return render_template('admin/petition_signatures.html', petition=petition, signatures=signatures,
+                           export_id=request.args.get('export_id'))
+
+
+@register_export('petition_signatures')
+def petition_signature_rows(petition_id):
+    """Header and streamed rows for a petition's signatures"""
+    query = PetitionSignature.query.filter_by(petition_id=petition_id).order_by(
+        PetitionSignature.signed_at.asc(), PetitionSignature.id.asc()
+    )
+    header = ['Name', 'Email', 'Address', 'City', 'State', 'Zip', 'License Number', 'License State', 'Signed At', 'Comments']
+    
+    def rows():
+        for sig in iter_query(query):
+            address = sig.address_line1
+            if sig.address_line2:
+                address += ', ' + sig.address_line2
+            yield [
+                sig.full_name,
+                sig.email,
+                address,
+                sig.city,
+                sig.state,
+                sig.zip_code,
+                sig.license_number,
+                sig.license_state,
+                sig.signed_at.strftime('%Y-%m-%d %H:%M:%S'),
+                sig.comments or ''
+            ]
+    
+    return header, rows()
 
 
 @admin_bp.route('/petitions/<int:petition_id>/export')
 @login_required
 @admin_required
 def export_petition_signatures(petition_id):
-    """Export petition signatures as CSV"""
-    petition = Petition.query.get_or_404(petition_id)
-    signatures = petition.signatures.order_by(PetitionSignature.signed_at.asc()).all()
-    
-    import csv
-    from io import StringIO
-    from flask import Response
-    
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['Name', 'Email', 'Address', 'City', 'State', 'Zip', 'License Number', 'License State', 'Signed At', 'Comments'])
-    
-    for sig in signatures:
-        address = sig.address_line1
-        if sig.address_line2:
-            address += ', ' + sig.address_line2
-        writer.writerow([
-            sig.full_name,
-            sig.email,
-            address,
-            sig.city,
-            sig.state,
-            sig.zip_code,
-            sig.license_number,
-            sig.license_state,
-            sig.signed_at.strftime('%Y-%m-%d %H:%M:%S'),
-            sig.comments or ''
-        ])
-    
-    output.seek(0)
-    return Response(
-        output.getvalue(),
-        mimetype='text/csv',
-        headers={'Content-Disposition': f'attachment; filename=petition_{petition_id}_signatures.csv'}
-    )
+    """Export petition signatures as CSV (streamed, or in the background with ?background=1)"""
+    Petition.query.get_or_404(petition_id)
+    filename = f'petition_{petition_id}_signatures.csv'
+    
+    if request.args.get('background') == '1':
+        export_id = BackgroundExport.start('petition_signatures', filename,
+                                           requested_by=current_user.id, petition_id=petition_id)
+        flash('Export started. The download link below works once it is ready.', 'info')
+        return redirect(url_for('admin.view_petition_signatures', petition_id=petition_id, export_id=export_id))
+    
+    return stream_csv(petition_signature_rows(petition_id), filename)
+
+
+@admin_bp.route('/exports/<export_id>')
+@login_required
+@admin_required
+def download_export(export_id):
+    """Download a finished background export, or report its progress"""
+    from flask import send_file
+    
+    status = BackgroundExport.status(export_id) if export_id.isalnum() else None
+    if not status:
+        return jsonify({'error': 'Export not found or expired'}), 404
+    if status.get('status') != 'ready':
+        return jsonify({k: status.get(k) for k in ('status', 'rows', 'error')}), 202
+    path = BackgroundExport.local_file(export_id)
+    if path is None:
+        return jsonify({'error': 'Export file is no longer available'}), 404
+    return send_file(path, mimetype='text/csv', as_attachment=True, download_name=status['filename'])
 
 
 # ============================================================================
@@ -1015,6 +1011,7 @@ def create_campaign():
         )
         db.session.add(campaign)
         db.session.commit()
+        AdServer.invalidate()
         flash('Campaign created successfully!', 'success')
     except Exception as e:
         db.session.rollback()
@@ -1040,6 +1037,7 @@ def ads_admin_campaigns():
         )
         db.session.add(campaign)
         db.session.commit()
+        AdServer.invalidate()
         return jsonify({
             "id": campaign.id,
             "advertiser_id": campaign.advertiser_id,
@@ -1088,6 +1086,7 @@ def ads_admin_creatives():
             )
             db.session.add(creative)
             db.session.commit()
+            AdServer.invalidate()
             logging.info(f"Created creative ID {creative.id}")
             return jsonify({
                 "id": creative.id,
@@ -1165,6 +1164,7 @@ def create_creative_form():
         )
         db.session.add(creative)
         db.session.commit()
+        AdServer.invalidate()
         flash('Creative created successfully!', 'success')
     except Exception as e:
         logging.error(f"Error creating creative: {e}")
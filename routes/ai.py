@@ -6,17 +6,19 @@ import logging
 from flask import Blueprint, render_template, request, jsonify
 from flask_login import login_required, current_user
 from app import db
+from utils.startup import LazyClient
 
 # Gemini AI Integration (uses Replit AI Integrations - no API key needed)
-from google import genai
-from google.genai import types
-
 AI_INTEGRATIONS_GEMINI_API_KEY = os.environ.get("AI_INTEGRATIONS_GEMINI_API_KEY")
 AI_INTEGRATIONS_GEMINI_BASE_URL = os.environ.get("AI_INTEGRATIONS_GEMINI_BASE_URL")
 
-gemini_client = None
-if AI_INTEGRATIONS_GEMINI_API_KEY and AI_INTEGRATIONS_GEMINI_BASE_URL:
-    gemini_client = genai.Client(
+
+def _build_gemini_client():
+    if not (AI_INTEGRATIONS_GEMINI_API_KEY and AI_INTEGRATIONS_GEMINI_BASE_URL):
+        return None
+    # The SDK takes ~0.5s to import, so it's loaded on the first AI request
+    from google import genai
+    return genai.Client(
         api_key=AI_INTEGRATIONS_GEMINI_API_KEY,
         http_options={
             'api_version': '',
@@ -24,6 +26,9 @@ if AI_INTEGRATIONS_GEMINI_API_KEY and AI_INTEGRATIONS_GEMINI_BASE_URL:
         }
     )
 
+
+gemini_client = LazyClient(_build_gemini_client)
+
 ai_bp = Blueprint('ai', __name__, url_prefix='/ai')
 
 SYSTEM_PROMPT = """You are MedInvest AI, a professional financial assistant for medical doctors. 
@@ -62,7 +67,8 @@ def ask_ai():
     if not question:
         return jsonify({'error': 'No question provided'}), 400
     
-    if gemini_client:
+    client = gemini_client.get()
+    if client:
         try:
             # Add user context for personalization
             context_prompt = f"{SYSTEM_PROMPT}\n\n"
@@ -74,7 +80,7 @@ def ask_ai():
             
             context_prompt += f"Question: {question}"
             
-            response = gemini_client.models.generate_content(
+            response = client.models.generate_content(
                 model="gemini-2.5-flash",
                 contents=context_prompt
             )
@@ -106,14 +112,15 @@ def chat_with_gemini():
     if not user_message:
         return jsonify({'error': 'No message provided'}), 400
     
-    if gemini_client:
+    client = gemini_client.get()
+    if client:
         try:
             context_prompt = f"{SYSTEM_PROMPT}\n\n"
             if current_user.specialty:
                 context_prompt += f"User is a {current_user.specialty} physician.\n\n"
             context_prompt += f"Question: {user_message}"
             
-            response = gemini_client.models.generate_content(
+            response = client.models.generate_content(
                 model="gemini-2.5-flash",
                 contents=context_prompt
             )
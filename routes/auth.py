@@ -16,6 +16,7 @@ import secrets
 from app import db
 from models import User, Referral, LoginSession, VerificationQueueEntry, DoctorInvite
 from mailer import send_email
+from utils.achievements import set_counter
 
 
 def record_login_session(user_id, login_method='password', is_successful=True, failure_reason=None):
@@ -951,6 +952,7 @@ def login():
             
             user.last_login = datetime.utcnow()
             user.add_points(1)  # Daily login point
+            set_counter(user.id, 'login_streak', user.login_streak)
             db.session.commit()
             
             flash(f'Welcome back, {user.first_name}!', 'success')
@@ -1091,6 +1093,7 @@ def verify_2fa():
             
             user.last_login = datetime.utcnow()
             user.add_points(1)
+            set_counter(user.id, 'login_streak', user.login_streak)
             db.session.commit()
             
             flash(f'Welcome back, {user.first_name}!', 'success')
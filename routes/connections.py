@@ -7,6 +7,7 @@ from flask_login import login_required, current_user
 from app import db
 from models import User, Connection, NotificationType
 from routes.notifications import create_notification
+from utils.social_graph import SocialGraph
 
 connections_bp = Blueprint('connections', __name__, url_prefix='/connections')
 
@@ -75,6 +76,7 @@ def send_request(user_id):
             existing.addressee_id = user_id
             existing.updated_at = datetime.utcnow()
             db.session.commit()
+            SocialGraph.on_connection_requested(current_user.id, user_id)
             
             create_notification(
                 user_id=user_id,
@@ -113,6 +115,7 @@ def send_request(user_id):
     )
     
     db.session.commit()
+    SocialGraph.on_connection_requested(current_user.id, user_id)
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return jsonify({'success': True, 'status': 'pending'})
@@ -144,6 +147,7 @@ def accept_request(connection_id):
     )
     
     db.session.commit()
+    SocialGraph.on_connection_accepted(connection.requester_id, current_user.id)
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return jsonify({'success': True})
@@ -164,6 +168,7 @@ def decline_request(connection_id):
     connection.status = 'declined'
     connection.updated_at = datetime.utcnow()
     db.session.commit()
+    SocialGraph.on_connection_declined(connection.requester_id, current_user.id)
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return jsonify({'success': True})
@@ -185,6 +190,7 @@ def remove_connection(user_id):
     
     db.session.delete(connection)
     db.session.commit()
+    SocialGraph.on_connection_removed(current_user.id, user_id)
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return jsonify({'success': True})
@@ -202,8 +208,10 @@ def cancel_request(connection_id):
         status='pending'
     ).first_or_404()
     
+    addressee_id = connection.addressee_id
     db.session.delete(connection)
     db.session.commit()
+    SocialGraph.on_connection_removed(current_user.id, addressee_id)
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return jsonify({'success': True})
@@ -7,6 +7,8 @@ from datetime import datetime
 from functools import wraps
 from app import db
 from models import Course, CourseModule, CourseEnrollment
+from utils.achievements import increment_counters
+from utils.catalog import Catalog
 
 
 def admin_required(f):
@@ -23,7 +25,7 @@ courses_bp = Blueprint('courses', __name__, url_prefix='/courses')
 
 @courses_bp.route('/')
 def list_courses():
-    """List all published courses with filtering and sorting"""
+    """List published courses with filtering, sorting and keyset pagination"""
     # Filter parameters
     category = request.args.get('category')
     level = request.args.get('level')
@@ -32,11 +34,8 @@ def list_courses():
     
     query = Course.query.filter_by(is_published=True)
     
-    if category:
-        query = query.filter(Course.category == category)
-    
     if level:
-        query = query.filter(Course.level == level)
+        query = query.filter(Course.difficulty_level == level)
     
     if price_filter == 'free':
         query = query.filter(Course.price == 0)
@@ -45,33 +44,42 @@ def list_courses():
     
     # Sorting
     if sort_by == 'newest':
-        query = query.order_by(Course.created_at.desc())
+        order = [(Course.created_at, 'desc')]
     elif sort_by == 'price_low':
-        query = query.order_by(Course.price.asc())
+        order = [(Course.price, 'asc')]
     elif sort_by == 'price_high':
-        query = query.order_by(Course.price.desc())
+        order = [(Course.price, 'desc')]
     elif sort_by == 'popular':
-        query = query.order_by(Course.enrollment_count.desc())
+        order = [(db.func.coalesce(Course.enrolled_count, 0), 'desc')]
     else:
-        query = query.order_by(Course.is_featured.desc(), Course.created_at.desc())
+        order = [(db.func.coalesce(Course.is_featured, False), 'desc'),
+                 (Course.created_at, 'desc')]
     
-    courses = query.all()
+    page = Catalog.page('courses', Course, query, order,
+                        filters={'level': level, 'price': price_filter, 'sort': sort_by},
+                        cursor=request.args.get('cursor'))
     
     # Get user's enrollments
     user_enrollments = []
     if current_user.is_authenticated:
-        enrollments = CourseEnrollment.query.filter_by(user_id=current_user.id).all()
-        user_enrollments = [e.course_id for e in enrollments]
-    
-    # Get unique categories and levels for filter dropdowns
-    categories = db.session.query(Course.category).filter(Course.is_published==True, Course.category.isnot(None)).distinct().all()
-    levels = db.session.query(Course.level).filter(Course.is_published==True, Course.level.isnot(None)).distinct().all()
+        user_enrollments = [course_id for (course_id,) in db.session.query(CourseEnrollment.course_id).filter(
+            CourseEnrollment.user_id == current_user.id,
+            CourseEnrollment.course_id.in_([c.id for c in page.items])
+        ).all()] if page.items else []
+    
+    # Unique levels for filter dropdowns (courses have no category column)
+    levels = Catalog.facet('courses', 'levels', lambda: [
+        l for (l,) in db.session.query(Course.difficulty_level).filter(
+            Course.is_published == True, Course.difficulty_level.isnot(None)
+        ).distinct().all() if l
+    ])
     
     return render_template('courses/list.html',
-                         courses=courses,
+                         courses=page.items,
+                         next_url=page.next_url(),
                          user_enrollments=user_enrollments,
-                         categories=[c[0] for c in categories if c[0]],
-                         levels=[l[0] for l in levels if l[0]],
+                         categories=[],
+                         levels=levels,
                          selected_category=category,
                          selected_level=level,
                          price_filter=price_filter,
@@ -125,6 +133,7 @@ def enroll_course(course_id):
     current_user.add_points(50)
     
     db.session.add(enrollment)
+    increment_counters(current_user.id, course_enrollments=1)
     db.session.commit()
     
     return jsonify({
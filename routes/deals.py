@@ -8,6 +8,7 @@ from app import db
 from models import InvestmentDeal, DealInterest, DealStatus
 from facebook_page import share_deal, is_facebook_configured
 from utils.ads import get_deal_inline_ad
+from utils.achievements import increment_counters
 
 
 def admin_required(f):
@@ -141,6 +142,7 @@ def express_interest(deal_id):
     current_user.add_points(20)
     
     db.session.add(interest)
+    increment_counters(current_user.id, deal_interests=1)
     db.session.commit()
     
     return jsonify({
@@ -7,6 +7,7 @@ from datetime import datetime
 from functools import wraps
 from app import db
 from models import Event, EventRegistration
+from utils.catalog import Catalog
 
 
 def admin_required(f):
@@ -23,7 +24,7 @@ events_bp = Blueprint('events', __name__, url_prefix='/events')
 
 @events_bp.route('/')
 def list_events():
-    """List upcoming and past events with filtering"""
+    """List upcoming or past events with filtering and keyset pagination"""
     now = datetime.utcnow()
     
     # Filter parameters
@@ -31,31 +32,34 @@ def list_events():
     sort_by = request.args.get('sort', 'date')
     show_past = request.args.get('past', 'false') == 'true'
     
+    # One query serves both sections: upcoming soonest first, past most recent first
     if show_past:
         query = Event.query.filter(Event.start_date < now, Event.is_published == True)
-        if sort_by == 'date':
-            query = query.order_by(Event.start_date.desc())
+        order = [(Event.start_date, 'desc')]
     else:
         query = Event.query.filter(Event.start_date > now, Event.is_published == True)
-        if sort_by == 'date':
-            query = query.order_by(Event.start_date.asc())
+        order = [(Event.start_date, 'asc')]
     
     if event_type:
         query = query.filter(Event.event_type == event_type)
     
-    events = query.all()
+    page = Catalog.page('events', Event, query, order,
+                        filters={'type': event_type, 'past': show_past},
+                        cursor=request.args.get('cursor'))
     
     # Event types for filter
-    event_types = db.session.query(Event.event_type).filter(Event.is_published==True, Event.event_type.isnot(None)).distinct().all()
-    
-    upcoming = Event.query.filter(Event.start_date > now, Event.is_published == True).order_by(Event.start_date.asc()).all() if not show_past else []
-    past = Event.query.filter(Event.start_date < now, Event.is_published == True).order_by(Event.start_date.desc()).limit(10).all() if show_past else []
+    event_types = Catalog.facet('events', 'types', lambda: [
+        t for (t,) in db.session.query(Event.event_type).filter(
+            Event.is_published == True, Event.event_type.isnot(None)
+        ).distinct().all() if t
+    ])
     
     return render_template('events/list.html',
-                         events=events,
-                         upcoming=upcoming,
-                         past=past,
-                         event_types=[e[0] for e in event_types if e[0]],
+                         events=page.items,
+                         upcoming=[] if show_past else page.items,
+                         past=page.items if show_past else [],
+                         next_url=page.next_url(),
+                         event_types=event_types,
                          selected_type=event_type,
                          sort_by=sort_by,
                          show_past=show_past)
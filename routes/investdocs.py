@@ -11,10 +11,14 @@ Phases:
 - Phase 4: Feature Integration
 """
 
-from flask import Blueprint, render_template, jsonify, request, session, current_app
+from flask import Blueprint, render_template, jsonify, request, session, current_app, Response, stream_with_context
 from flask_login import login_required, current_user
 import requests
+from requests.adapters import HTTPAdapter
 import os
+import re
+import time
+import threading
 from datetime import timedelta
 from functools import wraps
 import logging
@@ -37,6 +41,145 @@ INVESTDOCS_INTERNAL_URL = os.environ.get('INVESTDOCS_URL', 'http://localhost:300
 INVESTDOCS_MODE = os.environ.get('INVESTDOCS_MODE', 'iframe')
 INVESTDOCS_PROXY_API = os.environ.get('INVESTDOCS_PROXY_API', True)
 
+# Proxy tuning
+PROXY_TIMEOUT = (5, 30)             # (connect, read) seconds
+PROXY_CHUNK_SIZE = 64 * 1024
+SSO_TOKEN_CACHE_TTL = 600           # reuse a minted SSO token for this long (token itself lives 24h)
+
+# Headers that describe a single hop and must not be forwarded
+HOP_BY_HOP_HEADERS = {
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'te', 'trailer', 'trailers', 'transfer-encoding', 'upgrade', 'set-cookie',
+}
+FORWARDED_REQUEST_HEADERS = (
+    'Content-Type', 'Accept', 'Accept-Encoding', 'Accept-Language',
+    'Range', 'If-None-Match', 'If-Modified-Since', 'If-Range',
+)
+
+_session = None
+_session_lock = threading.Lock()
+_sso_tokens = {}                    # user_id -> (fingerprint, token, minted_at)
+_sso_tokens_lock = threading.Lock()
+_path_metrics = {}                  # normalized path -> {'count', 'errors', 'digest'}
+_metrics_lock = threading.Lock()
+MAX_METRIC_PATHS = 200               # paths come from the URL; the rest share OTHER_METRIC_PATH
+OTHER_METRIC_PATH = '(other)'
+
+
+def _get_session():
+    """Keep-alive session shared by all InvestDocs calls in this process"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers['User-Agent'] = 'MedInvest-InvestDocs-Proxy/1.0'
+                _session = session
+    return _session
+
+
+def _auth_headers(user):
+    """Authorization and user headers for a server-to-server InvestDocs call"""
+    headers = {'X-User-Id': str(user.id)}
+    token = cached_sso_token(user)
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    return headers
+
+
+def _metric_path(path):
+    """Collapse ids in a path so metrics group by endpoint, not document"""
+    return re.sub(r'/(?:\d+|[0-9a-fA-F-]{16,})(?=/|$)', '/:id', '/' + path.strip('/'))
+
+
+def _record_latency(path, elapsed_ms, error=False):
+    from utils.tdigest import TDigest
+
+    key = _metric_path(path)
+    with _metrics_lock:
+        if key not in _path_metrics and len(_path_metrics) >= MAX_METRIC_PATHS:
+            key = OTHER_METRIC_PATH
+        stats = _path_metrics.get(key)
+        if stats is None:
+            stats = _path_metrics[key] = {'count': 0, 'errors': 0, 'digest': TDigest(compression=50)}
+        stats['count'] += 1
+        if error:
+            stats['errors'] += 1
+        else:
+            stats['digest'].add(elapsed_ms)
+
+
+def get_proxy_metrics():
+    """Upstream latency (time to response headers) per InvestDocs path"""
+    with _metrics_lock:
+        result = {}
+        for path, stats in sorted(_path_metrics.items()):
+            digest = stats['digest']
+            result[path] = {
+                'count': stats['count'],
+                'errors': stats['errors'],
+                'p50_ms': round(digest.quantile(0.5) or 0, 1),
+                'p95_ms': round(digest.quantile(0.95) or 0, 1),
+                'max_ms': round(digest.max or 0, 1),
+            }
+        return result
+
+
+def upstream_request(method, path, user, **kwargs):
+    """Call the InvestDocs API over the pooled session, recording latency"""
+    kwargs.setdefault('timeout', PROXY_TIMEOUT)
+    headers = _auth_headers(user)
+    headers.update(kwargs.pop('headers', None) or {})
+    start = time.perf_counter()
+    try:
+        response = _get_session().request(method, f"{INVESTDOCS_INTERNAL_URL}/api/{path}",
+                                          headers=headers, **kwargs)
+    except requests.exceptions.RequestException:
+        _record_latency(path, (time.perf_counter() - start) * 1000, error=True)
+        raise
+    _record_latency(path, (time.perf_counter() - start) * 1000, error=response.status_code >= 500)
+    return response
+
+
+def stream_upstream(method, path, user, data=None, params=None, extra_headers=None):
+    """
+    Proxy one call to InvestDocs and stream the upstream response back as-is
+
+    Body bytes (compressed or not) and end-to-end headers pass straight
+    through, so large document downloads are never buffered in memory.
+    """
+    headers = {name: request.headers[name] for name in FORWARDED_REQUEST_HEADERS if name in request.headers}
+    headers.update(extra_headers or {})
+
+    try:
+        upstream = upstream_request(method, path, user, headers=headers, data=data,
+                                    params=params, stream=True, allow_redirects=False)
+    except requests.exceptions.ConnectionError:
+        logger.error(f"InvestDocs server connection error: {path}")
+        return jsonify({'error': 'InvestDocs service unavailable'}), 503
+    except requests.exceptions.Timeout:
+        logger.error(f"InvestDocs server timeout: {path}")
+        return jsonify({'error': 'InvestDocs request timeout'}), 504
+
+    logger.info(f"InvestDocs API request: {method} {path} -> {upstream.status_code}")
+
+    def body():
+        try:
+            for chunk in upstream.raw.stream(PROXY_CHUNK_SIZE, decode_content=False):
+                yield chunk
+        finally:
+            upstream.close()
+
+    response_headers = [
+        (name, value) for name, value in upstream.raw.headers.items()
+        if name.lower() not in HOP_BY_HOP_HEADERS
+    ]
+    return Response(stream_with_context(body()), status=upstream.status_code,
+                    headers=response_headers, direct_passthrough=True)
+
 # ===========================
 # PHASE 1: IFRAME EMBEDDING
 # ===========================
@@ -44,7 +187,7 @@ INVESTDOCS_PROXY_API = os.environ.get('INVESTDOCS_PROXY_API', True)
 def check_api_available():
     """Check if InvestDocs API is reachable"""
     try:
-        response = requests.get(f"{INVESTDOCS_STANDALONE_URL}/api/documents", timeout=5)
+        response = _get_session().get(f"{INVESTDOCS_STANDALONE_URL}/api/documents", timeout=5)
         # API returns 401 Unauthorized when reachable but not authenticated
         return response.status_code in [200, 401]
     except:
@@ -61,14 +204,7 @@ def dashboard():
     documents = []
     if api_available:
         try:
-            response = requests.get(
-                f"{INVESTDOCS_INTERNAL_URL}/api/documents",
-                headers={
-                    'Authorization': f'Bearer {create_sso_token(current_user)}',
-                    'X-User-Id': str(current_user.id)
-                },
-                timeout=10
-            )
+            response = upstream_request('GET', 'documents', current_user, timeout=10)
             if response.status_code == 200:
                 documents = response.json()
         except Exception as e:
@@ -117,16 +253,8 @@ def upload_document():
             'user_id': current_user.id
         }
         
-        response = requests.post(
-            f"{INVESTDOCS_INTERNAL_URL}/api/documents/upload",
-            files=files,
-            data=data,
-            headers={
-                'Authorization': f'Bearer {create_sso_token(current_user)}',
-                'X-User-Id': str(current_user.id)
-            },
-            timeout=30
-        )
+        response = upstream_request('POST', 'documents/upload', current_user,
+                                    files=files, data=data, timeout=(5, 120))
         
         if response.status_code in [200, 201]:
             flash('Document uploaded successfully!', 'success')
@@ -170,6 +298,24 @@ def create_sso_token(user):
         return None
 
 
+def cached_sso_token(user):
+    """SSO token for server-to-server calls, re-minted every SSO_TOKEN_CACHE_TTL seconds"""
+    fingerprint = (user.email, user.first_name, user.last_name)
+    now = time.time()
+    with _sso_tokens_lock:
+        cached = _sso_tokens.get(user.id)
+        if cached and cached[0] == fingerprint and now - cached[2] < SSO_TOKEN_CACHE_TTL:
+            return cached[1]
+
+    token = create_sso_token(user)
+    if token:
+        with _sso_tokens_lock:
+            if len(_sso_tokens) > 10000:
+                _sso_tokens.clear()
+            _sso_tokens[user.id] = (fingerprint, token, now)
+    return token
+
+
 @investdocs_bp.route('/auth/sync', methods=['POST'])
 @login_required
 def sync_auth():
@@ -214,45 +360,32 @@ def proxy_api(path):
         return jsonify({'error': 'API proxy disabled'}), 403
 
     try:
-        url = f"{INVESTDOCS_INTERNAL_URL}/api/{path}"
-        headers = {
-            'Content-Type': 'application/json',
-            'User-Agent': 'MedInvest-InvestDocs-Proxy/1.0'
-        }
-
-        token = create_sso_token(current_user)
-        if token:
-            headers['Authorization'] = f'Bearer {token}'
-
-        headers['X-Forwarded-For'] = request.remote_addr
-        headers['X-Forwarded-User-Id'] = str(current_user.id)
-        headers['X-Forwarded-Email'] = current_user.email
-
-        params = request.args.to_dict() if request.method in ['GET', 'DELETE'] else None
-
-        response = requests.request(
-            method=request.method,
-            url=url,
-            headers=headers,
-            json=request.get_json() if request.method in ['POST', 'PUT', 'PATCH'] else None,
-            params=params,
-            timeout=30
+        return stream_upstream(
+            request.method,
+            path,
+            current_user,
+            data=request.get_data() if request.method in ['POST', 'PUT', 'PATCH'] else None,
+            params=request.args,
+            extra_headers={
+                'X-Forwarded-For': request.remote_addr,
+                'X-Forwarded-User-Id': str(current_user.id),
+                'X-Forwarded-Email': current_user.email,
+            }
         )
-
-        logger.info(f"InvestDocs API request: {request.method} {path} -> {response.status_code}")
-        return jsonify(response.json()) if response.text else '', response.status_code
-
-    except requests.exceptions.ConnectionError:
-        logger.error(f"InvestDocs server connection error: {url}")
-        return jsonify({'error': 'InvestDocs service unavailable'}), 503
-    except requests.exceptions.Timeout:
-        logger.error(f"InvestDocs server timeout: {url}")
-        return jsonify({'error': 'InvestDocs request timeout'}), 504
     except Exception as e:
         logger.error(f"InvestDocs proxy error: {str(e)}")
         return jsonify({'error': 'Proxy error', 'details': str(e)}), 500
 
 
+@investdocs_bp.route('/proxy-metrics', methods=['GET'])
+@login_required
+def proxy_metrics():
+    """Upstream latency per proxied path (admin only)"""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
+    return jsonify({'paths': get_proxy_metrics()}), 200
+
+
 # ===========================
 # PHASE 3: DATABASE INTEGRATION
 # ===========================
@@ -262,14 +395,7 @@ def proxy_api(path):
 def sync_documents():
     """Synchronize investment documents between systems - Phase 3: Database Integration"""
     try:
-        response = requests.get(
-            f"{INVESTDOCS_INTERNAL_URL}/api/documents",
-            headers={
-                'Authorization': f'Bearer {create_sso_token(current_user)}',
-                'X-User-Id': str(current_user.id)
-            },
-            timeout=10
-        )
+        response = upstream_request('GET', 'documents', current_user, timeout=10)
 
         if response.status_code == 200:
             documents = response.json()
@@ -296,15 +422,7 @@ def sync_documents():
 def get_documents():
     """Get user's investment documents - Phase 3: Database Integration"""
     try:
-        response = requests.get(
-            f"{INVESTDOCS_INTERNAL_URL}/api/documents",
-            headers={
-                'Authorization': f'Bearer {create_sso_token(current_user)}',
-                'X-User-Id': str(current_user.id)
-            },
-            timeout=10
-        )
-        return jsonify(response.json()), response.status_code
+        return stream_upstream('GET', 'documents', current_user, params=request.args)
     except Exception as e:
         logger.error(f"Get documents error: {str(e)}")
         return jsonify({'error': 'Failed to retrieve documents'}), 500
@@ -315,16 +433,7 @@ def get_documents():
 def document_detail(doc_id):
     """Get or delete specific document - Phase 3: Database Integration"""
     try:
-        response = requests.request(
-            method=request.method,
-            url=f"{INVESTDOCS_INTERNAL_URL}/api/documents/{doc_id}",
-            headers={
-                'Authorization': f'Bearer {create_sso_token(current_user)}',
-                'X-User-Id': str(current_user.id)
-            },
-            timeout=10
-        )
-        return jsonify(response.json()), response.status_code
+        return stream_upstream(request.method, f'documents/{doc_id}', current_user)
     except Exception as e:
         logger.error(f"Document detail error: {str(e)}")
         return jsonify({'error': 'Failed to process document'}), 500
@@ -339,15 +448,7 @@ def document_detail(doc_id):
 def get_stats():
     """Get user's InvestDocs statistics - Phase 4: Feature Integration"""
     try:
-        response = requests.get(
-            f"{INVESTDOCS_INTERNAL_URL}/api/stats",
-            headers={
-                'Authorization': f'Bearer {create_sso_token(current_user)}',
-                'X-User-Id': str(current_user.id)
-            },
-            timeout=10
-        )
-        return jsonify(response.json()), response.status_code
+        return stream_upstream('GET', 'stats', current_user)
     except Exception as e:
         logger.error(f"Get stats error: {str(e)}")
         return jsonify({'error': 'Failed to retrieve stats'}), 500
@@ -358,7 +459,7 @@ def integration_status():
     """Get integration status information - Useful for monitoring and debugging"""
     try:
         try:
-            response = requests.get(
+            response = _get_session().get(
                 f"{INVESTDOCS_INTERNAL_URL}/health",
                 timeout=5
             )
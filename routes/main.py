@@ -4,7 +4,7 @@ Main Routes - Home, Feed, Profile, Dashboard
 import os
 import json
 from datetime import datetime, timedelta
-from flask import Blueprint, render_template, redirect, url_for, request, flash, jsonify, send_from_directory
+from flask import Blueprint, render_template, redirect, url_for, request, flash, jsonify
 from flask_login import login_required, current_user
 from app import db
 from models import Post, Room, PostVote, Bookmark, PostMedia, User, Hashtag, NotificationType, PostScore, UserFeedPreference, InvestmentSkill, SkillEndorsement, Recommendation, PostMention, UserActivity, Follow
@@ -13,8 +13,11 @@ from utils.content import (extract_mentions, extract_hashtags,
                            render_content_with_links, get_trending_hashtags,
                            search_users_for_mention, search_hashtags)
 from utils.algorithm import generate_feed, get_user_interests, get_people_you_may_know
-from utils.news_aggregator import get_medical_investment_news, get_bloomberg_headlines
+from utils.widget_prefetch import WidgetPrefetcher
+from utils.image_variants import ImageVariants
 from utils.ads import get_sidebar_ads
+from utils.social_graph import SocialGraph, CONNECTIONS, FOLLOWING
+from utils.achievements import increment_counters
 from routes.notifications import create_notification, notify_mention
 from facebook_page import share_platform_post, is_facebook_configured
 
@@ -58,35 +61,8 @@ def terms():
 @main_bp.route('/media/uploads/<path:filename>')
 def serve_media(filename):
     """Serve uploaded media files (images, videos) from Object Storage or local filesystem"""
-    from object_storage_utils import download_file, OBJECT_STORAGE_AVAILABLE
-    from flask import make_response
-
-    object_path = f"uploads/{filename}"
-
-    if OBJECT_STORAGE_AVAILABLE:
-        file_data = download_file(object_path)
-        if file_data:
-            ext = filename.rsplit('.',
-                                  1)[-1].lower() if '.' in filename else ''
-            content_types = {
-                'jpg': 'image/jpeg',
-                'jpeg': 'image/jpeg',
-                'png': 'image/png',
-                'gif': 'image/gif',
-                'webp': 'image/webp',
-                'mp4': 'video/mp4',
-                'mov': 'video/quicktime',
-                'webm': 'video/webm',
-                'pdf': 'application/pdf'
-            }
-            content_type = content_types.get(ext, 'application/octet-stream')
-            response = make_response(file_data)
-            response.headers['Content-Type'] = content_type
-            response.headers['Cache-Control'] = 'public, max-age=31536000'
-            return response
-
-    media_dir = os.path.join(os.getcwd(), 'media', 'uploads')
-    return send_from_directory(media_dir, filename)
+    from routes.media import send_media
+    return send_media(filename)
 
 
 @main_bp.route('/feed')
@@ -156,45 +132,23 @@ def _feed_internal():
     # Get people you may know suggestions
     suggested_users = get_people_you_may_know(current_user, limit=6)
 
-    # Get aggregated news for sidebar widget from multiple sources
-    try:
-        articles = get_medical_investment_news(limit=5)
-    except:
-        articles = []
+    # External widgets are prefetched in the background (utils/widget_prefetch.py);
+    # these reads only return the last good snapshot and never hit the network
+    articles = WidgetPrefetcher.get('news', limit=5)
 
     # Get news articles for feed integration (interspersed with posts)
-    try:
-        feed_articles = get_medical_investment_news(
-            limit=3) if page == 1 else []
-    except:
-        feed_articles = []
+    feed_articles = WidgetPrefetcher.get('news', limit=3) if page == 1 else []
 
     # Get Bloomberg headlines for ticker
-    try:
-        bloomberg_headlines = get_bloomberg_headlines(
-            limit=10) if page == 1 else []
-    except:
-        bloomberg_headlines = []
+    bloomberg_headlines = WidgetPrefetcher.get('bloomberg', limit=10) if page == 1 else []
 
     # Get MIA (Market Inefficiency Agents) alerts for premium users
     mia_alerts = []
     if current_user.is_authenticated and current_user.is_premium and page == 1:
-        try:
-            from utils.mia_client import fetch_mia_feed_items
-            mia_alerts = fetch_mia_feed_items(current_user, limit=3)
-        except Exception as e:
-            logging.error(f"Error loading MIA alerts: {e}")
-            mia_alerts = []
+        mia_alerts = WidgetPrefetcher.get('mia', limit=3)
 
     # Get YouTube Shorts from The Medicine and Money Show
-    youtube_shorts = []
-    if page == 1:
-        try:
-            from utils.youtube_live import get_channel_shorts
-            youtube_shorts = get_channel_shorts(max_results=6)
-        except Exception as e:
-            logging.error(f"Error loading YouTube shorts: {e}")
-            youtube_shorts = []
+    youtube_shorts = WidgetPrefetcher.get('youtube_shorts', limit=6) if page == 1 else []
 
     # Get sidebar ads
     try:
@@ -330,6 +284,7 @@ def create_post():
                                filename=media.get('filename', ''),
                                file_size=media.get('file_size', 0),
                                order_index=i)
+        ImageVariants.attach(post_media)
         db.session.add(post_media)
 
     current_user.add_points(
@@ -356,6 +311,7 @@ def create_post():
                 if not is_anonymous:
                     notify_mention(mentioned_user.id, current_user, post)
 
+    increment_counters(current_user.id, posts=1)
     db.session.commit()
 
     # Share to Facebook Page if configured (non-anonymous posts only)
@@ -436,6 +392,7 @@ def create_post_ajax():
                                    filename=media.get('filename', ''),
                                    file_size=media.get('file_size', 0),
                                    order_index=i)
+            ImageVariants.attach(post_media)
             db.session.add(post_media)
 
         # Process hashtags
@@ -467,6 +424,7 @@ def create_post_ajax():
                         notify_mention(mentioned_user.id, current_user, post)
 
         current_user.add_points(5 if post_type == 'text' else 10)
+        increment_counters(current_user.id, posts=1)
         db.session.commit()
 
         # Share to Facebook Page if configured (non-anonymous posts only)
@@ -510,6 +468,7 @@ def vote_post(post_id):
                                              user_id=current_user.id).first()
 
     send_notification = False
+    upvotes_before = post.upvotes or 0
 
     if existing_vote:
         if existing_vote.vote_type == vote_type:
@@ -545,6 +504,7 @@ def vote_post(post_id):
     if send_notification and not post.is_anonymous and post.user_id != current_user.id:
         notify_like(post.user_id, current_user, post)
 
+    increment_counters(post.author_id, likes_received=(post.upvotes or 0) - upvotes_before)
     db.session.commit()
     return redirect(request.referrer or url_for('main.feed'))
 
@@ -824,7 +784,7 @@ def delete_recommendation(rec_id):
 @login_required
 def dashboard():
     """User dashboard with stats, analytics and quick actions"""
-    from models import Referral, Notification, DealInterest, CourseEnrollment, Comment, PostVote
+    from models import Referral, Notification
     from datetime import timedelta
     
     now = datetime.utcnow()
@@ -834,17 +794,20 @@ def dashboard():
     referral_count = Referral.query.filter_by(referrer_id=current_user.id).count()
     unread_notifications = Notification.query.filter_by(user_id=current_user.id, is_read=False).count()
     
-    # User analytics
+    # User analytics - lifetime totals come from the incrementally maintained
+    # counter row; only the 7-day windows are counted live
+    from utils.achievements import get_user_counters
+    counters = get_user_counters(current_user.id)
     analytics = {
-        'total_posts': Post.query.filter_by(author_id=current_user.id).count(),
+        'total_posts': counters.posts,
         'posts_this_week': Post.query.filter(Post.author_id==current_user.id, Post.created_at>=week_ago).count(),
-        'total_followers': Follow.query.filter_by(followed_id=current_user.id).count(),
-        'total_following': Follow.query.filter_by(follower_id=current_user.id).count(),
-        'new_followers_week': Follow.query.filter(Follow.followed_id==current_user.id, Follow.created_at>=week_ago).count(),
-        'total_likes_received': db.session.query(db.func.count(PostVote.id)).join(Post).filter(Post.author_id==current_user.id, PostVote.vote_type=='upvote').scalar() or 0,
-        'comments_received': db.session.query(db.func.count(Comment.id)).join(Post).filter(Post.author_id==current_user.id).scalar() or 0,
-        'deals_interested': DealInterest.query.filter_by(user_id=current_user.id).count(),
-        'courses_enrolled': CourseEnrollment.query.filter_by(user_id=current_user.id).count(),
+        'total_followers': counters.followers,
+        'total_following': counters.following,
+        'new_followers_week': Follow.query.filter(Follow.following_id==current_user.id, Follow.created_at>=week_ago).count(),
+        'total_likes_received': counters.likes_received,
+        'comments_received': counters.comments_received,
+        'deals_interested': counters.deal_interests,
+        'courses_enrolled': counters.course_enrollments,
         'points': current_user.points or 0,
         'level': current_user.level or 1,
         'login_streak': current_user.login_streak or 0,
@@ -862,8 +825,7 @@ def dashboard():
     
     # User achievements
     try:
-        from utils.achievements import get_user_achievements, check_and_award_achievements
-        check_and_award_achievements(current_user.id)
+        from utils.achievements import get_user_achievements
         achievements = get_user_achievements(current_user.id)
     except Exception as e:
         achievements = []
@@ -985,51 +947,49 @@ def search():
 def network():
     """Networking page - connect with colleagues"""
     try:
-        from models import User, Follow, Connection
+        from models import User, Connection
         from utils.algorithm import get_people_you_may_know
 
         tab = request.args.get('tab', 'connections')
 
-        # Get connected user IDs from Connection table (accepted connections)
-        connected_ids = set()
-        accepted_connections = Connection.query.filter(
+        # Accepted connections plus Follow-based connections for backwards compatibility
+        graph = SocialGraph.snapshot(current_user.id)
+        all_connected_ids = graph[CONNECTIONS] | graph[FOLLOWING]
+
+        # Pending requests in both directions (rows needed for accept/cancel ids)
+        pending_rows = Connection.query.filter(
             db.or_(Connection.requester_id == current_user.id,
                    Connection.addressee_id == current_user.id),
-            Connection.status == 'accepted').all()
-        for conn in accepted_connections:
-            if conn.requester_id == current_user.id:
-                connected_ids.add(conn.addressee_id)
-            else:
-                connected_ids.add(conn.requester_id)
-
-        # Also include Follow-based connections for backwards compatibility
-        following_ids = [
-            f.following_id
-            for f in Follow.query.filter_by(follower_id=current_user.id).all()
-        ]
-        all_connected_ids = connected_ids.union(set(following_ids))
+            Connection.status == 'pending').order_by(
+                Connection.created_at.desc()).all()
+        pending_connections = [
+            c for c in pending_rows if c.addressee_id == current_user.id
+        ][:50]
+        outgoing_connections = [
+            c for c in pending_rows if c.requester_id == current_user.id
+        ][:50]
+
+        pending_user_ids = [c.requester_id for c in pending_connections]
+        outgoing_user_ids = [c.addressee_id for c in outgoing_connections]
+        users_by_id = {
+            u.id: u
+            for u in User.query.filter(
+                User.id.in_(pending_user_ids + outgoing_user_ids)).all()
+        } if pending_user_ids or outgoing_user_ids else {}
 
         # Pending connection requests (people who want to connect with current user)
-        pending_connections = Connection.query.filter_by(
-            addressee_id=current_user.id, status='pending').order_by(
-                Connection.created_at.desc()).limit(50).all()
         pending_users = [
-            User.query.get(c.requester_id) for c in pending_connections
+            users_by_id[uid] for uid in pending_user_ids if uid in users_by_id
         ]
-        pending_users = [u for u in pending_users if u]
         pending_connection_ids = {
             c.requester_id: c.id
             for c in pending_connections
         }
 
         # Outgoing connection requests (requests current user sent that are pending)
-        outgoing_connections = Connection.query.filter_by(
-            requester_id=current_user.id, status='pending').order_by(
-                Connection.created_at.desc()).limit(50).all()
         outgoing_users = [
-            User.query.get(c.addressee_id) for c in outgoing_connections
+            users_by_id[uid] for uid in outgoing_user_ids if uid in users_by_id
         ]
-        outgoing_users = [u for u in outgoing_users if u]
         outgoing_connection_ids = {
             c.addressee_id: c.id
             for c in outgoing_connections
@@ -1037,18 +997,9 @@ def network():
 
         suggestions = get_people_you_may_know(current_user, limit=20)
 
-        # Get ALL connections involving current user (for exclusion)
-        all_connection_user_ids = set()
-        all_connections = Connection.query.filter(
-            db.or_(Connection.requester_id == current_user.id,
-                   Connection.addressee_id == current_user.id)).all()
-        for conn in all_connections:
-            all_connection_user_ids.add(conn.requester_id)
-            all_connection_user_ids.add(conn.addressee_id)
-        all_connection_user_ids.discard(current_user.id)
-
-        # Combine connected IDs with all connection IDs for exclusion
-        exclude_ids = all_connected_ids.union(all_connection_user_ids)
+        # Exclude everyone already followed or in any connection state
+        exclude_ids = SocialGraph.excluded_ids(current_user.id)
+        exclude_ids.discard(current_user.id)
 
         # People near me
         near_me = []
@@ -1473,7 +1424,10 @@ def follow_user(user_id):
     if existing:
         # Unfollow
         db.session.delete(existing)
+        increment_counters(user_id, followers=-1)
+        increment_counters(current_user.id, following=-1)
         db.session.commit()
+        SocialGraph.on_unfollow(current_user.id, user_id)
         if request.headers.get('Accept') == 'application/json':
             return jsonify({'success': True, 'following': False})
         flash(f'Unfollowed {user.first_name}', 'info')
@@ -1485,7 +1439,10 @@ def follow_user(user_id):
         # Notify the user
         notify_follow(user_id, current_user)
 
+        increment_counters(user_id, followers=1)
+        increment_counters(current_user.id, following=1)
         db.session.commit()
+        SocialGraph.on_follow(current_user.id, user_id)
         if request.headers.get('Accept') == 'application/json':
             return jsonify({'success': True, 'following': True})
         flash(f'Now connected with {user.first_name}!', 'success')
@@ -1502,7 +1459,7 @@ def activity_feed():
     page = request.args.get('page', 1, type=int)
     per_page = 20
     
-    following_ids = [f.following_id for f in Follow.query.filter_by(follower_id=current_user.id).all()]
+    following_ids = list(SocialGraph.following(current_user.id))
     
     if not following_ids:
         activities = []
@@ -3,11 +3,15 @@ Media Routes - Handle image and video uploads
 """
 import os
 import uuid
+import hashlib
 from datetime import datetime
-from flask import Blueprint, request, jsonify, current_app, send_from_directory, Response, make_response
+from flask import Blueprint, request, jsonify, current_app, send_from_directory, send_file, abort, Response
 from flask_login import login_required, current_user
+from werkzeug.exceptions import NotFound
 from werkzeug.utils import secure_filename
-from object_storage_utils import upload_file, download_file, OBJECT_STORAGE_AVAILABLE
+from object_storage_utils import OBJECT_STORAGE_AVAILABLE
+from utils.upload_pipeline import store_upload, store_uploads, UploadRejected
+from utils.image_variants import ImageVariants
 
 media_bp = Blueprint('media', __name__, url_prefix='/media')
 
@@ -30,6 +34,30 @@ def allowed_file(filename, file_type='image'):
     return False
 
 
+def _classify_upload(filename):
+    """(file_type, subdir, max_size) for an allowed upload, else None"""
+    ext = get_file_extension(filename)
+    if ext in ALLOWED_IMAGE_EXTENSIONS:
+        return 'image', 'images', MAX_IMAGE_SIZE
+    if ext in ALLOWED_VIDEO_EXTENSIONS:
+        return 'video', 'videos', MAX_VIDEO_SIZE
+    return None
+
+
+def _upload_result(file, file_type, subdir, stored):
+    url_path = f"/media/uploads/{subdir}/{stored['filename']}"
+    if file_type == 'image':
+        ImageVariants.enqueue(url_path)
+    return {
+        'success': True,
+        'file_path': url_path,
+        'file_type': file_type,
+        'filename': stored['filename'],
+        'original_name': secure_filename(file.filename),
+        'file_size': stored['file_size']
+    }
+
+
 def upload_single_file(file):
     """
     Upload a single file (image or video) and return result dict.
@@ -38,47 +66,17 @@ def upload_single_file(file):
     if not file or file.filename == '':
         return {'success': False, 'error': 'No file provided'}
     
-    ext = get_file_extension(file.filename)
-    if ext in ALLOWED_IMAGE_EXTENSIONS:
-        file_type = 'image'
-        max_size = MAX_IMAGE_SIZE
-        subdir = 'images'
-    elif ext in ALLOWED_VIDEO_EXTENSIONS:
-        file_type = 'video'
-        max_size = MAX_VIDEO_SIZE
-        subdir = 'videos'
-    else:
+    kind = _classify_upload(file.filename)
+    if not kind:
         return {'success': False, 'error': 'File type not allowed'}
+    file_type, subdir, max_size = kind
     
-    file.seek(0, 2)
-    file_size = file.tell()
-    file.seek(0)
-    
-    if file_size > max_size:
-        return {'success': False, 'error': f'File too large. Max size: {max_size // (1024*1024)}MB'}
+    try:
+        stored = store_upload(file, subdir, max_size, ensure_upload_dirs())
+    except UploadRejected as e:
+        return {'success': False, 'error': str(e)}
     
-    unique_filename = generate_unique_filename(file.filename)
-    url_path = f"/media/uploads/{subdir}/{unique_filename}"
-    object_path = f"uploads/{subdir}/{unique_filename}"
-    
-    file_bytes = file.read()
-    file.seek(0)
-    
-    if OBJECT_STORAGE_AVAILABLE:
-        upload_file(file_bytes, object_path)
-    
-    base_path = ensure_upload_dirs()
-    file_path = os.path.join(base_path, subdir, unique_filename)
-    file.save(file_path)
-    
-    return {
-        'success': True,
-        'file_path': url_path,
-        'file_type': file_type,
-        'filename': unique_filename,
-        'original_name': secure_filename(file.filename),
-        'file_size': file_size
-    }
+    return _upload_result(file, file_type, subdir, stored)
 
 
 def get_file_extension(filename):
@@ -100,28 +98,52 @@ def ensure_upload_dirs():
     return base_path
 
 
+MEDIA_CONTENT_TYPES = {
+    'jpg': 'image/jpeg', 'jpeg': 'image/jpeg',
+    'png': 'image/png', 'gif': 'image/gif', 'webp': 'image/webp',
+    'mp4': 'video/mp4', 'mov': 'video/quicktime', 'webm': 'video/webm',
+    'pdf': 'application/pdf'
+}
+MEDIA_MAX_AGE = 31536000  # upload names are unique, so content never changes
+
+
+def send_media(filename):
+    """
+    Stream an uploaded file with Range (206), ETag and 304 support.
+    Shared by /media/uploads routes; objects come from the on-disk media
+    cache backed by Object Storage, then the local upload folders.
+    """
+    from utils.media_cache import MediaCache
+    
+    object_path = f"uploads/{filename}"
+    content_type = MEDIA_CONTENT_TYPES.get(get_file_extension(filename), 'application/octet-stream')
+    
+    if OBJECT_STORAGE_AVAILABLE and '..' not in filename.split('/'):
+        local_path = MediaCache.get_path(object_path)
+        if local_path:
+            try:
+                etag = hashlib.sha1(f"{object_path}:{os.path.getsize(local_path)}".encode()).hexdigest()
+                response = send_file(local_path, mimetype=content_type, conditional=True,
+                                     etag=etag, max_age=MEDIA_MAX_AGE)
+                response.headers['Cache-Control'] = f'public, max-age={MEDIA_MAX_AGE}, immutable'
+                return response
+            except FileNotFoundError:
+                pass  # evicted between lookup and open; fall through
+    
+    for base_path in (os.path.join(current_app.root_path, UPLOAD_FOLDER),
+                      os.path.join(os.getcwd(), 'media', 'uploads')):
+        try:
+            return send_from_directory(base_path, filename, mimetype=content_type,
+                                       conditional=True, max_age=MEDIA_MAX_AGE)
+        except NotFound:
+            continue
+    abort(404)
+
+
 @media_bp.route('/uploads/<path:filename>')
 def serve_upload(filename):
     """Serve uploaded files from Object Storage or local filesystem"""
-    object_path = f"uploads/{filename}"
-    
-    if OBJECT_STORAGE_AVAILABLE:
-        file_data = download_file(object_path)
-        if file_data:
-            ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
-            content_types = {
-                'jpg': 'image/jpeg', 'jpeg': 'image/jpeg',
-                'png': 'image/png', 'gif': 'image/gif', 'webp': 'image/webp',
-                'mp4': 'video/mp4', 'mov': 'video/quicktime', 'webm': 'video/webm'
-            }
-            content_type = content_types.get(ext, 'application/octet-stream')
-            response = make_response(file_data)
-            response.headers['Content-Type'] = content_type
-            response.headers['Cache-Control'] = 'public, max-age=31536000'
-            return response
-    
-    upload_path = os.path.join(current_app.root_path, UPLOAD_FOLDER)
-    return send_from_directory(upload_path, filename)
+    return send_media(filename)
 
 
 @media_bp.route('/upload', methods=['POST'])
@@ -136,47 +158,11 @@ def upload_media():
     if file.filename == '':
         return jsonify({'error': 'No file selected'}), 400
     
-    ext = get_file_extension(file.filename)
-    if ext in ALLOWED_IMAGE_EXTENSIONS:
-        file_type = 'image'
-        max_size = MAX_IMAGE_SIZE
-        subdir = 'images'
-    elif ext in ALLOWED_VIDEO_EXTENSIONS:
-        file_type = 'video'
-        max_size = MAX_VIDEO_SIZE
-        subdir = 'videos'
-    else:
-        return jsonify({'error': 'File type not allowed'}), 400
-    
-    file.seek(0, 2)
-    file_size = file.tell()
-    file.seek(0)
-    
-    if file_size > max_size:
-        return jsonify({'error': f'File too large. Max size: {max_size // (1024*1024)}MB'}), 400
-    
-    unique_filename = generate_unique_filename(file.filename)
-    url_path = f"/media/uploads/{subdir}/{unique_filename}"
-    object_path = f"uploads/{subdir}/{unique_filename}"
-    
-    file_bytes = file.read()
-    file.seek(0)
-    
-    if OBJECT_STORAGE_AVAILABLE:
-        upload_file(file_bytes, object_path)
+    result = upload_single_file(file)
+    if not result['success']:
+        return jsonify({'error': result['error']}), 400
     
-    base_path = ensure_upload_dirs()
-    file_path = os.path.join(base_path, subdir, unique_filename)
-    file.save(file_path)
-    
-    return jsonify({
-        'success': True,
-        'file_path': url_path,
-        'file_type': file_type,
-        'filename': unique_filename,
-        'original_name': secure_filename(file.filename),
-        'file_size': file_size
-    })
+    return jsonify(result)
 
 
 @media_bp.route('/upload/multiple', methods=['POST'])
@@ -191,50 +177,40 @@ def upload_multiple():
     if len(files) > 10:
         return jsonify({'error': 'Maximum 10 files allowed per post'}), 400
     
-    uploaded_files = []
-    base_path = ensure_upload_dirs()
-    
+    accepted = []
+    errors = []
     for file in files:
         if file.filename == '':
             continue
-        
-        ext = get_file_extension(file.filename)
-        
-        if ext in ALLOWED_IMAGE_EXTENSIONS:
-            file_type = 'image'
-            subdir = 'images'
-        elif ext in ALLOWED_VIDEO_EXTENSIONS:
-            file_type = 'video'
-            subdir = 'videos'
+        kind = _classify_upload(file.filename)
+        if kind:
+            accepted.append((file, kind))
         else:
+            errors.append({'filename': file.filename, 'error': 'File type not allowed'})
+    
+    # Hashing, disk writes and Object Storage uploads run in parallel
+    results = store_uploads([(file, subdir, max_size) for file, (_, subdir, max_size) in accepted],
+                            ensure_upload_dirs())
+    
+    uploaded_files = []
+    for (file, (file_type, subdir, _)), stored in zip(accepted, results):
+        if 'error' in stored:
+            errors.append({'filename': file.filename, 'error': stored['error']})
             continue
-        
-        unique_filename = generate_unique_filename(file.filename)
-        file_path = os.path.join(base_path, subdir, unique_filename)
-        url_path = f"/media/uploads/{subdir}/{unique_filename}"
-        object_path = f"uploads/{subdir}/{unique_filename}"
-        
-        file.seek(0, 2)
-        file_size = file.tell()
-        file.seek(0)
-        
-        file_bytes = file.read()
-        file.seek(0)
-        
-        if OBJECT_STORAGE_AVAILABLE:
-            upload_file(file_bytes, object_path)
-        
-        file.save(file_path)
-        
+        result = _upload_result(file, file_type, subdir, stored)
         uploaded_files.append({
-            'file_path': url_path,
+            'file_path': result['file_path'],
             'file_type': file_type,
-            'filename': unique_filename,
-            'file_size': file_size
+            'filename': result['filename'],
+            'file_size': result['file_size']
         })
     
+    if errors and not uploaded_files:
+        return jsonify({'error': errors[0]['error'], 'errors': errors}), 400
+    
     return jsonify({
         'success': True,
         'files': uploaded_files,
-        'count': len(uploaded_files)
+        'count': len(uploaded_files),
+        'errors': errors
     })
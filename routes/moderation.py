@@ -368,6 +368,9 @@ def add_keyword():
         db.session.add(new_keyword)
         db.session.commit()
         
+        from utils.keyword_matcher import KeywordMatcher
+        KeywordMatcher.bump_version()
+        
         flash(f'Keyword "{keyword}" added to filter list.', 'success')
     except Exception as e:
         logger.error(f"Error adding keyword: {e}")
@@ -389,18 +392,9 @@ def check_content():
     reasons = []
     
     try:
-        from models import BlockedKeyword
-        keywords = BlockedKeyword.query.filter_by(is_active=True).all()
-        
-        content_lower = content.lower()
-        for kw in keywords:
-            if kw.keyword in content_lower:
-                flagged = True
-                reasons.append({
-                    'keyword': kw.keyword,
-                    'severity': kw.severity,
-                    'action': kw.action
-                })
+        from utils.keyword_matcher import KeywordMatcher
+        reasons = KeywordMatcher.match(content)
+        flagged = bool(reasons)
     except Exception as e:
         logger.error(f"Error checking content: {e}")
     
@@ -8,6 +8,9 @@ from app import db
 from models import Room, Post, PostVote, Comment, RoomMembership, PostMention, User, PostMedia, Bookmark, PostHashtag, Mention, Notification, Petition, PetitionSignature, UserMedicalLicense
 from utils.content import extract_mentions, render_content_with_links
 from routes.notifications import notify_mention
+from deal_signals import bump_deal_signal
+from utils.achievements import increment_counters
+from utils.catalog import Catalog
 
 rooms_bp = Blueprint('rooms', __name__, url_prefix='/rooms')
 
@@ -48,7 +51,7 @@ def generate_slug(name):
 @rooms_bp.route('/')
 @login_required
 def list_rooms():
-    """List all investment rooms with filtering and sorting"""
+    """List investment rooms with filtering, sorting and keyset pagination"""
     # Filter parameters
     category_filter = request.args.get('category')
     sort_by = request.args.get('sort', 'popular')
@@ -64,15 +67,18 @@ def list_rooms():
     
     # Sorting
     if sort_by == 'newest':
-        query = query.order_by(Room.created_at.desc())
+        order = [(Room.created_at, 'desc')]
     elif sort_by == 'alphabetical':
-        query = query.order_by(Room.name.asc())
+        order = [(Room.name, 'asc')]
     elif sort_by == 'active':
-        query = query.order_by(Room.post_count.desc())
+        order = [(db.func.coalesce(Room.post_count, 0), 'desc')]
     else:
-        query = query.order_by(Room.member_count.desc())
+        order = [(db.func.coalesce(Room.member_count, 0), 'desc')]
     
-    rooms = query.all()
+    page = Catalog.page('rooms', Room, query, order,
+                        filters={'category': category_filter, 'q': search.lower(), 'sort': sort_by},
+                        cursor=request.args.get('cursor'))
+    rooms = page.items
     
     # Group by category for display
     categories = {}
@@ -85,6 +91,7 @@ def list_rooms():
     return render_template('rooms/list.html', 
                          categories=categories, 
                          rooms=rooms,
+                         next_url=page.next_url(),
                          room_categories=ROOM_CATEGORIES,
                          room_icons=ROOM_ICONS,
                          category_filter=category_filter,
@@ -278,6 +285,7 @@ def create_room_post(slug):
                 notify_mention(mentioned_user.id, current_user.id, post.id)
     
     current_user.add_points(5)
+    increment_counters(current_user.id, posts=1)
     db.session.commit()
     
     flash('Post created!', 'success')
@@ -335,6 +343,9 @@ def delete_post(post_id):
         Mention.query.filter_by(post_id=post_id).delete()
         Notification.query.filter_by(post_id=post_id).delete()
         
+        increment_counters(post.author_id, posts=-1,
+                           likes_received=-(post.upvotes or 0),
+                           comments_received=-(post.comment_count or 0))
         db.session.delete(post)
         db.session.commit()
         flash('Post deleted successfully.', 'success')
@@ -369,6 +380,8 @@ def add_comment(post_id):
     
     post.comment_count += 1
     db.session.add(comment)
+    bump_deal_signal(post_id, comments=1)
+    increment_counters(post.author_id, comments_received=1)
     current_user.add_points(2)
     db.session.commit()
     
@@ -269,25 +269,48 @@ def stripe_webhook():
         else:
             event = stripe.Event.construct_from(request.get_json(), stripe.api_key)
         
-        event_type = event['type']
-        data = event['data']['object']
+        import json
+        from utils.webhook_inbox import WebhookInbox
         
-        if event_type == 'customer.subscription.updated':
-            handle_subscription_updated(data)
-        elif event_type == 'customer.subscription.deleted':
-            handle_subscription_deleted(data)
-        elif event_type == 'invoice.payment_succeeded':
-            handle_payment_succeeded(data)
-        elif event_type == 'invoice.payment_failed':
-            handle_payment_failed(data)
+        # Work from the verified raw payload (plain dicts, exactly as Stripe sent it)
+        body = json.loads(payload)
+        data = body['data']['object']
+        customer_id = data.get('customer') or (data.get('id') if data.get('object') == 'customer' else None)
         
-        return jsonify({'status': 'success'}), 200
+        # Store and acknowledge; the inbox consumer applies it off the request path
+        is_new = WebhookInbox.record(
+            'stripe',
+            event['id'],
+            payload.decode('utf-8'),
+            event_type=event['type'],
+            ordering_key=customer_id,
+            event_created=body.get('created'),
+        )
+        if is_new:
+            WebhookInbox.kick('stripe')
+        
+        return jsonify({'status': 'queued' if is_new else 'duplicate'}), 200
         
     except Exception as e:
         logger.error(f"Webhook error: {e}")
         return jsonify({'error': str(e)}), 400
 
 
+def apply_stripe_event(event):
+    """Apply one stored Stripe event (called by the webhook inbox consumer)"""
+    event_type = event['type']
+    data = event['data']['object']
+    
+    if event_type == 'customer.subscription.updated':
+        handle_subscription_updated(data)
+    elif event_type == 'customer.subscription.deleted':
+        handle_subscription_deleted(data)
+    elif event_type == 'invoice.payment_succeeded':
+        handle_payment_succeeded(data)
+    elif event_type == 'invoice.payment_failed':
+        handle_payment_failed(data)
+
+
 def handle_subscription_updated(subscription_data):
     """Handle subscription update from Stripe"""
     stripe_sub_id = subscription_data.get('id')
@@ -331,9 +354,9 @@ def handle_payment_succeeded(invoice_data):
         payment = Payment(
             user_id=user.id,
             amount=amount,
-            stripe_payment_id=invoice_data.get('id'),
-            status='completed',
-            payment_method='stripe'
+            stripe_payment_intent_id=invoice_data.get('payment_intent') or invoice_data.get('id'),
+            status='succeeded',
+            payment_type='subscription'
         )
         db.session.add(payment)
         db.session.commit()
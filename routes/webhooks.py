@@ -4,6 +4,7 @@ import logging
 import hashlib
 import hmac
 import json
+import time
 from flask import Blueprint, request, jsonify
 from datetime import datetime
 from app import db
@@ -62,39 +63,128 @@ def facebook_webhook_verify():
 
 @webhooks_bp.route('/facebook', methods=['POST'])
 def facebook_webhook_receive():
-    """Receive messages and feed posts from Facebook - POST request"""
+    """Receive messages and feed posts from Facebook - POST request
+    
+    The raw payload is stored in the webhook inbox and acknowledged at once;
+    apply_facebook_batch processes it off the request path.
+    """
     try:
         signature = request.headers.get('X-Hub-Signature', '')
         if not verify_facebook_webhook(request.data, signature):
             logger.warning("Invalid webhook signature!")
             return jsonify({'error': 'Invalid signature'}), 403
 
-        data = request.get_json()
-        logger.info(f"Facebook webhook received: {json.dumps(data)[:500]}")
-
-        if not data:
+        body = request.get_data()
+        if not body:
             logger.warning("Empty webhook data")
             return jsonify({'error': 'No data'}), 400
 
-        if data.get('object') == 'page':
-            for entry in data.get('entry', []):
-                # Handle Messenger messages
-                for messaging in entry.get('messaging', []):
-                    process_messaging_event(messaging)
-                
-                # Handle Page feed changes (posts on the Facebook Page)
-                for change in entry.get('changes', []):
-                    process_page_feed_change(change, entry.get('id'))
+        from utils.webhook_inbox import WebhookInbox
+
+        # Facebook retries resend the identical body, so its hash dedupes them
+        is_new = WebhookInbox.record(
+            'facebook',
+            hashlib.sha256(body).hexdigest(),
+            body.decode('utf-8'),
+            event_created=int(time.time()),
+        )
+        logger.debug(f"Facebook webhook received: {len(body)} bytes ({'new' if is_new else 'duplicate'})")
+        if is_new:
+            WebhookInbox.kick('facebook')
 
         return jsonify({'status': 'ok'}), 200
 
     except Exception as e:
-        logger.error(f"Error processing Facebook webhook: {e}")
+        logger.error(f"Error storing Facebook webhook: {e}")
         return jsonify({'error': str(e)}), 500
 
 
-def process_messaging_event(messaging):
-    """Process individual messaging events from Facebook"""
+def apply_facebook_batch(payloads):
+    """Apply a batch of stored Facebook payloads, oldest first (webhook inbox consumer)
+    
+    Repeated changes to the same Page object collapse to their final state and
+    Messenger messages are posted once per mid, even when a failed batch is
+    retried (the inbox redelivers it whole); read receipts go out in parallel.
+    """
+    messages = {}
+    changes = {}
+    for data in payloads:
+        if not data or data.get('object') != 'page':
+            continue
+        for entry in data.get('entry', []):
+            page_id = entry.get('id')
+            for messaging in entry.get('messaging', []):
+                mid = (messaging.get('message') or {}).get('mid')
+                messages.setdefault(mid or id(messaging), messaging)
+            for change in entry.get('changes', []):
+                _coalesce_change(changes, change, page_id)
+
+    from models import Post
+    mids = [mid for mid in messages if isinstance(mid, str)]
+    posted_mids = {
+        row[0] for row in db.session.query(Post.facebook_message_id)
+        .filter(Post.facebook_message_id.in_(mids)).all()
+    } if mids else set()
+
+    receipt_senders = []
+    for mid, messaging in messages.items():
+        if mid in posted_mids:
+            continue
+        sender_id = process_messaging_event(messaging, send_receipt=False)
+        if sender_id and sender_id not in receipt_senders:
+            receipt_senders.append(sender_id)
+    if receipt_senders:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(8, len(receipt_senders))) as executor:
+            list(executor.map(send_read_receipt, receipt_senders))
+
+    new_post_ids = [
+        (change.get('value') or {}).get('post_id') for change, _ in changes.values()
+        if (change.get('value') or {}).get('verb') == 'add'
+    ]
+    new_post_ids = [post_id for post_id in new_post_ids if post_id]
+    existing_ids = {
+        row[0] for row in db.session.query(Post.facebook_post_id)
+        .filter(Post.facebook_post_id.in_(new_post_ids)).all()
+    } if new_post_ids else set()
+    for change, page_id in changes.values():
+        process_page_feed_change(change, page_id, existing_ids=existing_ids)
+
+    logger.info(f"Applied Facebook batch: {len(payloads)} payloads, {len(messages)} messages, "
+                f"{len(changes)} changes")
+
+
+def _coalesce_change(changes, change, page_id):
+    """Keep only the final state of each changed object, in first-seen order"""
+    value = change.get('value') or {}
+    object_id = value.get('comment_id') or value.get('post_id')
+    if not object_id:
+        changes[(page_id, id(change))] = (change, page_id)
+        return
+
+    key = (page_id, change.get('field'), object_id)
+    previous = changes.get(key)
+    if previous is None:
+        changes[key] = (change, page_id)
+        return
+
+    verb = value.get('verb')
+    added = (previous[0].get('value') or {}).get('verb') == 'add'
+    if verb == 'remove' and added:
+        # Added and removed within the batch: nothing to do
+        del changes[key]
+    elif verb == 'edited' and added:
+        # Create it once, with the latest content
+        changes[key] = ({**change, 'value': {**value, 'verb': 'add'}}, page_id)
+    else:
+        changes[key] = (change, page_id)
+
+
+def process_messaging_event(messaging, send_receipt=True):
+    """Process individual messaging events from Facebook
+    
+    Returns the sender ID when a text message was handled.
+    """
     sender_id = messaging.get('sender', {}).get('id')
     recipient_id = messaging.get('recipient', {}).get('id')
     timestamp = messaging.get('timestamp')
@@ -108,8 +198,11 @@ def process_messaging_event(messaging):
 
         if text:
             logger.info(f"Message from {sender_id}: {text}")
-            send_read_receipt(sender_id)
-            process_message_for_platform(sender_id, text)
+            if send_receipt:
+                send_read_receipt(sender_id)
+            process_message_for_platform(sender_id, text, message_id=message_id)
+            return sender_id
+    return None
 
 
 def send_read_receipt(sender_id):
@@ -128,15 +221,18 @@ def send_read_receipt(sender_id):
             'sender_action': 'mark_seen',
             'access_token': facebook_page_access_token
         }
-        response = requests.post(url, json=payload)
+        response = requests.post(url, json=payload, timeout=10)
         if response.status_code != 200:
             logger.warning(f"Failed to send read receipt: {response.text}")
     except Exception as e:
         logger.error(f"Error sending read receipt: {e}")
 
 
-def process_message_for_platform(sender_id, message_text):
-    """Process incoming Facebook message and create post on platform"""
+def process_message_for_platform(sender_id, message_text, message_id=None):
+    """Process incoming Facebook message and create post on platform
+
+    message_id: Messenger mid, stored on the post so a retried batch skips it
+    """
     try:
         logger.info(f"Processing message for platform from {sender_id}: {message_text}")
         
@@ -154,9 +250,10 @@ def process_message_for_platform(sender_id, message_text):
         from models import Post
 
         post = Post(
-            user_id=user.id,
+            author_id=user.id,
             content=message_text,
-            post_type='text'
+            post_type='text',
+            facebook_message_id=message_id
         )
         db.session.add(post)
         db.session.commit()
@@ -168,8 +265,11 @@ def process_message_for_platform(sender_id, message_text):
         db.session.rollback()
 
 
-def process_page_feed_change(change, page_id):
-    """Process Facebook Page feed changes (new posts on the page)"""
+def process_page_feed_change(change, page_id, existing_ids=None):
+    """Process Facebook Page feed changes (new posts on the page)
+    
+    existing_ids: facebook_post_ids already on the platform, prefetched for a batch
+    """
     try:
         field = change.get('field')
         value = change.get('value', {})
@@ -202,7 +302,10 @@ def process_page_feed_change(change, page_id):
         
         # Check if this post was already synced (avoid duplicates)
         from models import Post
-        existing = Post.query.filter_by(facebook_post_id=post_id).first() if post_id else None
+        if existing_ids is not None:
+            existing = post_id in existing_ids
+        else:
+            existing = Post.query.filter_by(facebook_post_id=post_id).first() if post_id else None
         if existing:
             logger.info(f"Post {post_id} already exists on platform")
             return
@@ -215,7 +318,7 @@ def process_page_feed_change(change, page_id):
         # If no matching user, create the post under a system/admin account or skip
         if not user:
             # Find an admin user to attribute the post to
-            user = User.query.filter_by(is_admin=True).first()
+            user = User.query.filter_by(role='admin').first()
             if not user:
                 logger.warning(f"No admin user found to attribute Facebook post from {from_name}")
                 return
@@ -225,13 +328,15 @@ def process_page_feed_change(change, page_id):
         
         # Create the post on the platform
         post = Post(
-            user_id=user.id,
+            author_id=user.id,
             content=message,
             post_type='text',
             facebook_post_id=post_id
         )
         db.session.add(post)
         db.session.commit()
+        if existing_ids is not None and post_id:
+            existing_ids.add(post_id)
         
         logger.info(f"Created post from Facebook Page: {post.id} (FB: {post_id})")
         
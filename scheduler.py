@@ -59,10 +59,12 @@ class SimpleScheduler:
             time.sleep(60)
     
     def _run_job(self, job):
-        """Run a single job."""
+        """Run a single job (only on the cluster's scheduler leader, never overlapping)."""
+        from utils.job_coordinator import JobCoordinator
+        
         try:
             logger.info(f"Running job: {job['name']}")
-            job['func']()
+            JobCoordinator.run(job['name'], job['func'])
             job['last_run'] = datetime.utcnow()
             logger.info(f"Completed job: {job['name']}")
         except Exception as e:
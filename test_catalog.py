@@ -0,0 +1,97 @@
+"""
+Unit tests for catalog keyset cursors and the seek predicate.
+
+Run with: pytest test_catalog.py -v
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, create_engine, select
+
+from utils.catalog import _seek, decode_cursor, encode_cursor
+
+metadata = MetaData()
+items = Table(
+    'catalog_items', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('price', Integer),
+    Column('title', String(20)),
+    Column('starts_at', DateTime),
+)
+
+
+@pytest.fixture
+def conn():
+    """In-memory table with many ties on each sort column."""
+    engine = create_engine('sqlite:///:memory:')
+    metadata.create_all(engine)
+    base = datetime(2026, 1, 1, 9, 30)
+    rows = [{
+        'id': i,
+        'price': (i * 7) % 4,
+        'title': 'abc'[(i * 5) % 3],
+        'starts_at': base + timedelta(hours=i % 5),
+    } for i in range(1, 41)]
+    with engine.connect() as connection:
+        connection.execute(items.insert(), rows)
+        yield connection
+
+
+def paginate(conn, keys, per_page):
+    """Walk every page through encoded cursors, as Catalog.page does."""
+    columns = [expression for expression, _ in keys]
+    ordering = [expression.desc() if direction == 'desc' else expression.asc()
+                for expression, direction in keys]
+    seen, cursor = [], None
+    while True:
+        query = select(*columns)
+        if cursor is not None:
+            query = query.where(_seek(keys, decode_cursor(cursor)))
+        rows = conn.execute(query.order_by(*ordering).limit(per_page)).all()
+        if not rows:
+            return seen
+        seen.extend(row[-1] for row in rows)
+        cursor = encode_cursor(list(rows[-1]))
+
+
+class TestCursor:
+    """Test cursor encoding."""
+
+    def test_round_trip(self):
+        """Plain values and datetimes survive encoding."""
+        values = [3, 'title', None, 1.5, datetime(2026, 3, 4, 5, 6, 7, 890)]
+        cursor = encode_cursor(values)
+        assert '=' not in cursor
+        assert decode_cursor(cursor) == values
+
+    def test_malformed(self):
+        """Garbage cursors decode to None."""
+        assert decode_cursor('not a cursor!') is None
+        assert decode_cursor(encode_cursor([{'x': 1}])) is None
+
+
+class TestSeek:
+    """Test keyset pagination over mixed sort directions."""
+
+    @pytest.mark.parametrize('directions', [
+        ('asc', 'asc', 'asc'),
+        ('desc', 'asc', 'asc'),
+        ('asc', 'desc', 'asc'),
+        ('desc', 'desc', 'desc'),
+        ('asc', 'desc', 'desc'),
+    ])
+    def test_pages_match_full_ordering(self, conn, directions):
+        """Pages cover every row once, in the same order as one query."""
+        keys = list(zip([items.c.price, items.c.title, items.c.id], directions))
+        ordering = [c.desc() if d == 'desc' else c.asc() for c, d in keys]
+        expected = conn.execute(select(items.c.id).order_by(*ordering)).scalars().all()
+        for per_page in (1, 3, 7, 40):
+            assert paginate(conn, keys, per_page) == expected
+
+    def test_datetime_key(self, conn):
+        """A datetime sort key seeks correctly after a cursor round trip."""
+        keys = [(items.c.starts_at, 'desc'), (items.c.id, 'asc')]
+        expected = conn.execute(
+            select(items.c.id).order_by(items.c.starts_at.desc(), items.c.id.asc())
+        ).scalars().all()
+        assert paginate(conn, keys, 6) == expected
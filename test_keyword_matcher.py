@@ -0,0 +1,54 @@
+"""
+Unit tests for the Aho-Corasick automaton behind blocked keyword matching.
+
+Run with: pytest test_keyword_matcher.py -v
+"""
+from utils.keyword_matcher import AhoCorasick
+
+
+def naive_find(patterns, text):
+    """Reference result: every pattern that is a substring of text."""
+    return {i for i, pattern in enumerate(patterns) if pattern and pattern in text}
+
+
+class TestAhoCorasick:
+    """Test multi-pattern matching."""
+
+    def test_no_match(self):
+        """Text without any pattern yields nothing."""
+        assert AhoCorasick(['scam', 'fraud']).find('a legitimate offer') == set()
+
+    def test_overlapping_patterns(self):
+        """Patterns that overlap in the text are all reported."""
+        patterns = ['he', 'she', 'his', 'hers']
+        assert AhoCorasick(patterns).find('ushers') == {0, 1, 3}
+
+    def test_pattern_inside_another(self):
+        """A pattern that is a suffix or infix of a longer one still matches."""
+        patterns = ['pump and dump', 'dump', 'and']
+        matcher = AhoCorasick(patterns)
+        assert matcher.find('classic pump and dump scheme') == {0, 1, 2}
+        assert matcher.find('dump') == {1}
+
+    def test_match_across_failed_prefix(self):
+        """A partial match that fails falls back without missing a later hit."""
+        patterns = ['abcd', 'bce', 'c']
+        assert AhoCorasick(patterns).find('abce') == {1, 2}
+
+    def test_repeated_characters(self):
+        """Self-overlapping patterns are found in runs of one character."""
+        patterns = ['aa', 'aaa', 'aaaa']
+        matcher = AhoCorasick(patterns)
+        assert matcher.find('aaa') == {0, 1}
+        assert matcher.find('aaaaa') == {0, 1, 2}
+
+    def test_matches_naive_search(self):
+        """Agrees with a substring scan on many overlapping patterns."""
+        patterns = ['ab', 'bab', 'abab', 'b', 'ba', 'aab', 'bb', 'abba']
+        matcher = AhoCorasick(patterns)
+        for text in ['', 'a', 'abab', 'babba', 'aabbaab', 'bbbb', 'abbaabab']:
+            assert matcher.find(text) == naive_find(patterns, text), text
+
+    def test_empty_pattern_list(self):
+        """An empty automaton matches nothing."""
+        assert AhoCorasick([]).find('anything') == set()
@@ -0,0 +1,98 @@
+"""
+Unit tests for the in-memory skiplist behind leaderboards without Redis.
+
+Run with: pytest test_leaderboard.py -v
+"""
+import random
+
+from utils.leaderboard import SkipList
+
+
+def expected_order(scores):
+    """Reference ordering: highest score first, ties by member."""
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+class TestSkipList:
+    """Test rank, range and counting queries."""
+
+    def test_empty(self):
+        """An empty list has no ranks or entries."""
+        board = SkipList()
+        assert len(board) == 0
+        assert board.rank(1) is None
+        assert board.top(10) == []
+        assert board.count_above(0) == 0
+
+    def test_duplicate_scores_ordered_by_member(self):
+        """Members with equal scores are ranked by member."""
+        board = SkipList()
+        for member in (5, 3, 9, 1):
+            board.set(member, 10)
+        board.set(7, 20)
+        assert board.top(10) == [(7, 20), (1, 10), (3, 10), (5, 10), (9, 10)]
+        assert [board.rank(m) for m in (7, 1, 3, 5, 9)] == [0, 1, 2, 3, 4]
+
+    def test_count_above_with_ties(self):
+        """Tied members do not count as above each other."""
+        board = SkipList()
+        for member, score in {1: 50, 2: 30, 3: 30, 4: 30, 5: 10}.items():
+            board.set(member, score)
+        assert board.count_above(30) == 1
+        assert board.count_above(10) == 4
+        assert board.count_above(50) == 0
+        assert board.count_above(5) == 5
+
+    def test_top_with_offset_through_ties(self):
+        """Ranges starting inside a run of equal scores are exact."""
+        board = SkipList()
+        for member in range(20):
+            board.set(member, 100)
+        assert board.top(3, offset=5) == [(5, 100), (6, 100), (7, 100)]
+        assert board.top(5, offset=18) == [(18, 100), (19, 100)]
+        assert board.top(5, offset=20) == []
+
+    def test_incr_and_update_move_members(self):
+        """Changing a score moves the member and keeps the size."""
+        board = SkipList()
+        board.set(1, 10)
+        board.set(2, 10)
+        assert board.incr(2, 5) == 15
+        board.set(1, 30)
+        assert len(board) == 2
+        assert board.top(2) == [(1, 30), (2, 15)]
+        assert board.score(2) == 15
+
+    def test_remove(self):
+        """Removed members disappear from every query."""
+        board = SkipList()
+        for member in (1, 2, 3):
+            board.set(member, 7)
+        assert board.remove(2) is True
+        assert board.remove(2) is False
+        assert 2 not in board
+        assert board.rank(3) == 1
+        assert board.top(5) == [(1, 7), (3, 7)]
+
+    def test_matches_sorted_reference(self):
+        """Random updates with many ties agree with a sorted list."""
+        rng = random.Random(42)
+        board = SkipList()
+        scores = {}
+        for _ in range(2000):
+            member = rng.randrange(300)
+            if rng.random() < 0.1 and member in scores:
+                board.remove(member)
+                del scores[member]
+            else:
+                delta = rng.randrange(5)
+                scores[member] = scores.get(member, 0) + delta
+                board.incr(member, delta)
+
+        order = expected_order(scores)
+        assert len(board) == len(scores)
+        assert board.top(len(order)) == order
+        assert board.top(25, offset=100) == order[100:125]
+        for position, (member, score) in enumerate(order):
+            assert board.rank(member) == position
+            assert board.count_above(score) == sum(1 for s in scores.values() if s > score)
@@ -0,0 +1,92 @@
+"""
+Unit tests for the t-digest percentile sketch used by analytics rollups.
+
+Run with: pytest test_tdigest.py -v
+"""
+import bisect
+import random
+
+import pytest
+
+from utils.tdigest import TDigest
+
+QUANTILES = [0.001, 0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99, 0.999]
+
+
+def rank_error(sorted_values, estimate, q):
+    """Distance between q and the true quantile rank of the estimate."""
+    return abs(bisect.bisect_left(sorted_values, estimate) / len(sorted_values) - q)
+
+
+def max_error(q):
+    """Allowed rank error: the q(1-q) size bound keeps the tails tighter."""
+    return 0.001 if q <= 0.01 or q >= 0.99 else 0.005
+
+
+def sample(distribution, n=20000, seed=7):
+    rng = random.Random(seed)
+    draw = {
+        'uniform': rng.random,
+        'exponential': lambda: rng.expovariate(1.0),
+        'normal': lambda: rng.gauss(0.0, 1.0),
+    }[distribution]
+    return [draw() for _ in range(n)]
+
+
+class TestTDigest:
+    """Test quantile estimates and serialization."""
+
+    def test_empty(self):
+        """An empty digest has no quantiles."""
+        assert TDigest().quantile(0.5) is None
+
+    def test_single_value(self):
+        """Every quantile of one observation is that observation."""
+        digest = TDigest()
+        digest.add(42)
+        assert digest.quantile(0) == 42
+        assert digest.quantile(0.5) == 42
+        assert digest.quantile(1) == 42
+
+    def test_extremes_are_exact(self):
+        """q=0 and q=1 return the exact minimum and maximum."""
+        values = sample('normal')
+        digest = TDigest()
+        digest.update(values)
+        assert digest.quantile(0) == min(values)
+        assert digest.quantile(1) == max(values)
+        assert len(digest) == len(values)
+
+    @pytest.mark.parametrize('distribution', ['uniform', 'exponential', 'normal'])
+    def test_quantile_error_bounds(self, distribution):
+        """Estimates stay within the rank error bound across the range."""
+        values = sample(distribution)
+        digest = TDigest()
+        digest.update(values)
+        ordered = sorted(values)
+        for q in QUANTILES:
+            assert rank_error(ordered, digest.quantile(q), q) <= max_error(q), q
+
+    def test_merge_error_bounds(self):
+        """Merged digests are as accurate as one built from all values."""
+        values = sample('exponential', seed=11)
+        parts = [TDigest() for _ in range(4)]
+        for i, value in enumerate(values):
+            parts[i % 4].add(value)
+        merged = TDigest()
+        for part in parts:
+            merged.merge(part)
+        ordered = sorted(values)
+        assert merged.count == len(values)
+        assert merged.min == ordered[0] and merged.max == ordered[-1]
+        for q in QUANTILES:
+            assert rank_error(ordered, merged.quantile(q), q) <= max_error(q), q
+
+    def test_round_trip(self):
+        """to_dict/from_dict preserves the estimates."""
+        digest = TDigest()
+        digest.update(sample('uniform'))
+        restored = TDigest.from_dict(digest.to_dict())
+        assert restored.count == digest.count
+        for q in QUANTILES:
+            assert restored.quantile(q) == digest.quantile(q)
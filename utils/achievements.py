@@ -1,10 +1,14 @@
 """
 Achievements Service - Award achievements based on user activity
+Per-user counters (UserCounter) are maintained incrementally at each write
+site; count rules are only evaluated when a counter crosses a threshold, and
+a nightly job reconciles counters from source and re-checks every rule
 """
 from datetime import datetime
 import logging
+from sqlalchemy import func, update
 from app import db
-from models import Achievement, UserAchievement, User, Post, Follow
+from models import Achievement, UserAchievement, User, Post, Follow, UserCounter
 
 logger = logging.getLogger(__name__)
 
@@ -71,67 +75,264 @@ def award_achievement(user_id, achievement_code):
         return None
 
 
+# =============================================================================
+# COUNTERS
+# =============================================================================
+
+# UserCounter columns
+COUNTERS = ('posts', 'followers', 'following', 'deal_interests', 'course_enrollments',
+            'likes_received', 'comments_received', 'login_streak')
+
+# Achievement requirement_field -> UserCounter column
+COUNTER_FIELDS = {
+    'posts': 'posts',
+    'followers': 'followers',
+    'deals': 'deal_interests',
+    'courses': 'course_enrollments',
+    'streak': 'login_streak',
+}
+
+RECONCILE_BATCH = 1000
+
+
+def _rules_for(column):
+    """Count achievements driven by a counter column, as (threshold, code)"""
+    return [
+        (d['requirement_value'], d['code'])
+        for d in ACHIEVEMENT_DEFINITIONS
+        if d['requirement_type'] == 'count' and COUNTER_FIELDS.get(d['requirement_field']) == column
+    ]
+
+
+def _crossed(column, old, new):
+    return [code for threshold, code in _rules_for(column) if old < threshold <= new]
+
+
+def _earned(column, value):
+    return [code for threshold, code in _rules_for(column) if value >= threshold]
+
+
+def increment_counters(user_id, **deltas):
+    """
+    Apply counter deltas (e.g. posts=1) in the caller's transaction and
+    award count achievements whose threshold was just crossed.
+    The work runs in a savepoint, so a counter error never fails the
+    caller's write. The caller commits. Returns the codes awarded.
+    """
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not user_id or not deltas:
+        return []
+
+    try:
+        with db.session.begin_nested():
+            if _insert_counter_row(user_id):
+                # First event for this user: build the row from source, which
+                # already includes the caller's flushed change
+                counter = reconcile_user_counters([user_id])[user_id]
+                codes = [code for k in deltas for code in _earned(k, getattr(counter, k))]
+            else:
+                db.session.execute(
+                    update(UserCounter)
+                    .where(UserCounter.user_id == user_id)
+                    .values({getattr(UserCounter, k): getattr(UserCounter, k) + v for k, v in deltas.items()})
+                )
+                counter = db.session.get(UserCounter, user_id, populate_existing=True)
+                codes = [
+                    code for k, v in deltas.items() if v > 0
+                    for code in _crossed(k, getattr(counter, k) - v, getattr(counter, k))
+                ]
+            return _award_codes(user_id, codes)
+    except Exception as e:
+        logger.error(f"Error updating counters for user {user_id}: {e}")
+        return []
+
+
+def set_counter(user_id, column, value):
+    """Set an absolute counter (login_streak) and award crossed thresholds. Caller commits."""
+    try:
+        with db.session.begin_nested():
+            if _insert_counter_row(user_id):
+                counter = reconcile_user_counters([user_id])[user_id]
+                old = 0
+            else:
+                counter = db.session.get(UserCounter, user_id, populate_existing=True)
+                old = getattr(counter, column) or 0
+            setattr(counter, column, value or 0)
+            return _award_codes(user_id, _crossed(column, old, value or 0))
+    except Exception as e:
+        logger.error(f"Error setting {column} for user {user_id}: {e}")
+        return []
+
+
+def get_user_counters(user_id):
+    """The user's counter row, built from source on first access"""
+    if _insert_counter_row(user_id):
+        reconcile_user_counters([user_id])
+        db.session.commit()
+    return db.session.get(UserCounter, user_id)
+
+
+def _insert_counter_row(user_id):
+    """
+    Create the user's counter row if it doesn't exist; True if this call
+    created it. INSERT ... ON CONFLICT DO NOTHING, so two concurrent first
+    events can't both insert the same key
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        if db.session.get(UserCounter, user_id) is not None:
+            return False
+        db.session.add(UserCounter(user_id=user_id))
+        db.session.flush()
+        return True
+
+    stmt = insert(UserCounter.__table__).values(user_id=user_id).on_conflict_do_nothing(index_elements=['user_id'])
+    return db.session.execute(stmt).rowcount == 1
+
+
+def reconcile_user_counters(user_ids):
+    """Recompute counter rows for user_ids from source tables with grouped queries (no commit)"""
+    from models import DealInterest, CourseEnrollment, PostVote, Comment
+
+    user_ids = list(user_ids)
+    values = {uid: dict.fromkeys(COUNTERS, 0) for uid in user_ids}
+
+    grouped = [
+        ('posts', db.session.query(Post.author_id, func.count(Post.id))
+            .filter(Post.author_id.in_(user_ids)).group_by(Post.author_id)),
+        ('followers', db.session.query(Follow.following_id, func.count(Follow.id))
+            .filter(Follow.following_id.in_(user_ids)).group_by(Follow.following_id)),
+        ('following', db.session.query(Follow.follower_id, func.count(Follow.id))
+            .filter(Follow.follower_id.in_(user_ids)).group_by(Follow.follower_id)),
+        ('deal_interests', db.session.query(DealInterest.user_id, func.count(DealInterest.id))
+            .filter(DealInterest.user_id.in_(user_ids)).group_by(DealInterest.user_id)),
+        ('course_enrollments', db.session.query(CourseEnrollment.user_id, func.count(CourseEnrollment.id))
+            .filter(CourseEnrollment.user_id.in_(user_ids)).group_by(CourseEnrollment.user_id)),
+        ('likes_received', db.session.query(Post.author_id, func.count(PostVote.id))
+            .join(PostVote, PostVote.post_id == Post.id)
+            .filter(Post.author_id.in_(user_ids), PostVote.vote_type == 1).group_by(Post.author_id)),
+        ('comments_received', db.session.query(Post.author_id, func.count(Comment.id))
+            .join(Comment, Comment.post_id == Post.id)
+            .filter(Post.author_id.in_(user_ids)).group_by(Post.author_id)),
+        ('login_streak', db.session.query(User.id, User.login_streak).filter(User.id.in_(user_ids))),
+    ]
+    for column, query in grouped:
+        for uid, n in query:
+            values[uid][column] = n or 0
+
+    existing = {c.user_id: c for c in UserCounter.query.filter(UserCounter.user_id.in_(user_ids))}
+    now = datetime.utcnow()
+    for uid in user_ids:
+        counter = existing.get(uid)
+        if counter is None:
+            counter = UserCounter(user_id=uid)
+            db.session.add(counter)
+            existing[uid] = counter
+        for column, value in values[uid].items():
+            setattr(counter, column, value)
+        counter.reconciled_at = now
+    db.session.flush()
+    return existing
+
+
+# =============================================================================
+# RULE EVALUATION
+# =============================================================================
+
+def _award_codes(user_id, codes):
+    """Award the given achievement codes the user doesn't have yet (no commit)"""
+    if not codes:
+        return []
+    return _award_batch({user_id: codes}).get(user_id, [])
+
+
+def _award_batch(codes_by_user):
+    """Award achievements for many users with one lookup of existing awards (no commit)"""
+    codes_by_user = {uid: set(codes) for uid, codes in codes_by_user.items() if codes}
+    if not codes_by_user:
+        return {}
+
+    all_codes = set().union(*codes_by_user.values())
+    achievements = {
+        a.code: a for a in Achievement.query.filter(Achievement.code.in_(all_codes), Achievement.is_active == True)
+    }
+    if not achievements:
+        return {}
+
+    owned = set(
+        db.session.query(UserAchievement.user_id, UserAchievement.achievement_id).filter(
+            UserAchievement.user_id.in_(list(codes_by_user)),
+            UserAchievement.achievement_id.in_([a.id for a in achievements.values()]),
+        )
+    )
+
+    awarded = {}
+    for uid, codes in codes_by_user.items():
+        new = [achievements[c] for c in sorted(codes)
+               if c in achievements and (uid, achievements[c].id) not in owned]
+        if not new:
+            continue
+        for achievement in new:
+            db.session.add(UserAchievement(user_id=uid, achievement_id=achievement.id))
+        user = db.session.get(User, uid)
+        if user:
+            user.add_points(sum(a.points or 0 for a in new))
+        awarded[uid] = [a.code for a in new]
+        logger.info(f"Awarded achievements {awarded[uid]} to user {uid}")
+    return awarded
+
+
+def _earned_codes(counter, user):
+    codes = [code for column in set(COUNTER_FIELDS.values()) for code in _earned(column, getattr(counter, column) or 0)]
+    if user is not None:
+        if user.is_verified:
+            codes.append('verified')
+        if user.is_premium:
+            codes.append('premium')
+    return codes
+
+
 def check_and_award_achievements(user_id):
-    """Check all achievements and award any newly earned ones"""
-    from models import DealInterest, CourseEnrollment
-    
-    user = User.query.get(user_id)
+    """Reconcile the user's counters and award any newly earned achievements"""
+    user = db.session.get(User, user_id)
     if not user:
         return []
-    
-    awarded = []
-    
-    post_count = Post.query.filter_by(author_id=user_id).count()
-    if post_count >= 1:
-        if award_achievement(user_id, 'first_post'):
-            awarded.append('first_post')
-    if post_count >= 10:
-        if award_achievement(user_id, 'post_10'):
-            awarded.append('post_10')
-    if post_count >= 50:
-        if award_achievement(user_id, 'post_50'):
-            awarded.append('post_50')
-    
-    follower_count = Follow.query.filter_by(followed_id=user_id).count()
-    if follower_count >= 1:
-        if award_achievement(user_id, 'first_follower'):
-            awarded.append('first_follower')
-    if follower_count >= 10:
-        if award_achievement(user_id, 'followers_10'):
-            awarded.append('followers_10')
-    if follower_count >= 50:
-        if award_achievement(user_id, 'followers_50'):
-            awarded.append('followers_50')
-    
-    if user.is_verified:
-        if award_achievement(user_id, 'verified'):
-            awarded.append('verified')
-    
-    if user.is_premium:
-        if award_achievement(user_id, 'premium'):
-            awarded.append('premium')
-    
-    deal_count = DealInterest.query.filter_by(user_id=user_id).count()
-    if deal_count >= 1:
-        if award_achievement(user_id, 'first_deal'):
-            awarded.append('first_deal')
-    if deal_count >= 5:
-        if award_achievement(user_id, 'deal_5'):
-            awarded.append('deal_5')
-    
-    course_count = CourseEnrollment.query.filter_by(user_id=user_id).count()
-    if course_count >= 1:
-        if award_achievement(user_id, 'first_course'):
-            awarded.append('first_course')
-    
-    if user.login_streak >= 7:
-        if award_achievement(user_id, 'streak_7'):
-            awarded.append('streak_7')
-    if user.login_streak >= 30:
-        if award_achievement(user_id, 'streak_30'):
-            awarded.append('streak_30')
-    
-    return awarded
+
+    try:
+        counter = reconcile_user_counters([user_id])[user_id]
+        awarded = _award_codes(user_id, _earned_codes(counter, user))
+        db.session.commit()
+        return awarded
+    except Exception as e:
+        logger.error(f"Error checking achievements for user {user_id}: {e}")
+        db.session.rollback()
+        return []
+
+
+def reconcile_all_counters(batch_size=RECONCILE_BATCH):
+    """Nightly: rebuild every user's counters from source and award anything missed"""
+    last_id = 0
+    users_done = 0
+    awarded_total = 0
+    while True:
+        users = User.query.filter(User.id > last_id).order_by(User.id).limit(batch_size).all()
+        if not users:
+            break
+        last_id = users[-1].id
+
+        counters = reconcile_user_counters([u.id for u in users])
+        awarded = _award_batch({u.id: _earned_codes(counters[u.id], u) for u in users})
+        db.session.commit()
+
+        users_done += len(users)
+        awarded_total += sum(len(codes) for codes in awarded.values())
+
+    logger.info(f"Reconciled counters for {users_done} users, awarded {awarded_total} achievements")
+    return {'users': users_done, 'awarded': awarded_total}
 
 
 def get_user_achievements(user_id):
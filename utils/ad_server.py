@@ -0,0 +1,264 @@
+"""
+Ad Server - In-memory ad decisioning and buffered impression logging
+Keeps the eligible creative set per format in process memory, picks a
+creative by weighted sampling under a per-user daily frequency cap, and
+queues impressions for a background writer that bulk-inserts them
+"""
+import json
+import time
+import random
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from utils.cache_service import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ServedCreative:
+    """Detached, read-only view of an AdCreative for templates"""
+    id: int
+    campaign_id: int
+    format: str
+    headline: str
+    body: str
+    image_url: Optional[str]
+    video_url: Optional[str]
+    cta_text: str
+    landing_url: str
+    disclaimer_text: str
+    start_at: Optional[datetime]
+    end_at: Optional[datetime]
+    weight: float
+    frequency_cap: int
+
+    def is_live(self, now: datetime) -> bool:
+        return (self.start_at is None or self.start_at <= now) and \
+            (self.end_at is None or self.end_at >= now)
+
+
+_inventory: Dict[str, List[ServedCreative]] = {}
+_inventory_lock = threading.Lock()
+_state = {
+    'loaded_at': 0.0,
+    'version': None,
+    'version_checked_at': 0.0,
+    'next_boundary': None,
+}
+_memory_frequency: Dict[str, int] = {}
+_memory_frequency_day = {'day': None}
+
+
+class AdServer:
+    """Per-process eligible-creative index with shared invalidation"""
+
+    VERSION_KEY = 'ads:version'
+    FREQUENCY_PREFIX = 'ads:freq:'
+    VERSION_CHECK_SECONDS = 5      # how often to look for CRUD in other workers
+    MAX_AGE_SECONDS = 300          # hard reload interval
+    DEFAULT_FREQUENCY_CAP = 5      # impressions per user per creative per day
+
+    # =========================================================================
+    # SELECTION
+    # =========================================================================
+
+    @classmethod
+    def select(cls, format_type: str, user_id: Optional[int] = None) -> Optional[ServedCreative]:
+        """Weighted random pick among live creatives for a format, honouring frequency caps"""
+        now = datetime.utcnow()
+        cls._ensure_fresh(now)
+
+        candidates = [c for c in _inventory.get(format_type, ()) if c.is_live(now)]
+        if not candidates:
+            return None
+
+        if user_id:
+            seen = cls._frequency_counts(user_id, candidates, now)
+            uncapped = [c for c in candidates if seen.get(c.id, 0) < c.frequency_cap]
+            # Everything capped: keep serving rather than leave the slot empty
+            candidates = uncapped or candidates
+
+        chosen = random.choices(candidates, weights=[c.weight for c in candidates], k=1)[0]
+        if user_id:
+            cls._record_frequency(user_id, chosen, now)
+        return chosen
+
+    # =========================================================================
+    # INVENTORY
+    # =========================================================================
+
+    @classmethod
+    def invalidate(cls):
+        """Call after campaign/creative create, update or delete"""
+        client = get_redis_client()
+        if client:
+            try:
+                client.incr(cls.VERSION_KEY)
+            except Exception as e:
+                logger.error(f'Ad inventory version bump error: {e}')
+        _state['loaded_at'] = 0.0
+
+    @classmethod
+    def _ensure_fresh(cls, now: datetime):
+        mono = time.monotonic()
+        stale = mono - _state['loaded_at'] > cls.MAX_AGE_SECONDS
+        boundary = _state['next_boundary']
+        if boundary is not None and now >= boundary:
+            stale = True
+
+        if not stale and mono - _state['version_checked_at'] > cls.VERSION_CHECK_SECONDS:
+            _state['version_checked_at'] = mono
+            version = cls._shared_version()
+            if version != _state['version']:
+                stale = True
+
+        if stale:
+            cls.reload()
+
+    @classmethod
+    def _shared_version(cls):
+        client = get_redis_client()
+        if not client:
+            return None
+        try:
+            return client.get(cls.VERSION_KEY)
+        except Exception:
+            return None
+
+    @classmethod
+    def reload(cls):
+        """Load active creatives of campaigns that have not ended, grouped by format"""
+        from app import db
+        from models import AdCreative, AdCampaign
+
+        now = datetime.utcnow()
+        version = cls._shared_version()
+        try:
+            rows = db.session.query(AdCreative, AdCampaign).join(
+                AdCampaign, AdCreative.campaign_id == AdCampaign.id
+            ).filter(
+                AdCreative.is_active == True,
+                db.or_(AdCampaign.end_at >= now, AdCampaign.end_at.is_(None))
+            ).all()
+        except Exception as e:
+            logger.error(f'Ad inventory load error: {e}')
+            _state['loaded_at'] = time.monotonic()
+            return
+
+        inventory: Dict[str, List[ServedCreative]] = {}
+        boundaries = []
+        for creative, campaign in rows:
+            targeting = _load_json(campaign.targeting_json)
+            served = ServedCreative(
+                id=creative.id,
+                campaign_id=campaign.id,
+                format=creative.format,
+                headline=creative.headline,
+                body=creative.body or '',
+                image_url=creative.image_url,
+                video_url=creative.video_url,
+                cta_text=creative.cta_text or 'Learn more',
+                landing_url=creative.landing_url,
+                disclaimer_text=creative.disclaimer_text or '',
+                start_at=campaign.start_at,
+                end_at=campaign.end_at,
+                weight=float(targeting.get('weight') or campaign.daily_budget or 1.0) or 1.0,
+                frequency_cap=int(targeting.get('frequency_cap') or cls.DEFAULT_FREQUENCY_CAP),
+            )
+            inventory.setdefault(served.format, []).append(served)
+            for boundary in (campaign.start_at, campaign.end_at):
+                if boundary and boundary > now:
+                    boundaries.append(boundary)
+
+        global _inventory
+        with _inventory_lock:
+            # Swap in the new index in one step; select() reads it without the lock
+            _inventory = inventory
+            _state['loaded_at'] = time.monotonic()
+            _state['version_checked_at'] = _state['loaded_at']
+            _state['version'] = version
+            _state['next_boundary'] = min(boundaries) if boundaries else None
+
+        logger.info(f'Loaded ad inventory: {sum(len(v) for v in inventory.values())} creatives')
+
+    # =========================================================================
+    # FREQUENCY CAPPING
+    # =========================================================================
+
+    @classmethod
+    def _frequency_key(cls, user_id: int, creative_id: int, now: datetime) -> str:
+        return f'{cls.FREQUENCY_PREFIX}{now:%Y%m%d}:{user_id}:{creative_id}'
+
+    @classmethod
+    def _frequency_counts(cls, user_id, candidates, now) -> Dict[int, int]:
+        keys = [cls._frequency_key(user_id, c.id, now) for c in candidates]
+        client = get_redis_client()
+        if client:
+            try:
+                values = client.mget(keys)
+                return {c.id: int(v or 0) for c, v in zip(candidates, values)}
+            except Exception as e:
+                logger.error(f'Ad frequency read error: {e}')
+        cls._roll_memory_day(now)
+        return {c.id: _memory_frequency.get(k, 0) for c, k in zip(candidates, keys)}
+
+    @classmethod
+    def _record_frequency(cls, user_id, creative, now):
+        key = cls._frequency_key(user_id, creative.id, now)
+        client = get_redis_client()
+        if client:
+            try:
+                pipe = client.pipeline()
+                pipe.incr(key)
+                pipe.expire(key, 86400)
+                pipe.execute()
+                return
+            except Exception as e:
+                logger.error(f'Ad frequency write error: {e}')
+        cls._roll_memory_day(now)
+        _memory_frequency[key] = _memory_frequency.get(key, 0) + 1
+
+    @staticmethod
+    def _roll_memory_day(now):
+        day = now.date()
+        if _memory_frequency_day['day'] != day:
+            _memory_frequency.clear()
+            _memory_frequency_day['day'] = day
+
+
+def _load_json(raw):
+    try:
+        return json.loads(raw or '{}') or {}
+    except (TypeError, ValueError):
+        return {}
+
+
+# =============================================================================
+# BUFFERED IMPRESSION WRITER
+# =============================================================================
+
+class ImpressionBuffer:
+    """Queues impressions in memory for the shared batched AdImpression writer"""
+
+    @classmethod
+    def add(cls, creative_id: int, user_id: int, placement: str = None, page_view_id: str = None):
+        from utils.log_buffer import impression_buffer
+
+        impression_buffer.add(
+            creative_id=creative_id,
+            user_id=user_id,
+            placement=placement,
+            page_view_id=page_view_id,
+            created_at=datetime.utcnow(),
+        )
+
+    @classmethod
+    def flush(cls) -> int:
+        """Write everything queued so far; returns rows written"""
+        from utils.log_buffer import impression_buffer
+
+        return impression_buffer.flush()
@@ -1,12 +1,10 @@
 """
 Ad Serving Utilities
+Creatives are chosen from the in-process AdServer inventory and impressions
+are queued for the batched writer (see utils/ad_server.py)
 """
-import random
 import logging
-from datetime import datetime
-from app import db
-from models import AdCreative, AdCampaign, AdImpression
-from flask_login import current_user
+from utils.ad_server import AdServer, ImpressionBuffer
 
 
 def get_active_ad(format_type, user_id=None):
@@ -15,40 +13,18 @@ def get_active_ad(format_type, user_id=None):
     
     Args:
         format_type: One of 'sidebar', 'medicine_money_show', 'deal_inline', 'feed'
-        user_id: Optional user ID for impression tracking
+        user_id: Optional user ID for impression tracking and frequency capping
         
     Returns:
-        AdCreative object or None
+        ServedCreative (read-only AdCreative view) or None
     """
-    now = datetime.utcnow()
-    
-    query = db.session.query(AdCreative).join(AdCampaign).filter(
-        AdCreative.is_active == True,
-        AdCreative.format == format_type,
-        AdCampaign.start_at <= now,
-        db.or_(AdCampaign.end_at >= now, AdCampaign.end_at.is_(None))
-    )
-    
-    creatives = query.all()
-    logging.info(f"Ad query for format '{format_type}': found {len(creatives)} creatives")
-    
-    if not creatives:
-        logging.warning(f"No active ads found for format: {format_type}")
+    selected = AdServer.select(format_type, user_id)
+    if selected is None:
+        logging.debug(f"No active ads found for format: {format_type}")
         return None
     
-    selected = random.choice(creatives)
-    logging.info(f"Selected ad: id={selected.id}, headline={selected.headline[:30] if selected.headline else 'N/A'}")
-    
     if user_id:
-        try:
-            impression = AdImpression(
-                creative_id=selected.id,
-                user_id=user_id
-            )
-            db.session.add(impression)
-            db.session.commit()
-        except Exception:
-            db.session.rollback()
+        ImpressionBuffer.add(selected.id, user_id, placement=format_type)
     
     return selected
 
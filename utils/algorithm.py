@@ -6,6 +6,7 @@ import math
 from datetime import datetime, timedelta
 from collections import defaultdict
 from utils.cache_service import CacheService
+from utils.social_graph import SocialGraph
 
 
 # =============================================================================
@@ -253,7 +254,7 @@ def get_user_interests(user, db):
     Gather user interest data for personalization
     Returns: dict with interest data
     """
-    from models import Follow, PostVote, Bookmark, PostHashtag, Post
+    from models import PostVote, Bookmark, PostHashtag, Post
     
     interests = {
         'following_ids': set(),
@@ -264,8 +265,7 @@ def get_user_interests(user, db):
     }
     
     # Get users this person follows
-    follows = Follow.query.filter_by(follower_id=user.id).all()
-    interests['following_ids'] = {f.following_id for f in follows}
+    interests['following_ids'] = SocialGraph.following(user.id)
     
     # Get authors user has interacted with (liked, commented, bookmarked)
     voted_posts = db.session.query(Post.author_id).join(PostVote).filter(
@@ -481,7 +481,10 @@ def get_posts_for_specialty(specialty, db, limit=20):
 
 def get_people_you_may_know(user, limit=6):
     """
-    Recommend users to follow based on (cached 10 min):
+    Recommend users to follow (cached 10 min).
+    
+    Reads the ranked list precomputed by utils.people_suggestions; users without
+    enough stored suggestions (e.g. new sign-ups) fall back to live queries:
     1. Same specialty (highest priority)
     2. Same location (state)
     3. Followed by people you follow (mutual connections)
@@ -489,8 +492,9 @@ def get_people_you_may_know(user, limit=6):
     
     Excludes: current user, users already following, users with pending/accepted connections
     """
-    from models import User, Follow, Post, Connection
-    from sqlalchemy import func, and_, or_
+    from models import User, Follow
+    from sqlalchemy import func
+    from utils.people_suggestions import get_suggested_user_ids
     
     cache_key = f'people_you_may_know:user:{user.id}:limit:{limit}'
     cached_ids = CacheService.get(cache_key)
@@ -501,32 +505,26 @@ def get_people_you_may_know(user, limit=6):
             return [user_dict[uid] for uid in cached_ids if uid in user_dict]
         return []
     
-    # Get list of users already being followed
-    following_ids = [f.following_id for f in 
-                     Follow.query.filter_by(follower_id=user.id).all()]
-    following_ids.append(user.id)  # Also exclude self
-    
-    # Get list of users with existing connection requests (sent or received)
-    connection_ids = set()
-    connections = Connection.query.filter(
-        or_(
-            Connection.requester_id == user.id,
-            Connection.addressee_id == user.id
-        )
-    ).all()
-    for conn in connections:
-        connection_ids.add(conn.requester_id)
-        connection_ids.add(conn.addressee_id)
-    connection_ids.discard(user.id)  # Don't include self
-    
-    # Combine exclusions
-    exclude_ids = set(following_ids) | connection_ids
+    # Exclude self, users already followed and any existing connection request
+    following_ids = list(SocialGraph.following(user.id))
+    following_ids.append(user.id)
+    exclude_ids = SocialGraph.excluded_ids(user.id)
     
     suggestions = []
     suggestion_ids = set()
     
+    # Precomputed suggestions (offline friend-of-friend ranking)
+    precomputed_ids = get_suggested_user_ids(user.id, exclude_ids, limit)
+    if precomputed_ids:
+        users = User.query.filter(User.id.in_(precomputed_ids)).all()
+        user_dict = {u.id: u for u in users}
+        for uid in precomputed_ids:
+            if uid in user_dict:
+                suggestions.append(user_dict[uid])
+                suggestion_ids.add(uid)
+    
     # Priority 1: Same specialty, not following/connected
-    if user.specialty:
+    if user.specialty and len(suggestions) < limit:
         same_specialty = User.query.filter(
             User.specialty == user.specialty,
             User.id.notin_(exclude_ids),
@@ -0,0 +1,161 @@
+"""
+Catalog - Keyset-paginated, cached listings for courses, events and rooms
+Each page is fetched by seeking past the last row of the previous page
+(a cursor over the sort key plus id), so deep pages cost the same as the
+first. The ids on each page and the filter facets are cached per catalog
+under a version number that is bumped whenever one of the catalog's rows
+is inserted, updated or deleted, so edits show up on the next request
+"""
+import json
+import base64
+import hashlib
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from flask import request, url_for
+from sqlalchemy import and_, event, or_
+from sqlalchemy.orm import Session
+
+from utils.cache_service import CacheService
+
+logger = logging.getLogger(__name__)
+
+# catalog name -> model class name whose writes invalidate it
+CATALOGS = {
+    'courses': 'Course',
+    'events': 'Event',
+    'rooms': 'InvestmentRoom',
+}
+_MODEL_CATALOGS = {model: name for name, model in CATALOGS.items()}
+
+
+@dataclass
+class CatalogPage:
+    items: List[Any]
+    next_cursor: Optional[str] = None
+
+    def next_url(self) -> Optional[str]:
+        """Current listing URL (same filters) advanced to the next page"""
+        if not self.next_cursor:
+            return None
+        args = request.args.to_dict()
+        args['cursor'] = self.next_cursor
+        return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+
+class Catalog:
+    """Paginate and cache catalog listings"""
+
+    PAGE_SIZE = 24
+    MAX_PAGE_SIZE = 100
+    CACHE_TTL = 300
+
+    @classmethod
+    def page(cls, name: str, model, query, order: Sequence[Tuple[Any, str]],
+             filters: Dict[str, Any], cursor: Optional[str] = None,
+             per_page: Optional[int] = None) -> CatalogPage:
+        """
+        One page of query ordered by order ([(expression, 'asc'|'desc'), ...])
+
+        filters must capture everything that shapes query (it keys the cache);
+        sort expressions should be non-null (wrap nullable columns in coalesce)
+        so cursors compare cleanly. model.id is appended as the tie-breaker.
+        """
+        per_page = max(1, min(per_page or cls.PAGE_SIZE, cls.MAX_PAGE_SIZE))
+        cache_key = cls._key(name, 'page', {'filters': filters, 'cursor': cursor, 'per_page': per_page})
+        cached = CacheService.get(cache_key)
+        if cached is None:
+            cached = cls._fetch(model, query, list(order) + [(model.id, 'asc')], cursor, per_page)
+            CacheService.set(cache_key, cached, ttl=cls.CACHE_TTL)
+
+        ids = cached['ids']
+        rows = {row.id: row for row in model.query.filter(model.id.in_(ids)).all()} if ids else {}
+        return CatalogPage(items=[rows[i] for i in ids if i in rows], next_cursor=cached['next'])
+
+    @classmethod
+    def facet(cls, name: str, label: str, loader: Callable[[], List[Any]]) -> List[Any]:
+        """Cached filter values (e.g. distinct categories) for a catalog"""
+        cache_key = cls._key(name, f'facet:{label}', {})
+        values = CacheService.get(cache_key)
+        if values is None:
+            values = loader()
+            CacheService.set(cache_key, values, ttl=cls.CACHE_TTL)
+        return values
+
+    @classmethod
+    def invalidate(cls, name: str):
+        CacheService.increment(_version_key(name))
+
+    @classmethod
+    def _fetch(cls, model, query, keys, cursor: Optional[str], per_page: int) -> Dict[str, Any]:
+        if cursor:
+            values = decode_cursor(cursor)
+            if values is not None and len(values) == len(keys):
+                query = query.filter(_seek(keys, values))
+
+        columns = [expression for expression, _ in keys]
+        ordering = [expression.desc() if direction == 'desc' else expression.asc()
+                    for expression, direction in keys]
+        rows = query.with_entities(*columns).order_by(None).order_by(*ordering).limit(per_page + 1).all()
+
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        return {
+            'ids': [row[-1] for row in rows],
+            'next': encode_cursor(list(rows[-1])) if has_more and rows else None,
+        }
+
+    @classmethod
+    def _key(cls, name: str, kind: str, params: Dict[str, Any]) -> str:
+        version = CacheService.get(_version_key(name)) or 0
+        digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:16]
+        return f'catalog:{name}:v{version}:{kind}:{digest}'
+
+
+def _seek(keys, values):
+    """Rows strictly after values in the (mixed-direction) key order"""
+    clauses = []
+    for i, (expression, direction) in enumerate(keys):
+        beyond = expression < values[i] if direction == 'desc' else expression > values[i]
+        clauses.append(and_(*[keys[j][0] == values[j] for j in range(i)], beyond))
+    return or_(*clauses)
+
+
+def encode_cursor(values: List[Any]) -> str:
+    encoded = [{'dt': v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(encoded).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Optional[List[Any]]:
+    """Cursor values, or None when the cursor is malformed (first page is served)"""
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return [datetime.fromisoformat(v['dt']) if isinstance(v, dict) else v for v in raw]
+    except (ValueError, TypeError, KeyError):
+        return None
+
+
+def _version_key(name: str) -> str:
+    return f'catalog:{name}:version'
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_catalog_changes(session, flush_context):
+    changed = session.info.setdefault('catalog_changes', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        name = _MODEL_CATALOGS.get(type(obj).__name__)
+        if name:
+            changed.add(name)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_catalogs(session):
+    for name in session.info.pop('catalog_changes', ()):
+        Catalog.invalidate(name)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_catalog_changes(session):
+    session.info.pop('catalog_changes', None)
@@ -0,0 +1,267 @@
+"""
+Exports - Constant-memory CSV exports
+Rows are read in yield_per batches (a server-side cursor on PostgreSQL) and
+written to the response in chunks as they are produced, so the first bytes
+leave immediately and memory stays flat however large the export is. Very
+large exports can instead run on a background thread that writes the CSV
+to disk and publishes it, with its status, to Object Storage so the
+download works from any worker. Without Object Storage, EXPORT_DIR must
+be a path shared by every worker
+"""
+import os
+import csv
+import json
+import time
+import uuid
+import logging
+import tempfile
+import threading
+from io import StringIO
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+from utils.cache_service import CacheService
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = os.environ.get('EXPORT_DIR') or os.path.join(tempfile.gettempdir(), 'medinvest-exports')
+EXPORT_TTL = 24 * 3600
+PROGRESS_INTERVAL = 5.0  # seconds between row-count updates while running
+STORAGE_PREFIX = 'exports/'
+
+# Header row and row iterator for an export
+ExportSource = Tuple[Sequence[str], Iterable[Sequence[Any]]]
+
+# export name -> function(**params) returning an ExportSource; background
+# jobs rebuild their source from these on the worker thread
+EXPORTS: Dict[str, Callable[..., ExportSource]] = {}
+
+
+def register_export(name: str):
+    """Decorator registering an export source so it can run in the background"""
+    def decorator(func: Callable[..., ExportSource]):
+        EXPORTS[name] = func
+        return func
+    return decorator
+
+
+def iter_query(query, batch_size: int = 1000) -> Iterator[Any]:
+    """Stream ORM results in batches instead of loading them all"""
+    return iter(query.yield_per(batch_size))
+
+
+def csv_chunks(header: Sequence[str], rows: Iterable[Sequence[Any]], rows_per_chunk: int = 500) -> Iterator[str]:
+    """CSV text in chunks of rows_per_chunk rows"""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % rows_per_chunk == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_csv(source: ExportSource, filename: str):
+    """Chunked text/csv download response for an export source"""
+    from flask import Response, stream_with_context
+
+    header, rows = source
+    return Response(
+        stream_with_context(csv_chunks(header, rows)),
+        mimetype='text/csv',
+        headers={
+            'Content-Disposition': f'attachment; filename={filename}',
+            'X-Accel-Buffering': 'no',  # let nginx pass chunks straight through
+        },
+    )
+
+
+class BackgroundExport:
+    """Run a registered export on a daemon thread and keep the file for download"""
+
+    @classmethod
+    def start(cls, name: str, filename: str, requested_by: Optional[int] = None, **params) -> str:
+        if name not in EXPORTS:
+            raise ValueError(f'Unknown export: {name}')
+        from flask import current_app
+
+        app = current_app._get_current_object()
+        try:
+            cls.cleanup(shared=False)
+        except OSError as e:
+            logger.warning(f'Export cleanup failed: {e}')
+        export_id = uuid.uuid4().hex
+        cls._set_status(export_id, {
+            'status': 'running', 'name': name, 'filename': filename,
+            'requested_by': requested_by, 'rows': 0, 'started_at': time.time(),
+        })
+
+        def run():
+            path = cls.path(export_id)
+            tmp_path = f'{path}.part'
+            try:
+                os.makedirs(EXPORT_DIR, exist_ok=True)
+                with app.app_context():
+                    header, rows = EXPORTS[name](**params)
+                    counted = _Counter(rows, lambda count: cls._update(export_id, rows=count))
+                    with open(tmp_path, 'w', newline='') as fh:
+                        for chunk in csv_chunks(header, counted):
+                            fh.write(chunk)
+                os.replace(tmp_path, path)
+                _publish(path, f'{STORAGE_PREFIX}{export_id}.csv')
+                cls._update(export_id, status='ready', rows=counted.count, finished_at=time.time())
+            except Exception as e:
+                logger.error(f'Background export {name} ({export_id}) failed: {e}')
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                cls._update(export_id, status='failed', error=str(e)[:500])
+
+        threading.Thread(target=run, name=f'export-{export_id[:8]}', daemon=True).start()
+        return export_id
+
+    @classmethod
+    def status(cls, export_id: str) -> Optional[Dict[str, Any]]:
+        """Status from the cache, else the copy shared on disk or in Object Storage"""
+        status = CacheService.get(_status_key(export_id))
+        if status is not None:
+            return status
+        data = _read_shared(cls._status_path(export_id), f'{STORAGE_PREFIX}{export_id}.json')
+        return json.loads(data) if data else None
+
+    @classmethod
+    def path(cls, export_id: str) -> str:
+        return os.path.join(EXPORT_DIR, f'{export_id}.csv')
+
+    @classmethod
+    def local_file(cls, export_id: str) -> Optional[str]:
+        """Path of the finished CSV on this worker, fetched from Object Storage if needed"""
+        from object_storage_utils import download_to_path
+
+        path = cls.path(export_id)
+        if os.path.exists(path):
+            return path
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        if download_to_path(f'{STORAGE_PREFIX}{export_id}.csv', path):
+            return path
+        return None
+
+    @classmethod
+    def cleanup(cls, max_age: int = EXPORT_TTL, shared: bool = True) -> int:
+        """
+        Delete exports older than max_age seconds: this worker's files, and
+        with shared=True every copy in Object Storage, whichever worker wrote
+        it (run on a schedule; exports can hold personal data)
+        """
+        removed = 0
+        cutoff = time.time() - max_age
+        if os.path.isdir(EXPORT_DIR):
+            for entry in os.scandir(EXPORT_DIR):
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+        if shared:
+            removed += cls._cleanup_storage(cutoff)
+        return removed
+
+    @classmethod
+    def _cleanup_storage(cls, cutoff: float) -> int:
+        """Delete Object Storage exports started before cutoff, and CSVs whose status is gone"""
+        from object_storage_utils import OBJECT_STORAGE_AVAILABLE, delete_file, download_file, list_files
+
+        if not OBJECT_STORAGE_AVAILABLE:
+            return 0
+        names = set(list_files(STORAGE_PREFIX))
+        removed = 0
+        for name in sorted(names):
+            export_id, ext = os.path.splitext(name[len(STORAGE_PREFIX):])
+            if ext == '.csv':
+                # Without its status the file can't be downloaded, so it is only a leak
+                expired = f'{STORAGE_PREFIX}{export_id}.json' not in names
+            elif ext == '.json':
+                data = download_file(name)
+                if data is None:
+                    continue  # unreadable right now; try again next run
+                try:
+                    started_at = float(json.loads(data).get('started_at') or 0)
+                except (ValueError, TypeError, AttributeError):
+                    started_at = 0
+                expired = started_at < cutoff
+                if expired and f'{STORAGE_PREFIX}{export_id}.csv' in names:
+                    removed += bool(delete_file(f'{STORAGE_PREFIX}{export_id}.csv'))
+            else:
+                continue
+            if expired and delete_file(name):
+                removed += 1
+        return removed
+
+    @classmethod
+    def _update(cls, export_id: str, **fields):
+        status = cls.status(export_id) or {}
+        status.update(fields)
+        cls._set_status(export_id, status)
+
+    @classmethod
+    def _set_status(cls, export_id: str, status: Dict[str, Any]):
+        CacheService.set(_status_key(export_id), status, ttl=EXPORT_TTL)
+        # Shared copy for workers that can't see this process's cache (no Redis)
+        path = cls._status_path(export_id)
+        try:
+            os.makedirs(EXPORT_DIR, exist_ok=True)
+            tmp_path = f'{path}.{threading.get_ident()}.part'
+            with open(tmp_path, 'w') as fh:
+                json.dump(status, fh)
+            os.replace(tmp_path, path)
+            _publish(path, f'{STORAGE_PREFIX}{export_id}.json')
+        except OSError as e:
+            logger.warning(f'Could not write export status {export_id}: {e}')
+
+    @classmethod
+    def _status_path(cls, export_id: str) -> str:
+        return os.path.join(EXPORT_DIR, f'{export_id}.json')
+
+
+class _Counter:
+    """Pass rows through while counting them, reporting the count every PROGRESS_INTERVAL"""
+
+    def __init__(self, rows: Iterable[Sequence[Any]], on_progress: Optional[Callable[[int], Any]] = None):
+        self.rows = rows
+        self.count = 0
+        self.on_progress = on_progress
+
+    def __iter__(self):
+        reported = time.monotonic()
+        for row in self.rows:
+            self.count += 1
+            if self.on_progress and self.count % 1000 == 0 and time.monotonic() - reported >= PROGRESS_INTERVAL:
+                self.on_progress(self.count)
+                reported = time.monotonic()
+            yield row
+
+
+def _publish(local_path: str, object_path: str):
+    """Copy a file to Object Storage when it is available (other workers download it from there)"""
+    from object_storage_utils import OBJECT_STORAGE_AVAILABLE, upload_file_from_path
+
+    if OBJECT_STORAGE_AVAILABLE and not upload_file_from_path(local_path, object_path, skip_existing=False):
+        logger.warning(f'Could not publish {object_path}; only this worker (or a shared EXPORT_DIR) can serve it')
+
+
+def _read_shared(local_path: str, object_path: str) -> Optional[str]:
+    try:
+        with open(local_path) as fh:
+            return fh.read()
+    except OSError:
+        pass
+    from object_storage_utils import download_file
+
+    data = download_file(object_path)
+    return data.decode() if data else None
+
+
+def _status_key(export_id: str) -> str:
+    return f'exports:{export_id}'
@@ -344,13 +344,9 @@ class FeedRankingService:
             return self._user_following_cache[user_id]
         
         try:
-            from app import db
-            from models import Follow
+            from utils.social_graph import SocialGraph
             
-            following = set()
-            follows = Follow.query.filter_by(follower_id=user_id).all()
-            for f in follows:
-                following.add(f.followed_id)
+            following = SocialGraph.following(user_id)
             
             self._user_following_cache[user_id] = following
             return following
@@ -6,6 +6,7 @@ from datetime import datetime, date, timedelta
 from typing import List, Dict, Optional, Any
 from app import db
 from utils.cache_service import CacheService
+from utils.leaderboard import Leaderboards, period_bucket
 
 logger = logging.getLogger(__name__)
 
@@ -118,8 +119,17 @@ class GamificationService:
             )
             db.session.add(transaction)
             
+            week_key = period_bucket('weekly')
+            month_key = period_bucket('monthly')
             user_points = UserPoints.query.filter_by(user_id=user_id).first()
             if user_points:
+                # Period totals reset lazily when the stored period is no longer current
+                if user_points.week_key != week_key:
+                    user_points.weekly_points = 0
+                    user_points.week_key = week_key
+                if user_points.month_key != month_key:
+                    user_points.monthly_points = 0
+                    user_points.month_key = month_key
                 user_points.total_points = (user_points.total_points or 0) + points
                 user_points.weekly_points = (user_points.weekly_points or 0) + points
                 user_points.monthly_points = (user_points.monthly_points or 0) + points
@@ -130,15 +140,15 @@ class GamificationService:
                     total_points=points,
                     weekly_points=points,
                     monthly_points=points,
+                    week_key=week_key,
+                    month_key=month_key,
                     level=1
                 )
                 db.session.add(user_points)
             
             db.session.commit()
             
-            CacheService.delete(f'leaderboard:weekly')
-            CacheService.delete(f'leaderboard:monthly')
-            CacheService.delete(f'leaderboard:alltime')
+            Leaderboards.record(user_id, points, user.specialty)
             
             logger.info(f"Awarded {points} points to user {user_id} for {action}")
             return points
@@ -206,45 +216,36 @@ class GamificationService:
             return {'streak': 0, 'bonus': 0}
     
     @staticmethod
-    def get_leaderboard(period: str = 'weekly', limit: int = 10) -> List[Dict[str, Any]]:
-        """Get leaderboard for a time period"""
+    def get_leaderboard(period: str = 'weekly', limit: int = 10, specialty: str = None) -> List[Dict[str, Any]]:
+        """Get leaderboard for a time period, optionally within one specialty"""
         from models import User, UserPoints
         
-        cache_key = f'leaderboard:{period}:{limit}'
-        cached = CacheService.get(cache_key)
-        if cached:
-            return cached
-        
         try:
-            if period == 'weekly':
-                query = db.session.query(User, UserPoints).join(
-                    UserPoints, User.id == UserPoints.user_id
-                ).order_by(UserPoints.weekly_points.desc()).limit(limit)
-            elif period == 'monthly':
-                query = db.session.query(User, UserPoints).join(
-                    UserPoints, User.id == UserPoints.user_id
-                ).order_by(UserPoints.monthly_points.desc()).limit(limit)
-            else:
-                query = db.session.query(User, UserPoints).join(
-                    UserPoints, User.id == UserPoints.user_id
-                ).order_by(UserPoints.total_points.desc()).limit(limit)
+            top = Leaderboards.top(period, limit, specialty)
+            if not top:
+                return []
             
-            results = query.all()
+            rows = db.session.query(User, UserPoints).join(
+                UserPoints, User.id == UserPoints.user_id
+            ).filter(User.id.in_([user_id for user_id, _ in top])).all()
+            by_id = {user.id: (user, points) for user, points in rows}
             
             leaderboard = []
-            for rank, (user, points) in enumerate(results, 1):
+            for rank, (user_id, score) in enumerate(top, 1):
+                if user_id not in by_id:
+                    continue
+                user, points = by_id[user_id]
                 leaderboard.append({
                     'rank': rank,
                     'user_id': user.id,
                     'name': user.full_name,
                     'specialty': user.specialty,
                     'is_verified': user.is_verified,
-                    'points': getattr(points, f'{period}_points' if period != 'alltime' else 'total_points', 0),
+                    'points': int(score),
                     'level': GamificationService.get_level_name(points.total_points or 0),
                     'streak': points.streak_days or 0
                 })
             
-            CacheService.set(cache_key, leaderboard, ttl=300)
             return leaderboard
             
         except Exception as e:
@@ -252,34 +253,10 @@ class GamificationService:
             return []
     
     @staticmethod
-    def get_user_rank(user_id: int, period: str = 'weekly') -> Optional[int]:
+    def get_user_rank(user_id: int, period: str = 'weekly', specialty: str = None) -> Optional[int]:
         """Get user's rank on the leaderboard"""
-        from models import UserPoints
-        from sqlalchemy import func
-        
         try:
-            user_points = UserPoints.query.filter_by(user_id=user_id).first()
-            if not user_points:
-                return None
-            
-            if period == 'weekly':
-                user_score = user_points.weekly_points or 0
-                higher_count = UserPoints.query.filter(
-                    UserPoints.weekly_points > user_score
-                ).count()
-            elif period == 'monthly':
-                user_score = user_points.monthly_points or 0
-                higher_count = UserPoints.query.filter(
-                    UserPoints.monthly_points > user_score
-                ).count()
-            else:
-                user_score = user_points.total_points or 0
-                higher_count = UserPoints.query.filter(
-                    UserPoints.total_points > user_score
-                ).count()
-            
-            return higher_count + 1
-            
+            return Leaderboards.rank(user_id, period, specialty)
         except Exception as e:
             logger.error(f"Error getting user rank: {e}")
             return None
@@ -327,28 +304,22 @@ class GamificationService:
     
     @staticmethod
     def reset_weekly_points():
-        """Reset weekly points (run via scheduled job)"""
-        from models import UserPoints
-        
+        """Roll over to a new weekly board (run via scheduled job)
+
+        Boards are keyed by ISO week and UserPoints.weekly_points resets lazily
+        on the next award, so no table-wide UPDATE is needed.
+        """
         try:
-            UserPoints.query.update({UserPoints.weekly_points: 0})
-            db.session.commit()
-            CacheService.delete_pattern('leaderboard:weekly*')
-            logger.info("Weekly points reset completed")
+            Leaderboards.rotate('weekly')
+            logger.info(f"Weekly leaderboard rotated to {period_bucket('weekly')}")
         except Exception as e:
-            logger.error(f"Error resetting weekly points: {e}")
-            db.session.rollback()
+            logger.error(f"Error rotating weekly leaderboard: {e}")
     
     @staticmethod
     def reset_monthly_points():
-        """Reset monthly points (run via scheduled job)"""
-        from models import UserPoints
-        
+        """Roll over to a new monthly board (run via scheduled job)"""
         try:
-            UserPoints.query.update({UserPoints.monthly_points: 0})
-            db.session.commit()
-            CacheService.delete_pattern('leaderboard:monthly*')
-            logger.info("Monthly points reset completed")
+            Leaderboards.rotate('monthly')
+            logger.info(f"Monthly leaderboard rotated to {period_bucket('monthly')}")
         except Exception as e:
-            logger.error(f"Error resetting monthly points: {e}")
-            db.session.rollback()
+            logger.error(f"Error rotating monthly leaderboard: {e}")
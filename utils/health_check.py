@@ -8,6 +8,7 @@ import logging
 from datetime import datetime
 from typing import Dict, Optional
 from flask import Blueprint, jsonify
+from utils.startup import get_boot_timings
 
 logger = logging.getLogger(__name__)
 
@@ -138,7 +139,8 @@ class HealthChecker:
             'version': '2.0.0',
             'environment': os.environ.get('REPL_SLUG', 'development'),
             'python_version': os.popen('python --version').read().strip(),
-            'uptime_seconds': int(time.time() - getattr(HealthChecker, '_start_time', time.time()))
+            'uptime_seconds': int(time.time() - getattr(HealthChecker, '_start_time', time.time())),
+            'boot': get_boot_timings()
         }
 
 
@@ -0,0 +1,256 @@
+"""
+Image Variants - Resized and WebP derivatives of uploaded images
+Uploads are processed on a small background pool: each image gets
+200/640/1280px versions (never upscaled) in WebP plus its original
+format, stored next to the original locally and in Object Storage and
+recorded on PostMedia.variants_json for srcset rendering
+"""
+import io
+import os
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from utils.cache_service import CacheService
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (200, 640, 1280)
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+MEDIA_URL_PREFIX = '/media/uploads/'
+PROCESSABLE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'webp'}  # GIFs keep their animation as-is
+MAX_SOURCE_PIXELS = 60_000_000
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+class ImageVariants:
+    """Generate, store and record image derivatives"""
+
+    MANIFEST_PREFIX = 'media:variants:'
+    MANIFEST_TTL = 86400
+
+    # =========================================================================
+    # ENTRY POINTS
+    # =========================================================================
+
+    @classmethod
+    def enqueue(cls, file_url: str):
+        """Process an upload off the request thread"""
+        if _extension(file_url) not in PROCESSABLE_EXTENSIONS:
+            return
+        app = _current_app()
+        if app is None:
+            return
+
+        def run():
+            with app.app_context():
+                try:
+                    cls.process(file_url)
+                except Exception as e:
+                    logger.error(f'Image variant generation failed for {file_url}: {e}')
+
+        _get_executor().submit(run)
+
+    @classmethod
+    def process(cls, file_url: str) -> Optional[Dict[str, Any]]:
+        """Generate variants for one image and record them; returns the manifest"""
+        manifest = cls.generate(file_url)
+        if manifest is None:
+            return None
+        CacheService.set(cls.MANIFEST_PREFIX + file_url, manifest, ttl=cls.MANIFEST_TTL)
+        cls._record(file_url, manifest)
+        return manifest
+
+    @classmethod
+    def attach(cls, post_media) -> bool:
+        """Copy an already generated manifest onto a new PostMedia row"""
+        if post_media.media_type != 'image' or not post_media.file_path:
+            return False
+        manifest = CacheService.get(cls.MANIFEST_PREFIX + post_media.file_path)
+        if not manifest:
+            return False
+        _apply(post_media, manifest)
+        return True
+
+    @classmethod
+    def process_pending(cls, limit: int = 200) -> Dict[str, int]:
+        """Generate variants for image PostMedia rows that have none (sweep/backfill)"""
+        from app import db
+        from models import PostMedia
+
+        rows = PostMedia.query.filter(
+            PostMedia.media_type == 'image',
+            PostMedia.variants_json.is_(None)
+        ).order_by(PostMedia.id.desc()).limit(limit).all()
+
+        processed = skipped = failed = 0
+        for media in rows:
+            try:
+                manifest = cls.generate(media.file_path)
+            except Exception as e:
+                # Transient (storage outage, timeout): left NULL so the next sweep retries
+                logger.error(f'Image variant generation failed for {media.file_path}: {e}')
+                failed += 1
+                continue
+            if manifest:
+                _apply(media, manifest)
+                processed += 1
+            else:
+                # Unprocessable (GIF, external URL, missing source, undecodable): don't retry forever
+                media.variants_json = '[]'
+                skipped += 1
+        db.session.commit()
+        return {'processed': processed, 'skipped': skipped, 'failed': failed}
+
+    # =========================================================================
+    # GENERATION
+    # =========================================================================
+
+    @classmethod
+    def generate(cls, file_url: str) -> Optional[Dict[str, Any]]:
+        """
+        Write derivatives for an uploaded image; None if it can't be processed
+        (not ours, not a processable format, missing, undecodable or too large).
+        Storage errors propagate so callers can retry.
+        """
+        from PIL import Image, ImageOps, UnidentifiedImageError
+
+        ext = _extension(file_url)
+        if not file_url or not file_url.startswith(MEDIA_URL_PREFIX) or ext not in PROCESSABLE_EXTENSIONS:
+            return None
+        relative = file_url[len(MEDIA_URL_PREFIX):]
+        if '..' in relative.split('/'):
+            return None
+
+        source = _source_path(relative)
+        if source is None:
+            return None
+
+        try:
+            with Image.open(source) as opened:
+                # Header only so far; refuse oversized sources before decoding
+                if opened.width * opened.height > MAX_SOURCE_PIXELS:
+                    logger.warning(f'Skipping variants for {file_url}: {opened.width}x{opened.height} is too large')
+                    return None
+                image = ImageOps.exif_transpose(opened)
+                image.load()
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+            # A local file that won't decode (corrupt, truncated) won't decode next time either
+            logger.warning(f'Skipping variants for {file_url}: {e}')
+            return None
+        width, height = image.size
+
+        fallback_format = 'png' if ext == 'png' else ('jpeg' if ext in ('jpg', 'jpeg') else None)
+        stem, _ = os.path.splitext(relative)
+        variants: List[Dict[str, Any]] = []
+
+        for target in sorted({min(w, width) for w in VARIANT_WIDTHS}):
+            if target < width:
+                resized = image.resize((target, max(1, round(height * target / width))), Image.LANCZOS)
+            else:
+                resized = image
+            formats = ['webp']
+            if fallback_format and target < width:
+                formats.append(fallback_format)
+            for fmt in formats:
+                name = f'{stem}_w{target}.{"jpg" if fmt == "jpeg" else fmt}'
+                _store(name, _encode(resized, fmt))
+                variants.append({
+                    'width': target,
+                    'height': resized.size[1],
+                    'format': 'jpeg' if fmt == 'jpeg' else fmt,
+                    'url': f'{MEDIA_URL_PREFIX}{name}',
+                })
+
+        return {'width': width, 'height': height, 'variants': variants}
+
+    @classmethod
+    def _record(cls, file_url: str, manifest: Dict[str, Any]):
+        from app import db
+        from models import PostMedia
+
+        # The post may already exist if it was submitted before processing finished
+        rows = PostMedia.query.filter_by(file_path=file_url).all()
+        for media in rows:
+            _apply(media, manifest)
+        if rows:
+            db.session.commit()
+
+
+def _apply(post_media, manifest: Dict[str, Any]):
+    post_media.variants_json = json.dumps(manifest['variants'])
+    post_media.width = manifest.get('width')
+    post_media.height = manifest.get('height')
+
+
+def _encode(image, fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == 'jpeg':
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    elif fmt == 'png':
+        image.save(buffer, 'PNG', optimize=True)
+    else:
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def _store(relative_name: str, data: bytes):
+    """Write a derivative next to the original, locally and in Object Storage"""
+    from flask import current_app
+    from object_storage_utils import upload_file, OBJECT_STORAGE_AVAILABLE
+
+    if OBJECT_STORAGE_AVAILABLE:
+        upload_file(data, f'uploads/{relative_name}')
+
+    local_path = os.path.join(current_app.root_path, 'uploads', relative_name)
+    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+    tmp_path = f'{local_path}.part'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, local_path)
+
+
+def _source_path(relative: str) -> Optional[str]:
+    """Local copy of an upload: the upload folders first, then the media cache"""
+    from flask import current_app
+    from object_storage_utils import OBJECT_STORAGE_AVAILABLE
+
+    for base in (os.path.join(current_app.root_path, 'uploads'),
+                 os.path.join(os.getcwd(), 'media', 'uploads')):
+        path = os.path.join(base, relative)
+        if os.path.isfile(path):
+            return path
+    if OBJECT_STORAGE_AVAILABLE:
+        from utils.media_cache import MediaCache
+        return MediaCache.get_path(f'uploads/{relative}')
+    return None
+
+
+def _extension(file_url: str) -> str:
+    return file_url.rsplit('.', 1)[-1].lower() if file_url and '.' in file_url else ''
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='image-variants')
+    return _executor
+
+
+def _current_app():
+    try:
+        from flask import current_app
+        return current_app._get_current_object()
+    except RuntimeError:
+        return None
@@ -0,0 +1,351 @@
+"""
+Job Coordinator - Run each scheduled job once per cluster
+Every process may start a scheduler, but only the elected leader fires
+jobs: leadership is a lease (a Redis key with a TTL, or a PostgreSQL
+advisory lock held on a dedicated connection when there is no Redis) that
+a heartbeat thread keeps renewing, so a crashed leader is replaced within
+LEADER_TTL seconds. Each run also takes a per-job lease, so a run that
+is still going when the next one is due (or when leadership moves) is
+skipped rather than overlapped, and every run is recorded in job_runs.
+Without Redis or PostgreSQL (local SQLite) the locks are process-local.
+"""
+import os
+import time
+import socket
+import hashlib
+import logging
+import threading
+import traceback
+from datetime import datetime
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.cache_service import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+LEADER_KEY = 'scheduler:leader'
+LEADER_TTL = int(os.environ.get('SCHEDULER_LEADER_TTL', 60))
+JOB_LOCK_TTL = int(os.environ.get('SCHEDULER_JOB_LOCK_TTL', 300))
+
+# Compare-and-extend: only the holder's token may renew the key
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_local_locks: Dict[str, threading.Lock] = {}
+_state_lock = threading.Lock()
+
+
+def node_id() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class Lease:
+    """
+    Exclusive, expiring claim on a name shared by every process
+
+    Redis SET NX with a per-holder token when Redis is configured, else a
+    PostgreSQL session advisory lock (released when its connection closes),
+    else a process-local lock.
+    """
+
+    def __init__(self, name: str, ttl: int):
+        self.name = name
+        self.ttl = ttl
+        self.token = f'{node_id()}:{threading.get_ident()}:{time.time()}'
+        self.backend = None
+        self._client = None
+        self._conn = None
+        self._local = None
+
+    def acquire(self) -> bool:
+        client = get_redis_client()
+        if client is not None:
+            try:
+                if client.set(self.name, self.token, nx=True, ex=self.ttl):
+                    self.backend, self._client = 'redis', client
+                    return True
+                return False
+            except Exception as e:
+                logger.warning(f'Redis lease {self.name} unavailable, falling back: {e}')
+
+        conn = _advisory_connection()
+        if conn is not None:
+            try:
+                if conn.execute(_text('SELECT pg_try_advisory_lock(:key)'), {'key': _advisory_key(self.name)}).scalar():
+                    self.backend, self._conn = 'advisory', conn
+                    return True
+            except Exception as e:
+                logger.warning(f'Advisory lease {self.name} failed: {e}')
+            conn.close()
+            return False
+
+        with _state_lock:
+            local = _local_locks.setdefault(self.name, threading.Lock())
+        if local.acquire(blocking=False):
+            self.backend, self._local = 'local', local
+            return True
+        return False
+
+    def renew(self) -> bool:
+        """Extend the lease; False once it has been lost (expired or taken over)"""
+        try:
+            if self.backend == 'redis':
+                return bool(self._client.eval(_RENEW_SCRIPT, 1, self.name, self.token, self.ttl * 1000))
+            if self.backend == 'advisory':
+                # The lock lives exactly as long as its connection
+                self._conn.execute(_text('SELECT 1'))
+                return True
+            return self.backend == 'local'
+        except Exception as e:
+            logger.warning(f'Lost lease {self.name}: {e}')
+            self.release()
+            return False
+
+    def release(self):
+        backend, self.backend = self.backend, None
+        if backend == 'redis':
+            try:
+                if self._client.get(self.name) == self.token:
+                    self._client.delete(self.name)
+            except Exception:
+                pass
+        elif backend == 'advisory':
+            try:
+                self._conn.execute(_text('SELECT pg_advisory_unlock(:key)'), {'key': _advisory_key(self.name)})
+                self._conn.close()
+            except Exception:
+                # Never return a connection that may still hold the lock to the pool
+                self._conn.invalidate()
+            self._conn = None
+        elif backend == 'local':
+            self._local.release()
+            self._local = None
+
+    @property
+    def held(self) -> bool:
+        return self.backend is not None
+
+
+class _Heartbeat:
+    """Call beat() every interval seconds on a daemon thread until stopped"""
+
+    def __init__(self, name: str, interval: float, beat: Callable[[], Any]):
+        self.interval = interval
+        self.beat = beat
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self) -> '_Heartbeat':
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.beat()
+            except Exception as e:
+                logger.error(f'{self._thread.name} heartbeat error: {e}')
+
+
+class LeaderElection:
+    """Elect one scheduler process per cluster"""
+
+    _lease: Optional[Lease] = None
+    _heartbeat: Optional[_Heartbeat] = None
+    _pid: Optional[int] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def is_leader(cls) -> bool:
+        """Renew leadership if held, else try to take it over"""
+        with cls._lock:
+            if cls._pid != os.getpid():
+                # Fork-safe: a child never inherits its parent's leadership
+                cls._lease, cls._heartbeat, cls._pid = None, None, os.getpid()
+            if cls._heartbeat is None:
+                cls._heartbeat = _Heartbeat('scheduler-leader', LEADER_TTL / 3, cls.is_leader).start()
+            if cls._lease is not None and cls._lease.held:
+                if cls._lease.renew():
+                    return True
+                logger.warning(f'Scheduler leadership lost by {node_id()}')
+            cls._lease = Lease(LEADER_KEY, LEADER_TTL)
+            if _with_app(cls._lease.acquire):
+                logger.info(f'Scheduler leadership acquired by {node_id()} ({cls._lease.backend})')
+                return True
+            return False
+
+    @classmethod
+    def resign(cls):
+        with cls._lock:
+            if cls._heartbeat is not None:
+                cls._heartbeat.stop()
+                cls._heartbeat = None
+            if cls._lease is not None:
+                cls._lease.release()
+                cls._lease = None
+
+    @classmethod
+    def leader(cls) -> Optional[str]:
+        """Node currently holding leadership, when it can be seen (Redis only)"""
+        client = get_redis_client()
+        if client is None:
+            return node_id() if cls._lease is not None and cls._lease.held else None
+        try:
+            token = client.get(LEADER_KEY)
+        except Exception:
+            return None
+        return token.rsplit(':', 2)[0] if token else None
+
+
+class JobCoordinator:
+    """Fire jobs only on the leader, one run at a time, with run history"""
+
+    @classmethod
+    def run(cls, job_name: str, func: Callable, *args, require_leader: bool = True, **kwargs) -> Any:
+        """
+        Run func(*args, **kwargs) as job_name unless this process is not the
+        leader or a previous run is still in progress; returns func's result,
+        or None when skipped. Exceptions are recorded and re-raised.
+        """
+        if require_leader and not LeaderElection.is_leader():
+            logger.debug(f'{job_name}: not the scheduler leader, skipping')
+            return None
+
+        lease = Lease(f'scheduler:job:{job_name}', JOB_LOCK_TTL)
+        if not _with_app(lease.acquire):
+            logger.info(f'{job_name}: previous run still in progress, skipping')
+            cls._record(job_name, status='skipped', error='previous run still in progress')
+            return None
+
+        heartbeat = _Heartbeat(f'job-{job_name}', JOB_LOCK_TTL / 3, lease.renew).start()
+        run_id = cls._record(job_name, status='running')
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            cls._finish(run_id, started, 'failed', traceback.format_exc(limit=5))
+            raise
+        else:
+            cls._finish(run_id, started, 'succeeded')
+            return result
+        finally:
+            heartbeat.stop()
+            _with_app(lease.release)
+
+    @classmethod
+    def wrap(cls, job_name: str, func: Callable) -> Callable:
+        """func as a coordinated job, for handing to a scheduler"""
+        @wraps(func)
+        def coordinated(*args, **kwargs):
+            return cls.run(job_name, func, *args, **kwargs)
+        coordinated.coordinated = True
+        return coordinated
+
+    @classmethod
+    def coordinate(cls, scheduler):
+        """Wrap every job already added to an APScheduler scheduler (call before start)"""
+        for job in scheduler.get_jobs():
+            if not getattr(job.func, 'coordinated', False):
+                job.modify(func=cls.wrap(job.id, job.func), max_instances=1, coalesce=True)
+        return scheduler
+
+    @classmethod
+    def history(cls, job_name: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent runs, newest first"""
+        from models import JobRun
+
+        query = JobRun.query
+        if job_name:
+            query = query.filter(JobRun.job_name == job_name)
+        return [{
+            'job': run.job_name,
+            'node': run.node,
+            'status': run.status,
+            'started_at': run.started_at.isoformat() if run.started_at else None,
+            'duration_ms': run.duration_ms,
+            'error': run.error,
+        } for run in query.order_by(JobRun.started_at.desc(), JobRun.id.desc()).limit(limit).all()]
+
+    @classmethod
+    def _record(cls, job_name: str, status: str, error: Optional[str] = None) -> Optional[int]:
+        def insert():
+            from app import db
+            from models import JobRun
+
+            now = datetime.utcnow()
+            row = {'job_name': job_name, 'node': node_id(), 'status': status, 'started_at': now, 'error': error}
+            if status == 'skipped':
+                row.update(finished_at=now, duration_ms=0)
+            with db.engine.begin() as conn:
+                return conn.execute(JobRun.__table__.insert().values(row)).inserted_primary_key[0]
+
+        try:
+            return _with_app(insert)
+        except Exception as e:
+            # History is best effort; never let it stop the job itself
+            logger.error(f'Could not record {job_name} run: {e}')
+            return None
+
+    @classmethod
+    def _finish(cls, run_id: Optional[int], started: float, status: str, error: Optional[str] = None):
+        if run_id is None:
+            return
+
+        def update():
+            from app import db
+            from models import JobRun
+
+            table = JobRun.__table__
+            with db.engine.begin() as conn:
+                conn.execute(table.update().where(table.c.id == run_id).values(
+                    status=status, error=error, finished_at=datetime.utcnow(),
+                    duration_ms=int((time.perf_counter() - started) * 1000),
+                ))
+
+        try:
+            _with_app(update)
+        except Exception as e:
+            logger.error(f'Could not record end of job run {run_id}: {e}')
+
+
+def _advisory_connection():
+    """Dedicated autocommit connection on PostgreSQL, else None"""
+    from app import db
+
+    if db.engine.dialect.name != 'postgresql':
+        return None
+    return db.engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+
+
+def _advisory_key(name: str) -> int:
+    return int.from_bytes(hashlib.sha1(name.encode()).digest()[:8], 'big', signed=True)
+
+
+def _text(sql: str):
+    from sqlalchemy import text
+    return text(sql)
+
+
+def _with_app(func: Callable[[], Any]) -> Any:
+    """Call func inside an application context (scheduler threads have none)"""
+    if _current_app() is not None:
+        return func()
+    from app import app
+    with app.app_context():
+        return func()
+
+
+def _current_app():
+    try:
+        from flask import current_app
+        return current_app._get_current_object()
+    except RuntimeError:
+        return None
@@ -0,0 +1,124 @@
+"""
+Keyword Matcher - Blocked keyword detection in a single pass over the text
+The active BlockedKeyword set is compiled into an Aho-Corasick automaton
+that is shared per process and only rebuilt when the keyword version
+counter changes, so checking content costs O(text length + matches)
+regardless of how large the blocklist grows
+"""
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from utils.cache_service import CacheService
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'moderation:keywords:version'
+
+_state: Dict[str, Any] = {'version': None, 'checked_at': 0.0, 'automaton': None, 'keywords': []}
+_build_lock = threading.Lock()
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher"""
+
+    def __init__(self, patterns: List[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        for index, pattern in enumerate(patterns):
+            node = 0
+            for char in pattern:
+                nxt = self._goto[node].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(index)
+
+        # Breadth-first failure links; outputs inherit their fallback's outputs
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find(self, text: str) -> set:
+        """Indices of every pattern occurring in text"""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+
+class KeywordMatcher:
+    """Check content against the active blocked keywords"""
+
+    # Re-read the version counter at most this often; without Redis the
+    # counter is per process, so this also bounds staleness across workers
+    VERSION_CHECK_INTERVAL = 5
+    MAX_AGE = 60
+
+    @classmethod
+    def match(cls, content: str) -> List[Dict[str, str]]:
+        """Blocked keywords found in content, each with its severity and action"""
+        if not content:
+            return []
+        automaton, keywords = cls._compiled()
+        if automaton is None:
+            return []
+        hits = automaton.find(content.lower())
+        return [keywords[i] for i in sorted(hits)]
+
+    @classmethod
+    def bump_version(cls):
+        """Call after adding, editing or removing keywords"""
+        CacheService.increment(VERSION_KEY)
+        _state['checked_at'] = 0.0
+
+    @classmethod
+    def _compiled(cls):
+        now = time.time()
+        if _state['automaton'] is not None and now - _state['checked_at'] < cls.VERSION_CHECK_INTERVAL:
+            return _state['automaton'], _state['keywords']
+
+        version = CacheService.get(VERSION_KEY) or 0
+        with _build_lock:
+            stale = now - _state.get('built_at', 0) >= cls.MAX_AGE
+            if _state['automaton'] is None or version != _state['version'] or stale:
+                cls._build(version)
+            _state['checked_at'] = now
+        return _state['automaton'], _state['keywords']
+
+    @classmethod
+    def _build(cls, version: Optional[int]):
+        from models import BlockedKeyword
+
+        rows = BlockedKeyword.query.filter_by(is_active=True).order_by(BlockedKeyword.id.asc()).all()
+        keywords = [
+            {'keyword': row.keyword.lower(), 'severity': row.severity, 'action': row.action}
+            for row in rows if row.keyword
+        ]
+        _state['automaton'] = AhoCorasick([kw['keyword'] for kw in keywords])
+        _state['keywords'] = keywords
+        _state['version'] = version
+        _state['built_at'] = time.time()
+        logger.debug(f'Compiled {len(keywords)} blocked keywords (version {version})')
@@ -0,0 +1,370 @@
+"""
+Leaderboards - Sorted-set rankings for gamification points
+Redis sorted sets per period (weekly, monthly, all-time) and per specialty,
+with an indexable skiplist fallback so rank and top-N stay O(log n) without
+Redis. Weekly/monthly keys carry their period, so resets are key rotation.
+"""
+import time
+import random
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from utils.cache_service import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ('weekly', 'monthly', 'alltime')
+
+# Old period keys expire on their own once the period has rolled over
+PERIOD_TTL = {
+    'weekly': 15 * 86400,
+    'monthly': 62 * 86400,
+    'alltime': None,
+}
+
+
+def period_bucket(period: str, now: datetime = None) -> str:
+    """Bucket id for a period: 2026-W07, 2026-02 or 'all'"""
+    now = now or datetime.utcnow()
+    if period == 'weekly':
+        year, week, _ = now.isocalendar()
+        return f'{year}-W{week:02d}'
+    if period == 'monthly':
+        return now.strftime('%Y-%m')
+    return 'all'
+
+
+# =============================================================================
+# SKIPLIST (in-memory fallback)
+# =============================================================================
+
+class _Node:
+    __slots__ = ('key', 'forward', 'span')
+
+    def __init__(self, key, level):
+        self.key = key
+        self.forward = [None] * level
+        self.span = [0] * level
+
+
+class SkipList:
+    """
+    Indexable skiplist ordered by (-score, member), the structure behind
+    Redis sorted sets: insert/remove/rank in O(log n), top-N in O(log n + N).
+    """
+
+    MAX_LEVEL = 32
+    P = 0.25
+
+    def __init__(self):
+        self._head = _Node(None, self.MAX_LEVEL)
+        self._level = 1
+        self._scores: Dict[int, float] = {}
+
+    def __len__(self):
+        return len(self._scores)
+
+    def __contains__(self, member):
+        return member in self._scores
+
+    def score(self, member) -> Optional[float]:
+        return self._scores.get(member)
+
+    def incr(self, member, delta: float) -> float:
+        score = self._scores.get(member, 0) + delta
+        self.set(member, score)
+        return score
+
+    def set(self, member, score: float):
+        if member in self._scores:
+            self._delete((-self._scores[member], member))
+        self._scores[member] = score
+        self._insert((-score, member))
+
+    def remove(self, member) -> bool:
+        if member not in self._scores:
+            return False
+        self._delete((-self._scores.pop(member), member))
+        return True
+
+    def rank(self, member) -> Optional[int]:
+        """0-based position, highest score first"""
+        if member not in self._scores:
+            return None
+        key = (-self._scores[member], member)
+        rank = 0
+        x = self._head
+        for i in reversed(range(self._level)):
+            while x.forward[i] is not None and x.forward[i].key <= key:
+                rank += x.span[i]
+                x = x.forward[i]
+            if x.key == key:
+                return rank - 1
+        return None
+
+    def count_above(self, score: float) -> int:
+        """Number of members with a strictly higher score"""
+        bound = (-score, float('-inf'))
+        count = 0
+        x = self._head
+        for i in reversed(range(self._level)):
+            while x.forward[i] is not None and x.forward[i].key < bound:
+                count += x.span[i]
+                x = x.forward[i]
+        return count
+
+    def top(self, limit: int, offset: int = 0) -> List[Tuple[int, float]]:
+        """Members at positions [offset, offset + limit), highest score first"""
+        if limit <= 0 or offset >= len(self._scores):
+            return []
+        # Jump to position `offset` using spans, then walk level 0
+        traversed = 0
+        x = self._head
+        for i in reversed(range(self._level)):
+            while x.forward[i] is not None and traversed + x.span[i] <= offset:
+                traversed += x.span[i]
+                x = x.forward[i]
+        result = []
+        x = x.forward[0]
+        while x is not None and len(result) < limit:
+            result.append((x.key[1], -x.key[0]))
+            x = x.forward[0]
+        return result
+
+    def _random_level(self) -> int:
+        level = 1
+        while level < self.MAX_LEVEL and random.random() < self.P:
+            level += 1
+        return level
+
+    def _insert(self, key):
+        update = [None] * self.MAX_LEVEL
+        rank = [0] * self.MAX_LEVEL
+        x = self._head
+        for i in reversed(range(self._level)):
+            rank[i] = 0 if i == self._level - 1 else rank[i + 1]
+            while x.forward[i] is not None and x.forward[i].key < key:
+                rank[i] += x.span[i]
+                x = x.forward[i]
+            update[i] = x
+
+        length = len(self._scores) - 1  # _scores already includes the new member
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                rank[i] = 0
+                update[i] = self._head
+                self._head.span[i] = length
+            self._level = level
+
+        node = _Node(key, level)
+        for i in range(level):
+            node.forward[i] = update[i].forward[i]
+            update[i].forward[i] = node
+            node.span[i] = update[i].span[i] - (rank[0] - rank[i])
+            update[i].span[i] = (rank[0] - rank[i]) + 1
+        for i in range(level, self._level):
+            update[i].span[i] += 1
+
+    def _delete(self, key):
+        update = [None] * self.MAX_LEVEL
+        x = self._head
+        for i in reversed(range(self._level)):
+            while x.forward[i] is not None and x.forward[i].key < key:
+                x = x.forward[i]
+            update[i] = x
+        x = x.forward[0]
+        if x is None or x.key != key:
+            return
+        for i in range(self._level):
+            if update[i].forward[i] is x:
+                update[i].span[i] += x.span[i] - 1
+                update[i].forward[i] = x.forward[i]
+            else:
+                update[i].span[i] -= 1
+        while self._level > 1 and self._head.forward[self._level - 1] is None:
+            self._level -= 1
+
+
+_memory_boards: Dict[str, SkipList] = {}
+_memory_built: Dict[str, float] = {}
+_memory_lock = threading.RLock()
+
+
+# =============================================================================
+# LEADERBOARDS
+# =============================================================================
+
+class Leaderboards:
+    """Period and specialty leaderboards over Redis sorted sets or skiplists"""
+
+    PREFIX = 'lb:'
+    TTL_MEMORY = 120   # per-process boards are rebuilt so other workers' points show up
+    TTL_REDIS = 6 * 3600  # Redis boards are rebuilt too, so a lost zincrby can't drift forever
+
+    @classmethod
+    def key(cls, period: str, specialty: str = None, now: datetime = None) -> str:
+        key = f'{cls.PREFIX}{period}:{period_bucket(period, now)}'
+        return f'{key}:spec:{specialty}' if specialty else key
+
+    @classmethod
+    def _built_key(cls, period: str, now: datetime = None) -> str:
+        return f'{cls.PREFIX}built:{period}:{period_bucket(period, now)}'
+
+    # =========================================================================
+    # WRITES
+    # =========================================================================
+
+    @classmethod
+    def record(cls, user_id: int, points: int, specialty: str = None):
+        """Add points to every current board the user is on, atomically"""
+        now = datetime.utcnow()
+        keys = []
+        for period in PERIODS:
+            keys.append((period, cls.key(period, now=now)))
+            if specialty:
+                keys.append((period, cls.key(period, specialty, now)))
+
+        client = get_redis_client()
+        if client:
+            try:
+                pipe = client.pipeline(transaction=True)
+                for period, key in keys:
+                    pipe.zincrby(key, points, user_id)
+                    if PERIOD_TTL[period]:
+                        pipe.expire(key, PERIOD_TTL[period])
+                pipe.execute()
+                return
+            except Exception as e:
+                logger.error(f'Leaderboard redis write error: {e}')
+
+        with _memory_lock:
+            for period, key in keys:
+                # Unbuilt boards pick the points up from the database on first read
+                if cls._built_key(period, now) in _memory_built:
+                    _memory_boards.setdefault(key, SkipList()).incr(user_id, points)
+
+    @classmethod
+    def rotate(cls, period: str):
+        """Drop in-memory boards of past periods; Redis keys expire via TTL"""
+        current = period_bucket(period)
+        with _memory_lock:
+            prefix = f'{cls.PREFIX}{period}:'
+            for key in [k for k in _memory_boards if k.startswith(prefix)]:
+                if not key.startswith(f'{prefix}{current}'):
+                    del _memory_boards[key]
+            built_prefix = f'{cls.PREFIX}built:{period}:'
+            for key in [k for k in _memory_built if k.startswith(built_prefix)]:
+                if key != cls._built_key(period):
+                    del _memory_built[key]
+
+    # =========================================================================
+    # READS
+    # =========================================================================
+
+    @classmethod
+    def top(cls, period: str, limit: int = 10, specialty: str = None) -> List[Tuple[int, float]]:
+        """[(user_id, points)] best first"""
+        key = cls.key(period, specialty)
+        client = get_redis_client()
+        if client:
+            try:
+                cls._ensure_built_redis(client, period)
+                return [(int(m), s) for m, s in client.zrevrange(key, 0, limit - 1, withscores=True)]
+            except Exception as e:
+                logger.error(f'Leaderboard redis read error: {e}')
+
+        cls._ensure_built_memory(period)
+        board = _memory_boards.get(key)
+        return board.top(limit) if board else []
+
+    @classmethod
+    def rank(cls, user_id: int, period: str, specialty: str = None) -> Optional[int]:
+        """1 + number of users with strictly more points; None if not on the board"""
+        key = cls.key(period, specialty)
+        client = get_redis_client()
+        if client:
+            try:
+                cls._ensure_built_redis(client, period)
+                score = client.zscore(key, user_id)
+                if score is None:
+                    return None
+                return client.zcount(key, f'({score}', '+inf') + 1
+            except Exception as e:
+                logger.error(f'Leaderboard redis rank error: {e}')
+
+        cls._ensure_built_memory(period)
+        board = _memory_boards.get(key)
+        if board is None or user_id not in board:
+            return None
+        return board.count_above(board.score(user_id)) + 1
+
+    # =========================================================================
+    # (RE)BUILD FROM THE DATABASE
+    # =========================================================================
+
+    @classmethod
+    def _load_scores(cls, period: str) -> List[Tuple[int, int, Optional[str]]]:
+        """(user_id, points, specialty) for the current period from UserPoints"""
+        from app import db
+        from models import User, UserPoints
+
+        if period == 'weekly':
+            column = UserPoints.weekly_points
+            current = UserPoints.week_key == period_bucket('weekly')
+        elif period == 'monthly':
+            column = UserPoints.monthly_points
+            current = UserPoints.month_key == period_bucket('monthly')
+        else:
+            column = UserPoints.total_points
+            current = True
+
+        rows = db.session.query(UserPoints.user_id, column, User.specialty).join(
+            User, User.id == UserPoints.user_id
+        ).filter(current, column > 0).all()
+        return [(uid, points or 0, specialty) for uid, points, specialty in rows]
+
+    @classmethod
+    def _ensure_built_redis(cls, client, period: str):
+        built_key = cls._built_key(period)
+        if client.exists(built_key):
+            return
+        rows = cls._load_scores(period)
+        boards: Dict[str, Dict[int, int]] = {}
+        for uid, points, specialty in rows:
+            boards.setdefault(cls.key(period), {})[uid] = points
+            if specialty:
+                boards.setdefault(cls.key(period, specialty), {})[uid] = points
+
+        pipe = client.pipeline(transaction=True)
+        for key in client.scan_iter(match=f'{cls.key(period)}*'):
+            pipe.delete(key)
+        for key, scores in boards.items():
+            pipe.zadd(key, scores)
+            if PERIOD_TTL[period]:
+                pipe.expire(key, PERIOD_TTL[period])
+        pipe.set(built_key, 1, ex=cls.TTL_REDIS)
+        pipe.execute()
+        logger.info(f'Rebuilt {period} leaderboards ({len(rows)} users)')
+
+    @classmethod
+    def _ensure_built_memory(cls, period: str):
+        built_key = cls._built_key(period)
+        with _memory_lock:
+            built_at = _memory_built.get(built_key)
+            if built_at is not None and time.monotonic() - built_at < cls.TTL_MEMORY:
+                return
+
+            boards: Dict[str, SkipList] = {}
+            for uid, points, specialty in cls._load_scores(period):
+                boards.setdefault(cls.key(period), SkipList()).set(uid, points)
+                if specialty:
+                    boards.setdefault(cls.key(period, specialty), SkipList()).set(uid, points)
+
+            prefix = cls.key(period)
+            for key in [k for k in _memory_boards if k.startswith(prefix)]:
+                del _memory_boards[key]
+            _memory_boards.update(boards)
+            _memory_built[built_key] = time.monotonic()
@@ -0,0 +1,207 @@
+"""
+Log Buffer - Batched, off-request writes for append-only log tables
+Rows are queued in a bounded process-local buffer and written by a daemon
+thread with multi-row INSERTs once FLUSH_SIZE rows are waiting or every
+FLUSH_INTERVAL seconds, so requests never wait on a commit for analytics
+and audit rows. A backed-up buffer makes callers flush inline
+(backpressure); only a prolonged DB outage drops rows, oldest first.
+Buffers are flushed at interpreter exit.
+"""
+import os
+import atexit
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_buffers: List['LogBuffer'] = []
+
+
+class LogBuffer:
+    """Queue rows for one model's table and bulk-insert them in the background"""
+
+    FLUSH_INTERVAL = 5.0      # seconds between flushes
+    FLUSH_SIZE = 500          # rows per INSERT statement; flush early at this size
+    BACKPRESSURE_SIZE = 5000  # callers flush inline once this many are waiting
+    MAX_QUEUED = 50000        # drop oldest beyond this (DB outage)
+
+    def __init__(self, model_name: str, timestamp_column: Optional[str] = 'created_at'):
+        self.model_name = model_name
+        self.timestamp_column = timestamp_column
+        self.dropped = 0
+        self.written = 0
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._app = None
+        self._columns = None
+        _buffers.append(self)
+
+    def add(self, **row: Any):
+        """Queue one row (column=value); never touches the DB on the caller's thread
+        unless the writer has fallen BACKPRESSURE_SIZE rows behind"""
+        columns = self._table_columns()
+        unknown = set(row) - columns
+        if unknown:
+            raise ValueError(f'Unknown {self.model_name} columns: {sorted(unknown)}')
+        if self.timestamp_column and row.get(self.timestamp_column) is None:
+            row[self.timestamp_column] = datetime.utcnow()
+
+        with self._lock:
+            if len(self._queue) >= self.MAX_QUEUED:
+                self._queue.popleft()
+                self.dropped += 1
+            self._queue.append(row)
+            size = len(self._queue)
+        self._ensure_worker()
+        if size >= self.BACKPRESSURE_SIZE:
+            self.flush()
+        elif size >= self.FLUSH_SIZE:
+            self._wakeup.set()
+
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def flush(self) -> int:
+        """Write everything queued so far; returns rows written"""
+        with self._flush_lock:
+            with self._lock:
+                rows = list(self._queue)
+                self._queue.clear()
+            if not rows:
+                return 0
+
+            app = self._app or _current_app()
+            if app is None:
+                logger.error(f'{self.model_name} flush skipped: no application available')
+                self._requeue(rows)
+                return 0
+
+            written = 0
+            for start in range(0, len(rows), self.FLUSH_SIZE):
+                chunk = rows[start:start + self.FLUSH_SIZE]
+                try:
+                    written += self._insert(app, chunk)
+                except _PartialWrite as e:
+                    # Rows before the failure are already committed; only requeue the rest
+                    written += e.written
+                    remaining = rows[start + e.consumed:]
+                    logger.error(f'{self.model_name} flush error ({len(remaining)} rows requeued): {e.error}')
+                    self._requeue(remaining)
+                    break
+                except Exception as e:
+                    logger.error(f'{self.model_name} flush error ({len(rows) - start} rows requeued): {e}')
+                    self._requeue(rows[start:])
+                    break
+            self.written += written
+            return written
+
+    def _insert(self, app, rows: List[Dict[str, Any]]) -> int:
+        from sqlalchemy.exc import DataError, IntegrityError
+        from app import db
+
+        table = self._model().__table__
+        with app.app_context():
+            try:
+                with db.engine.begin() as conn:
+                    # Multi-row VALUES; rows must share a column set, so
+                    # group by keys first
+                    for group in _group_by_keys(rows).values():
+                        conn.execute(table.insert().values(group))
+                return len(rows)
+            except (IntegrityError, DataError) as e:
+                # A bad row (e.g. a deleted user's id) must not poison the batch
+                logger.warning(f'{self.model_name} batch rejected, retrying row by row: {e}')
+                written = 0
+                for consumed, row in enumerate(rows):
+                    try:
+                        with db.engine.begin() as conn:
+                            conn.execute(table.insert().values(row))
+                        written += 1
+                    except (IntegrityError, DataError) as row_error:
+                        self.dropped += 1
+                        logger.error(f'Dropped invalid {self.model_name} row {row}: {row_error}')
+                    except Exception as row_error:
+                        raise _PartialWrite(consumed, written, row_error) from row_error
+                return written
+
+    def _requeue(self, rows: List[Dict[str, Any]]):
+        with self._lock:
+            self._queue.extendleft(reversed(rows))
+            while len(self._queue) > self.MAX_QUEUED:
+                self._queue.popleft()
+                self.dropped += 1
+
+    def _model(self):
+        import models
+        return getattr(models, self.model_name)
+
+    def _table_columns(self) -> set:
+        if self._columns is None:
+            self._columns = {column.key for column in self._model().__table__.columns}
+        return self._columns
+
+    def _ensure_worker(self):
+        # Fork-safe: each worker process starts its own writer
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._app = self._app or _current_app()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name=f'{self.model_name.lower()}-writer', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.FLUSH_INTERVAL)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f'{self.model_name} writer error: {e}')
+
+
+class _PartialWrite(Exception):
+    """Row-by-row retry stopped after consumed rows (written of them inserted)"""
+
+    def __init__(self, consumed: int, written: int, error: Exception):
+        super().__init__(str(error))
+        self.consumed = consumed
+        self.written = written
+        self.error = error
+
+
+def flush_all() -> int:
+    """Flush every buffer (shutdown, tests, CLI jobs)"""
+    return sum(buffer.flush() for buffer in _buffers)
+
+
+def _group_by_keys(rows: List[Dict[str, Any]]) -> Dict[tuple, List[Dict[str, Any]]]:
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    return groups
+
+
+def _current_app():
+    try:
+        from flask import current_app
+        return current_app._get_current_object()
+    except RuntimeError:
+        return None
+
+
+activity_buffer = LogBuffer('UserActivity')
+impression_buffer = LogBuffer('AdImpression')
+
+atexit.register(flush_all)
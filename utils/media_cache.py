@@ -0,0 +1,134 @@
+"""
+Media Cache - Bounded on-disk LRU of objects pulled from Object Storage
+Hot uploads are streamed to local disk once and then served from there
+with Range and conditional request support, so workers never buffer
+whole videos in memory and repeat views skip the storage round trip
+"""
+import os
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.environ.get('MEDIA_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'medinvest-media-cache')
+MAX_BYTES = int(os.environ.get('MEDIA_CACHE_MAX_MB', '1024')) * 1024 * 1024
+MISS_TTL = 60   # remember objects that don't exist for this long
+
+_key_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+_misses: Dict[str, float] = {}
+_state = {'bytes': None}
+
+
+class MediaCache:
+    """Local copies of storage objects, evicted least-recently-used first"""
+
+    # Only touch the file's mtime (LRU clock) once per interval per object
+    TOUCH_INTERVAL = 60
+
+    @classmethod
+    def get_path(cls, object_path: str) -> Optional[str]:
+        """Local path of a cached copy, downloading it first if needed"""
+        from object_storage_utils import download_to_path
+
+        local_path = cls._local_path(object_path)
+        if os.path.exists(local_path):
+            cls._touch(local_path)
+            return local_path
+
+        missed_at = _misses.get(object_path)
+        if missed_at and time.time() - missed_at < MISS_TTL:
+            return None
+
+        # One download per object; concurrent requests wait for it
+        with cls._lock_for(local_path):
+            if os.path.exists(local_path):
+                return local_path
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            if not download_to_path(object_path, local_path):
+                _misses[object_path] = time.time()
+                if len(_misses) > 10000:
+                    _misses.clear()
+                return None
+
+        _misses.pop(object_path, None)
+        cls._account(os.path.getsize(local_path))
+        return local_path
+
+    @classmethod
+    def evict(cls, target_bytes: int = None) -> int:
+        """Delete least recently used files until the cache is under target_bytes"""
+        target_bytes = int(MAX_BYTES * 0.9) if target_bytes is None else target_bytes
+        entries = []
+        total = 0
+        try:
+            with os.scandir(CACHE_DIR) as it:
+                for entry in it:
+                    if entry.is_file() and not entry.name.endswith('.part'):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                        total += stat.st_size
+        except FileNotFoundError:
+            _state['bytes'] = 0
+            return 0
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= target_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+        _state['bytes'] = total
+        if removed:
+            logger.info(f'Media cache evicted {removed} files, {total // (1024 * 1024)}MB remain')
+        return removed
+
+    @classmethod
+    def invalidate(cls, object_path: str):
+        """Drop the cached copy of an object (after delete/replace)"""
+        _misses.pop(object_path, None)
+        try:
+            os.remove(cls._local_path(object_path))
+        except OSError:
+            pass
+
+    @classmethod
+    def _account(cls, added: int):
+        if _state['bytes'] is None:
+            cls.evict()
+            return
+        _state['bytes'] += added
+        if _state['bytes'] > MAX_BYTES:
+            cls.evict()
+
+    @classmethod
+    def _touch(cls, path: str):
+        try:
+            if time.time() - os.path.getmtime(path) > cls.TOUCH_INTERVAL:
+                os.utime(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _local_path(object_path: str) -> str:
+        digest = hashlib.sha1(object_path.encode()).hexdigest()
+        ext = os.path.splitext(object_path)[1].lower()
+        return os.path.join(CACHE_DIR, f'{digest}{ext}')
+
+    @staticmethod
+    def _lock_for(key: str) -> threading.Lock:
+        with _locks_guard:
+            lock = _key_locks.get(key)
+            if lock is None:
+                if len(_key_locks) > 1000:
+                    _key_locks.clear()
+                lock = _key_locks[key] = threading.Lock()
+            return lock
@@ -137,7 +137,15 @@ def fetch_mia_feed_items(user, limit: int = 10) -> List[Dict]:
     """
     if not user.is_premium:
         return []
+    return fetch_mia_signals(limit=limit)
+
+
+def fetch_mia_signals(limit: int = 10) -> List[Dict]:
+    """Fetch platform-wide MIA alerts (not user specific)
     
+    Falls back to demo items when MIA_API_KEY is not configured or the
+    API call fails. Callers are responsible for the premium check.
+    """
     client = get_platform_mia_client()
     if not client:
         return get_demo_mia_items()
@@ -3,19 +3,41 @@ Multi-source News Aggregator
 Pulls news from multiple providers to avoid rate limiting
 """
 import os
-import requests
-import logging
+import re
 import time
+import hashlib
+import logging
+import threading
+import requests
 import xml.etree.ElementTree as ET
-from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Callable, Tuple
+from concurrent.futures import ThreadPoolExecutor, wait
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+
+from utils.cache_service import CacheService
 
 logger = logging.getLogger(__name__)
 
-# Cache for all sources
-_news_cache: Dict[str, Dict[str, Any]] = {}
-CACHE_TTL_SECONDS = 1800  # 30 minutes
+# Shared cache (Redis when configured) so workers don't each refetch every source
+CACHE_PREFIX = CacheService.PREFIX_NEWS
+CACHE_TTL_SECONDS = CacheService.TTL_NEWS  # 30 minutes
+
+RSS_FRESH_SECONDS = 600        # re-validate a feed (conditional GET) after this
+RSS_VALIDATOR_TTL = 86400      # keep ETag/Last-Modified and parsed items this long
+RSS_MAX_ITEMS = 25             # items parsed and kept per feed
+
+# (connect, read) timeouts per source
+SOURCE_TIMEOUTS = {
+    "rss": (3.05, 6),
+    "newsapi": (3.05, 8),
+    "finnhub": (3.05, 8),
+}
+AGGREGATE_TIMEOUT = 12         # never wait longer than this for a slow source
+
+CIRCUIT_FAILURE_THRESHOLD = 3  # consecutive failures before a source is skipped
+CIRCUIT_COOLDOWN_SECONDS = 300
 
 SENTIMENT_LABELS = {
     'bullish': {'label': 'Bullish', 'color': 'success', 'icon': 'arrow-up'},
@@ -27,20 +49,13 @@ SENTIMENT_LABELS = {
 
 
 def _get_cached(cache_key: str) -> Optional[List[Dict[str, Any]]]:
-    """Get from cache if valid"""
-    if cache_key in _news_cache:
-        cached = _news_cache[cache_key]
-        if time.time() - cached["timestamp"] < CACHE_TTL_SECONDS:
-            return cached["data"]
-    return None
+    """Get from the shared cache"""
+    return CacheService.get(f"{CACHE_PREFIX}{cache_key}")
 
 
 def _set_cached(cache_key: str, data: List[Dict[str, Any]]) -> None:
-    """Store in cache"""
-    _news_cache[cache_key] = {"timestamp": time.time(), "data": data}
-    if len(_news_cache) > 100:
-        oldest = min(_news_cache.keys(), key=lambda k: _news_cache[k]["timestamp"])
-        del _news_cache[oldest]
+    """Store in the shared cache"""
+    CacheService.set(f"{CACHE_PREFIX}{cache_key}", data, ttl=CACHE_TTL_SECONDS)
 
 
 def _format_time_ago(dt: datetime) -> str:
@@ -60,6 +75,136 @@ def _format_time_ago(dt: datetime) -> str:
     return dt.strftime("%b %d, %Y")
 
 
+def _with_relative_time(articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Recompute "5m ago" labels, which go stale while articles sit in cache"""
+    for article in articles:
+        try:
+            published = datetime.strptime(article.get("time_published", ""), "%Y%m%dT%H%M%S")
+            article["time_formatted"] = _format_time_ago(published)
+        except (TypeError, ValueError):
+            pass
+    return articles
+
+
+def _title_key(article: Dict[str, Any]) -> str:
+    """Fingerprint used to drop the same story reported by several sources"""
+    title = article.get("title", "").lower().strip()
+    # Use first 30 chars + last 20 chars to create a more unique fingerprint
+    if len(title) > 60:
+        return title[:30] + title[-20:]
+    return title[:40]  # For shorter titles, use first 40 chars
+
+
+def _dedupe_sorted(articles: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    """Deduplicate by title and sort newest first"""
+    seen = set()
+    unique = []
+    for article in articles:
+        key = _title_key(article)
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(article)
+    unique.sort(key=lambda x: x.get("time_published", ""), reverse=True)
+    return unique[:limit]
+
+
+# ============== HTTP (pooled session, shared executor) ==============
+_session: Optional[requests.Session] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_init_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    """Keep-alive session shared by all fetchers in this process"""
+    global _session
+    if _session is None:
+        with _init_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers["User-Agent"] = "MedInvest/1.0"
+                _session = session
+    return _session
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _init_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=12, thread_name_prefix="news-fetch")
+    return _executor
+
+
+def _run_concurrently(calls: List[Tuple[Callable, tuple]], timeout: float = AGGREGATE_TIMEOUT) -> List[List[Dict[str, Any]]]:
+    """Run fetchers in parallel; a source that errors or misses the deadline yields []"""
+    if not calls:
+        return []
+    futures = [_get_executor().submit(fn, *args) for fn, args in calls]
+    done, not_done = wait(futures, timeout=timeout)
+    if not_done:
+        logger.warning(f"{len(not_done)} news source(s) missed the {timeout}s deadline")
+
+    results = []
+    for future in futures:
+        if future in done:
+            try:
+                results.append(future.result() or [])
+            except Exception as e:
+                logger.error(f"Error fetching from source: {e}")
+                results.append([])
+        else:
+            results.append([])
+    return results
+
+
+# ============== Circuit breaker ==============
+class SourceUnavailable(Exception):
+    """Raised when a source's circuit is open"""
+
+
+def _circuit_key(source: str) -> str:
+    return f"{CACHE_PREFIX}circuit:{source}"
+
+
+def _circuit_allows(source: str) -> bool:
+    state = CacheService.get(_circuit_key(source))
+    return not state or state.get("open_until", 0) <= time.time()
+
+
+def _circuit_success(source: str) -> None:
+    if CacheService.get(_circuit_key(source)):
+        CacheService.delete(_circuit_key(source))
+
+
+def _circuit_failure(source: str, rate_limited: bool = False) -> None:
+    state = CacheService.get(_circuit_key(source)) or {"failures": 0, "open_until": 0}
+    state["failures"] = state.get("failures", 0) + 1
+    if rate_limited or state["failures"] >= CIRCUIT_FAILURE_THRESHOLD:
+        state["open_until"] = time.time() + CIRCUIT_COOLDOWN_SECONDS
+        logger.warning(f"News source {source} disabled for {CIRCUIT_COOLDOWN_SECONDS}s "
+                       f"after {state['failures']} failure(s)")
+    CacheService.set(_circuit_key(source), state, ttl=CIRCUIT_COOLDOWN_SECONDS * 2)
+
+
+def _http_get(source: str, url: str, timeout, **kwargs) -> requests.Response:
+    """GET through the pooled session, honouring and updating the source's circuit"""
+    if not _circuit_allows(source):
+        raise SourceUnavailable(source)
+    try:
+        response = _get_session().get(url, timeout=timeout, **kwargs)
+    except requests.RequestException:
+        _circuit_failure(source)
+        raise
+    if response.status_code == 429 or response.status_code >= 500:
+        _circuit_failure(source, rate_limited=response.status_code == 429)
+        response.raise_for_status()
+    _circuit_success(source)
+    return response
+
+
 # ============== NewsAPI.org ==============
 def fetch_newsapi(category: str = "business", limit: int = 10) -> List[Dict[str, Any]]:
     """
@@ -69,12 +214,12 @@ def fetch_newsapi(category: str = "business", limit: int = 10) -> List[Dict[str,
     cached = _get_cached(cache_key)
     if cached:
         return cached
-    
+
     api_key = os.environ.get("NEWSAPI_API_KEY")
     if not api_key:
         logger.debug("NEWSAPI_API_KEY not configured")
         return []
-    
+
     try:
         url = "https://newsapi.org/v2/top-headlines"
         params = {
@@ -83,10 +228,10 @@ def fetch_newsapi(category: str = "business", limit: int = 10) -> List[Dict[str,
             "country": "us",
             "pageSize": limit
         }
-        response = requests.get(url, params=params, timeout=10)
+        response = _http_get("newsapi", url, SOURCE_TIMEOUTS["newsapi"], params=params)
         response.raise_for_status()
         data = response.json()
-        
+
         articles = []
         for item in data.get("articles", []):
             pub_date = datetime.utcnow()
@@ -95,7 +240,7 @@ def fetch_newsapi(category: str = "business", limit: int = 10) -> List[Dict[str,
                     pub_date = datetime.fromisoformat(item["publishedAt"].replace("Z", "+00:00")).replace(tzinfo=None)
                 except:
                     pass
-            
+
             articles.append({
                 "title": item.get("title", ""),
                 "url": item.get("url", ""),
@@ -111,10 +256,12 @@ def fetch_newsapi(category: str = "business", limit: int = 10) -> List[Dict[str,
                 "ticker_sentiments": [],
                 "provider": "NewsAPI"
             })
-        
+
         _set_cached(cache_key, articles)
         logger.info(f"Fetched {len(articles)} articles from NewsAPI")
         return articles
+    except SourceUnavailable:
+        return []
     except Exception as e:
         logger.error(f"NewsAPI error: {e}")
         return []
@@ -129,19 +276,19 @@ def fetch_finnhub(category: str = "general", limit: int = 10) -> List[Dict[str,
     cached = _get_cached(cache_key)
     if cached:
         return cached
-    
+
     api_key = os.environ.get("FINNHUB_API_KEY")
     if not api_key:
         logger.debug("FINNHUB_API_KEY not configured")
         return []
-    
+
     try:
         url = "https://finnhub.io/api/v1/news"
         params = {"category": category, "token": api_key}
-        response = requests.get(url, params=params, timeout=10)
+        response = _http_get("finnhub", url, SOURCE_TIMEOUTS["finnhub"], params=params)
         response.raise_for_status()
         data = response.json()
-        
+
         articles = []
         for item in data[:limit]:
             pub_date = datetime.utcnow()
@@ -150,7 +297,7 @@ def fetch_finnhub(category: str = "general", limit: int = 10) -> List[Dict[str,
                     pub_date = datetime.fromtimestamp(item["datetime"])
                 except:
                     pass
-            
+
             articles.append({
                 "title": item.get("headline", ""),
                 "url": item.get("url", ""),
@@ -166,10 +313,12 @@ def fetch_finnhub(category: str = "general", limit: int = 10) -> List[Dict[str,
                 "ticker_sentiments": [],
                 "provider": "Finnhub"
             })
-        
+
         _set_cached(cache_key, articles)
         logger.info(f"Fetched {len(articles)} articles from Finnhub")
         return articles
+    except SourceUnavailable:
+        return []
     except Exception as e:
         logger.error(f"Finnhub error: {e}")
         return []
@@ -204,16 +353,17 @@ def get_bloomberg_headlines(limit: int = 10) -> List[Dict[str, Any]]:
     cache_key = f"bloomberg_headlines_{limit}"
     cached = _get_cached(cache_key)
     if cached:
-        return cached
-    
-    all_articles = []
-    for url, source_name in RSS_FEEDS.get("bloomberg", []):
-        articles = fetch_rss_feed(url, source_name, limit=limit)
-        all_articles.extend(articles)
-    
+        return _with_relative_time(cached)
+
+    results = _run_concurrently([
+        (fetch_rss_feed, (url, source_name, limit))
+        for url, source_name in RSS_FEEDS.get("bloomberg", [])
+    ])
+
     # Sort by time and deduplicate
+    all_articles = [article for articles in results for article in articles]
     all_articles.sort(key=lambda x: x.get("time_published", ""), reverse=True)
-    
+
     seen = set()
     unique = []
     for article in all_articles:
@@ -221,87 +371,119 @@ def get_bloomberg_headlines(limit: int = 10) -> List[Dict[str, Any]]:
         if key and key not in seen:
             seen.add(key)
             unique.append(article)
-    
+
     result = unique[:limit]
     if result:
         _set_cached(cache_key, result)
-    
+
     return result
 
 
+def _parse_rss(content: bytes, source_name: str, limit: int) -> List[Dict[str, Any]]:
+    """Parse RSS 2.0 or Atom into article dicts"""
+    root = ET.fromstring(content)
+    articles = []
+
+    # Handle both RSS 2.0 and Atom formats
+    items = root.findall(".//item") or root.findall(".//{http://www.w3.org/2005/Atom}entry")
+
+    for item in items[:limit]:
+        title = ""
+        link = ""
+        description = ""
+        pub_date = datetime.utcnow()
+
+        # RSS 2.0 format
+        title_elem = item.find("title")
+        link_elem = item.find("link")
+        desc_elem = item.find("description")
+        date_elem = item.find("pubDate")
+
+        # Atom format fallback
+        if title_elem is None:
+            title_elem = item.find("{http://www.w3.org/2005/Atom}title")
+        if link_elem is None:
+            link_elem = item.find("{http://www.w3.org/2005/Atom}link")
+            if link_elem is not None:
+                link = link_elem.get("href", "")
+        if desc_elem is None:
+            desc_elem = item.find("{http://www.w3.org/2005/Atom}summary")
+
+        title = title_elem.text if title_elem is not None and title_elem.text else ""
+        if not link and link_elem is not None and link_elem.text:
+            link = link_elem.text
+        description = desc_elem.text if desc_elem is not None and desc_elem.text else ""
+
+        # Clean HTML from description
+        if description:
+            description = re.sub(r'<[^>]+>', '', description)[:300]
+
+        # Parse date
+        if date_elem is not None and date_elem.text:
+            try:
+                pub_date = parsedate_to_datetime(date_elem.text).replace(tzinfo=None)
+            except:
+                pass
+
+        if title and link:
+            articles.append({
+                "title": title,
+                "url": link,
+                "summary": description,
+                "source": source_name,
+                "authors": [],
+                "banner_image": "",
+                "time_published": pub_date.strftime("%Y%m%dT%H%M%S"),
+                "time_formatted": _format_time_ago(pub_date),
+                "sentiment_score": 0,
+                "sentiment": SENTIMENT_LABELS['neutral'],
+                "topics": [],
+                "ticker_sentiments": [],
+                "provider": "RSS"
+            })
+
+    return articles
+
+
 def fetch_rss_feed(url: str, source_name: str, limit: int = 5) -> List[Dict[str, Any]]:
-    """Fetch articles from a single RSS feed"""
+    """Fetch articles from a single RSS feed
+
+    Parsed items and the feed's ETag/Last-Modified are kept in the shared
+    cache; once RSS_FRESH_SECONDS have passed the feed is re-validated with
+    a conditional GET and a 304 reuses the cached items.
+    """
+    state_key = f"{CACHE_PREFIX}rss:{hashlib.sha1(url.encode()).hexdigest()}"
+    state = CacheService.get(state_key)
+    if state and time.time() - state.get("checked_at", 0) < RSS_FRESH_SECONDS:
+        return _with_relative_time(state["items"][:limit])
+
+    headers = {}
+    if state:
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+
     try:
-        response = requests.get(url, timeout=10, headers={"User-Agent": "MedInvest/1.0"})
+        response = _http_get(f"rss:{source_name}", url, SOURCE_TIMEOUTS["rss"], headers=headers)
+        if response.status_code == 304 and state:
+            state["checked_at"] = time.time()
+            CacheService.set(state_key, state, ttl=RSS_VALIDATOR_TTL)
+            return _with_relative_time(state["items"][:limit])
         response.raise_for_status()
-        
-        root = ET.fromstring(response.content)
-        articles = []
-        
-        # Handle both RSS 2.0 and Atom formats
-        items = root.findall(".//item") or root.findall(".//{http://www.w3.org/2005/Atom}entry")
-        
-        for item in items[:limit]:
-            title = ""
-            link = ""
-            description = ""
-            pub_date = datetime.utcnow()
-            
-            # RSS 2.0 format
-            title_elem = item.find("title")
-            link_elem = item.find("link")
-            desc_elem = item.find("description")
-            date_elem = item.find("pubDate")
-            
-            # Atom format fallback
-            if title_elem is None:
-                title_elem = item.find("{http://www.w3.org/2005/Atom}title")
-            if link_elem is None:
-                link_elem = item.find("{http://www.w3.org/2005/Atom}link")
-                if link_elem is not None:
-                    link = link_elem.get("href", "")
-            if desc_elem is None:
-                desc_elem = item.find("{http://www.w3.org/2005/Atom}summary")
-            
-            title = title_elem.text if title_elem is not None and title_elem.text else ""
-            if not link and link_elem is not None and link_elem.text:
-                link = link_elem.text
-            description = desc_elem.text if desc_elem is not None and desc_elem.text else ""
-            
-            # Clean HTML from description
-            if description:
-                import re
-                description = re.sub(r'<[^>]+>', '', description)[:300]
-            
-            # Parse date
-            if date_elem is not None and date_elem.text:
-                try:
-                    from email.utils import parsedate_to_datetime
-                    pub_date = parsedate_to_datetime(date_elem.text).replace(tzinfo=None)
-                except:
-                    pass
-            
-            if title and link:
-                articles.append({
-                    "title": title,
-                    "url": link,
-                    "summary": description,
-                    "source": source_name,
-                    "authors": [],
-                    "banner_image": "",
-                    "time_published": pub_date.strftime("%Y%m%dT%H%M%S"),
-                    "time_formatted": _format_time_ago(pub_date),
-                    "sentiment_score": 0,
-                    "sentiment": SENTIMENT_LABELS['neutral'],
-                    "topics": [],
-                    "ticker_sentiments": [],
-                    "provider": "RSS"
-                })
-        
-        return articles
+
+        items = _parse_rss(response.content, source_name, RSS_MAX_ITEMS)
+        CacheService.set(state_key, {
+            "items": items,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "checked_at": time.time(),
+        }, ttl=RSS_VALIDATOR_TTL)
+        return items[:limit]
     except Exception as e:
         logger.debug(f"RSS feed error ({source_name}): {e}")
-        return []
+        # Serve the last good copy while the feed is failing
+        return _with_relative_time(state["items"][:limit]) if state else []
 
 
 def fetch_rss_category(category: str, limit: int = 10) -> List[Dict[str, Any]]:
@@ -310,31 +492,31 @@ def fetch_rss_category(category: str, limit: int = 10) -> List[Dict[str, Any]]:
     cached = _get_cached(cache_key)
     if cached:
         return cached
-    
-    feeds = RSS_FEEDS.get(category, RSS_FEEDS.get("business", []))
-    all_articles = []
-    
-    if not feeds:
-        return []
-    
-    # Calculate per-feed limit, ensuring at least 3 per feed
-    per_feed_limit = max(3, (limit + len(feeds) - 1) // len(feeds))
-    
-    for url, source_name in feeds:
-        articles = fetch_rss_feed(url, source_name, limit=per_feed_limit)
-        all_articles.extend(articles)
-    
+
+    results = _run_concurrently(_rss_calls(category, limit))
+    all_articles = [article for articles in results for article in articles]
+
     # Sort by time and limit
     all_articles.sort(key=lambda x: x.get("time_published", ""), reverse=True)
     result = all_articles[:limit]
-    
+
     if result:
         _set_cached(cache_key, result)
         logger.info(f"Fetched {len(result)} articles from RSS feeds")
-    
+
     return result
 
 
+def _rss_calls(category: str, limit: int) -> List[Tuple[Callable, tuple]]:
+    """One fetch per feed so every feed of a category is fetched concurrently"""
+    feeds = RSS_FEEDS.get(category, RSS_FEEDS.get("business", []))
+    if not feeds:
+        return []
+    # Calculate per-feed limit, ensuring at least 3 per feed
+    per_feed_limit = max(3, (limit + len(feeds) - 1) // len(feeds))
+    return [(fetch_rss_feed, (url, source_name, per_feed_limit)) for url, source_name in feeds]
+
+
 # ============== Aggregator ==============
 
 # Map categories to Alpha Vantage topics for specialized queries
@@ -348,6 +530,76 @@ ALPHA_VANTAGE_TOPICS = {
     "economy": ["economy_macro"],
 }
 
+# Map categories to source-specific categories
+CATEGORY_MAP = {
+    "business": {"newsapi": "business", "finnhub": "general", "rss": "business", "alpha": ["economy_macro", "finance"]},
+    "healthcare": {"newsapi": "health", "finnhub": "general", "rss": "healthcare", "alpha": ["life_sciences"]},
+    "finance": {"newsapi": "business", "finnhub": "general", "rss": "finance", "alpha": ["finance", "earnings"]},
+    "real_estate": {"newsapi": "business", "finnhub": "general", "rss": "real_estate", "alpha": ["real_estate"]},
+    "technology": {"newsapi": "technology", "finnhub": "technology", "rss": "business", "alpha": ["technology"]},
+    "earnings": {"newsapi": "business", "finnhub": "general", "rss": "finance", "alpha": ["earnings"]},
+}
+
+
+def _fetch_alpha_vantage(topics: List[str], limit: int) -> List[Dict[str, Any]]:
+    if not _circuit_allows("alpha_vantage"):
+        return []
+    from utils.news import fetch_news
+    try:
+        articles = fetch_news(None, topics, limit)
+    except Exception:
+        _circuit_failure("alpha_vantage")
+        raise
+    _circuit_success("alpha_vantage")
+    return articles
+
+
+def _source_calls(category: str, limit: int, include_alpha_vantage: bool) -> List[Tuple[Callable, tuple]]:
+    """Every individual fetch behind one aggregated category"""
+    per_source_limit = max(5, (limit + 2) // 3)  # Ensure at least 5 per source
+    cats = CATEGORY_MAP.get(category, CATEGORY_MAP["business"])
+
+    calls = [
+        (fetch_newsapi, (cats["newsapi"], per_source_limit)),
+        (fetch_finnhub, (cats["finnhub"], per_source_limit)),
+    ]
+    # RSS feeds (always available), one call per feed
+    calls.extend(_rss_calls(cats["rss"], per_source_limit))
+    # Alpha Vantage (if enabled and not rate limited)
+    if include_alpha_vantage:
+        calls.append((_fetch_alpha_vantage, (cats.get("alpha", ["finance"]), per_source_limit)))
+    return calls
+
+
+def _aggregate_many(categories: List[Tuple[str, int, bool]]) -> List[List[Dict[str, Any]]]:
+    """Aggregate several categories, fetching all of their uncached sources in one batch"""
+    results: List[Optional[List[Dict[str, Any]]]] = []
+    pending = []  # (index, cache_key, limit, slice of the batch)
+    batch: List[Tuple[Callable, tuple]] = []
+
+    for category, limit, include_alpha_vantage in categories:
+        cache_key = f"aggregated_{category}_{limit}_{include_alpha_vantage}"
+        cached = _get_cached(cache_key)
+        if cached:
+            results.append(_with_relative_time(cached))
+            continue
+        calls = _source_calls(category, limit, include_alpha_vantage)
+        pending.append((len(results), cache_key, limit, slice(len(batch), len(batch) + len(calls))))
+        batch.extend(calls)
+        results.append(None)
+
+    if pending:
+        fetched = _run_concurrently(batch)
+        for index, cache_key, limit, span in pending:
+            all_articles = [article for articles in fetched[span] for article in articles]
+            result = _dedupe_sorted(all_articles, limit)
+            if result:
+                _set_cached(cache_key, result)
+                logger.info(f"Aggregated {len(result)} unique articles from {len(all_articles)} total")
+            results[index] = result
+
+    return results
+
 
 def get_aggregated_news(
     category: str = "business",
@@ -358,101 +610,14 @@ def get_aggregated_news(
     Aggregate news from all available sources
     Returns deduplicated, sorted articles
     """
-    cache_key = f"aggregated_{category}_{limit}_{include_alpha_vantage}"
-    cached = _get_cached(cache_key)
-    if cached:
-        return cached
-    
-    all_articles = []
-    per_source_limit = max(5, (limit + 2) // 3)  # Ensure at least 5 per source
-    
-    # Map categories to source-specific categories
-    category_map = {
-        "business": {"newsapi": "business", "finnhub": "general", "rss": "business", "alpha": ["economy_macro", "finance"]},
-        "healthcare": {"newsapi": "health", "finnhub": "general", "rss": "healthcare", "alpha": ["life_sciences"]},
-        "finance": {"newsapi": "business", "finnhub": "general", "rss": "finance", "alpha": ["finance", "earnings"]},
-        "real_estate": {"newsapi": "business", "finnhub": "general", "rss": "real_estate", "alpha": ["real_estate"]},
-        "technology": {"newsapi": "technology", "finnhub": "technology", "rss": "business", "alpha": ["technology"]},
-        "earnings": {"newsapi": "business", "finnhub": "general", "rss": "finance", "alpha": ["earnings"]},
-    }
-    cats = category_map.get(category, category_map["business"])
-    
-    # Fetch from all sources in parallel
-    with ThreadPoolExecutor(max_workers=4) as executor:
-        futures = []
-        
-        # NewsAPI
-        futures.append(executor.submit(fetch_newsapi, cats["newsapi"], per_source_limit))
-        
-        # Finnhub
-        futures.append(executor.submit(fetch_finnhub, cats["finnhub"], per_source_limit))
-        
-        # RSS feeds (always available)
-        futures.append(executor.submit(fetch_rss_category, cats["rss"], per_source_limit))
-        
-        # Alpha Vantage (if enabled and not rate limited)
-        if include_alpha_vantage:
-            from utils.news import fetch_news as fetch_alpha_vantage
-            topics = cats.get("alpha", ["finance"])
-            futures.append(executor.submit(fetch_alpha_vantage, None, topics, per_source_limit))
-        
-        for future in as_completed(futures):
-            try:
-                articles = future.result()
-                all_articles.extend(articles)
-            except Exception as e:
-                logger.error(f"Error fetching from source: {e}")
-    
-    # Deduplicate by title similarity (use more characters for better matching)
-    seen_titles = set()
-    unique_articles = []
-    for article in all_articles:
-        title = article.get("title", "").lower().strip()
-        # Use first 30 chars + last 20 chars to create a more unique fingerprint
-        if len(title) > 60:
-            title_key = title[:30] + title[-20:]
-        else:
-            title_key = title[:40]  # For shorter titles, use first 40 chars
-        if title_key and title_key not in seen_titles:
-            seen_titles.add(title_key)
-            unique_articles.append(article)
-    
-    # Sort by time (newest first)
-    unique_articles.sort(key=lambda x: x.get("time_published", ""), reverse=True)
-    
-    result = unique_articles[:limit]
-    
-    if result:
-        _set_cached(cache_key, result)
-        logger.info(f"Aggregated {len(result)} unique articles from {len(all_articles)} total")
-    
-    return result
+    return _aggregate_many([(category, limit, include_alpha_vantage)])[0]
 
 
 def get_medical_investment_news(limit: int = 15) -> List[Dict[str, Any]]:
     """Get news tailored for medical professionals interested in investing"""
-    all_news = []
-    
-    # Get healthcare news
-    healthcare = get_aggregated_news("healthcare", limit=limit // 2)
-    all_news.extend(healthcare)
-    
-    # Get finance/investment news
-    finance = get_aggregated_news("finance", limit=limit // 2)
-    all_news.extend(finance)
-    
-    # Deduplicate and sort
-    seen = set()
-    unique = []
-    for article in all_news:
-        title = article.get("title", "").lower().strip()
-        if len(title) > 60:
-            key = title[:30] + title[-20:]
-        else:
-            key = title[:40]
-        if key and key not in seen:
-            seen.add(key)
-            unique.append(article)
-    
-    unique.sort(key=lambda x: x.get("time_published", ""), reverse=True)
-    return unique[:limit]
+    # Healthcare and finance/investment news, fetched together
+    healthcare, finance = _aggregate_many([
+        ("healthcare", limit // 2, True),
+        ("finance", limit // 2, True),
+    ])
+    return _dedupe_sorted(healthcare + finance, limit)
@@ -0,0 +1,328 @@
+"""
+People Suggestions - Offline friend-of-friend recommendation engine
+Precomputes ranked people-you-may-know lists for active users so the request
+path only reads and filters a stored top-N list
+"""
+import math
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Set
+
+from utils.social_graph import SocialGraph, FOLLOWING, CONNECTIONS
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+# Network matrix edge weights (accepted connections count more than follows)
+EDGE_WEIGHTS = {
+    'follow': 1.0,
+    'connection': 1.5,
+}
+
+# Candidate scoring weights
+SUGGESTION_WEIGHTS = {
+    'mutual': 4.0,          # per unit of weighted two-hop paths
+    'same_specialty': 10.0,
+    'same_state': 5.0,
+    'verified': 2.0,
+    'activity': 1.0,        # multiplied by log(1 + points)
+}
+
+TOP_N = 50              # suggestions stored per user
+POOL_SIZE = 50          # cold-start candidates per specialty/state/global pool
+ACTIVE_DAYS = 90        # only users seen in this window get (or appear in) suggestions
+WRITE_BATCH = 500       # users per delete/insert/commit cycle
+
+
+# =============================================================================
+# GRAPH + PROFILE LOADING
+# =============================================================================
+
+def _active_user_filter(User):
+    cutoff = datetime.utcnow() - timedelta(days=ACTIVE_DAYS)
+    return [
+        User.account_active.isnot(False),
+        User.is_banned.isnot(True),
+        User.last_seen >= cutoff,
+    ]
+
+
+def _load_profiles(user_ids: Iterable[int] = None) -> Dict[int, dict]:
+    """Load scoring attributes for active users (all of them when user_ids is None)"""
+    from app import db
+    from models import User
+
+    query = db.session.query(
+        User.id, User.specialty, User.license_state, User.points, User.is_verified
+    ).filter(*_active_user_filter(User))
+
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        query = query.filter(User.id.in_(user_ids))
+
+    return {
+        row.id: {
+            'specialty': row.specialty,
+            'license_state': row.license_state,
+            'points': row.points or 0,
+            'is_verified': bool(row.is_verified),
+        }
+        for row in query.all()
+    }
+
+
+def _load_full_network():
+    """
+    Load the whole weighted network matrix plus every user's exclusion set.
+
+    Returns (matrix, excluded) where matrix[u][v] is the edge weight from u to v.
+    """
+    from app import db
+    from models import Follow, Connection
+
+    matrix = defaultdict(dict)
+    excluded = defaultdict(set)
+
+    for follower_id, following_id in db.session.query(Follow.follower_id, Follow.following_id):
+        matrix[follower_id][following_id] = EDGE_WEIGHTS['follow']
+        excluded[follower_id].add(following_id)
+
+    connections = db.session.query(
+        Connection.requester_id, Connection.addressee_id, Connection.status
+    )
+    for requester_id, addressee_id, status in connections:
+        excluded[requester_id].add(addressee_id)
+        excluded[addressee_id].add(requester_id)
+        if status == 'accepted':
+            for a, b in ((requester_id, addressee_id), (addressee_id, requester_id)):
+                matrix[a][b] = matrix[a].get(b, 0.0) + EDGE_WEIGHTS['connection']
+
+    return matrix, excluded
+
+
+def _load_local_network(user_ids: List[int]):
+    """Load the two-hop neighbourhood of user_ids from the social graph cache"""
+    matrix = defaultdict(dict)
+
+    def add_rows(ids):
+        following = SocialGraph.neighbors(ids, FOLLOWING)
+        connections = SocialGraph.neighbors(ids, CONNECTIONS)
+        for uid in ids:
+            row = matrix[uid]
+            for vid in following[uid]:
+                row[vid] = EDGE_WEIGHTS['follow']
+            for vid in connections[uid]:
+                row[vid] = row.get(vid, 0.0) + EDGE_WEIGHTS['connection']
+
+    add_rows(user_ids)
+    first_hop = {vid for uid in user_ids for vid in matrix[uid]} - set(user_ids)
+    if first_hop:
+        add_rows(list(first_hop))
+
+    excluded = {uid: SocialGraph.excluded_ids(uid) for uid in user_ids}
+    return matrix, excluded
+
+
+def _load_pools(specialties: Set[str], states: Set[str]) -> dict:
+    """Top users per specialty/state and globally, for users with thin networks"""
+    from app import db
+    from models import User
+
+    active = _active_user_filter(User)
+    pools = {'specialty': {}, 'state': {}, 'global': []}
+
+    for specialty in specialties:
+        rows = db.session.query(User.id).filter(
+            *active, User.specialty == specialty, User.is_verified == True
+        ).order_by(User.level.desc()).limit(POOL_SIZE).all()
+        pools['specialty'][specialty] = [r.id for r in rows]
+
+    for state in states:
+        rows = db.session.query(User.id).filter(
+            *active, User.license_state == state
+        ).order_by(User.level.desc()).limit(POOL_SIZE).all()
+        pools['state'][state] = [r.id for r in rows]
+
+    rows = db.session.query(User.id).filter(
+        *active, User.is_verified == True
+    ).order_by(User.points.desc()).limit(POOL_SIZE).all()
+    pools['global'] = [r.id for r in rows]
+
+    return pools
+
+
+# =============================================================================
+# SCORING
+# =============================================================================
+
+def score_candidates(user_id, matrix, profiles, pools, excluded, limit=TOP_N):
+    """
+    Rank suggestions for one user.
+
+    The mutual term is row user_id of the sparse product M x M (weighted
+    friend-of-friend paths); specialty, state, verification and activity
+    are added per candidate.
+
+    Returns: list of (suggested_user_id, score, mutual_count), best first
+    """
+    profile = profiles.get(user_id)
+    if profile is None:
+        return []
+
+    mutual = defaultdict(float)
+    paths = defaultdict(int)
+    for vid, w_uv in matrix.get(user_id, {}).items():
+        for xid, w_vx in matrix.get(vid, {}).items():
+            mutual[xid] += w_uv * w_vx
+            paths[xid] += 1
+
+    candidates = set(mutual)
+    candidates.update(pools['specialty'].get(profile['specialty'], ()))
+    candidates.update(pools['state'].get(profile['license_state'], ()))
+    candidates.update(pools['global'])
+    candidates -= excluded.get(user_id, set())
+    candidates.discard(user_id)
+
+    scored = []
+    for cid in candidates:
+        candidate = profiles.get(cid)
+        if candidate is None:
+            continue  # inactive, banned or unknown
+
+        score = SUGGESTION_WEIGHTS['mutual'] * mutual.get(cid, 0.0)
+        if profile['specialty'] and candidate['specialty'] == profile['specialty']:
+            score += SUGGESTION_WEIGHTS['same_specialty']
+        if profile['license_state'] and candidate['license_state'] == profile['license_state']:
+            score += SUGGESTION_WEIGHTS['same_state']
+        if candidate['is_verified']:
+            score += SUGGESTION_WEIGHTS['verified']
+        score += SUGGESTION_WEIGHTS['activity'] * math.log1p(max(candidate['points'], 0))
+
+        scored.append((cid, score, paths.get(cid, 0), candidate['points']))
+
+    scored.sort(key=lambda s: (s[1], s[3]), reverse=True)
+    return [(cid, score, count) for cid, score, count, _ in scored[:limit]]
+
+
+def _store_suggestions(results: Dict[int, list]):
+    """Replace stored suggestions for the users in results"""
+    from app import db
+    from models import PeopleSuggestion
+
+    if not results:
+        return
+
+    now = datetime.utcnow()
+    PeopleSuggestion.query.filter(
+        PeopleSuggestion.user_id.in_(list(results))
+    ).delete(synchronize_session=False)
+
+    rows = [
+        {
+            'user_id': user_id,
+            'suggested_user_id': sid,
+            'rank': rank,
+            'score': score,
+            'mutual_count': count,
+            'computed_at': now,
+        }
+        for user_id, ranked in results.items()
+        for rank, (sid, score, count) in enumerate(ranked)
+    ]
+    if rows:
+        db.session.execute(PeopleSuggestion.__table__.insert(), rows)
+    db.session.commit()
+
+
+def _invalidate_request_cache(user_ids: Iterable[int]):
+    from utils.cache_service import CacheService
+    for user_id in user_ids:
+        CacheService.delete_pattern(f'people_you_may_know:user:{user_id}:*')
+
+
+# =============================================================================
+# BATCH JOBS
+# =============================================================================
+
+def recompute_all_suggestions() -> dict:
+    """Full rebuild of stored suggestions for every active user"""
+    profiles = _load_profiles()
+    matrix, excluded = _load_full_network()
+    pools = _load_pools(
+        {p['specialty'] for p in profiles.values() if p['specialty']},
+        {p['license_state'] for p in profiles.values() if p['license_state']},
+    )
+
+    user_ids = list(profiles)
+    for start in range(0, len(user_ids), WRITE_BATCH):
+        batch = user_ids[start:start + WRITE_BATCH]
+        results = {
+            uid: score_candidates(uid, matrix, profiles, pools, excluded)
+            for uid in batch
+        }
+        _store_suggestions(results)
+        _invalidate_request_cache(batch)
+
+    logger.info(f'Recomputed people suggestions for {len(user_ids)} users')
+    return {'users': len(user_ids)}
+
+
+def refresh_dirty_suggestions(limit: int = 1000) -> dict:
+    """Recompute suggestions only for users whose neighbourhood changed"""
+    dirty = SocialGraph.pop_dirty(limit)
+    if not dirty:
+        return {'users': 0}
+
+    matrix, excluded = _load_local_network(dirty)
+    candidate_ids = set(dirty)
+    for uid in dirty:
+        for vid in matrix[uid]:
+            candidate_ids.update(matrix.get(vid, {}))
+
+    targets = _load_profiles(dirty)
+    pools = _load_pools(
+        {p['specialty'] for p in targets.values() if p['specialty']},
+        {p['license_state'] for p in targets.values() if p['license_state']},
+    )
+    for pool in list(pools['specialty'].values()) + list(pools['state'].values()):
+        candidate_ids.update(pool)
+    candidate_ids.update(pools['global'])
+    profiles = _load_profiles(candidate_ids)
+
+    results = {
+        uid: score_candidates(uid, matrix, profiles, pools, excluded)
+        for uid in targets
+    }
+    _store_suggestions(results)
+    _invalidate_request_cache(dirty)
+
+    logger.info(f'Refreshed people suggestions for {len(results)} users')
+    return {'users': len(results)}
+
+
+# =============================================================================
+# REQUEST PATH
+# =============================================================================
+
+def get_suggested_user_ids(user_id: int, exclude_ids: Set[int], limit: int) -> List[int]:
+    """Read the stored ranked list, dropping anyone the user has since followed or connected"""
+    from models import PeopleSuggestion
+
+    rows = PeopleSuggestion.query.with_entities(PeopleSuggestion.suggested_user_id).filter(
+        PeopleSuggestion.user_id == user_id
+    ).order_by(PeopleSuggestion.rank).limit(TOP_N).all()
+
+    result = []
+    for (sid,) in rows:
+        if sid not in exclude_ids:
+            result.append(sid)
+            if len(result) >= limit:
+                break
+    return result
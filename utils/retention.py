@@ -0,0 +1,255 @@
+"""
+Retention - Time-partitioned storage and expiry for append-heavy tables
+On PostgreSQL the high-volume log tables are range-partitioned on their
+timestamp (monthly, or daily for short-lived data). Partitions are created
+ahead of time, and expiring data detaches and drops (or archives) whole
+partitions, a metadata-only operation that leaves the live indexes untouched.
+Queries filtered on the timestamp only scan the matching partitions.
+SQLite and any table not yet partitioned fall back to deleting in bounded
+batches by primary key, as do the legacy and default partitions, which
+can't be dropped whole
+"""
+import re
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SCHEMA = 'archive'
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    table: str
+    column: str                # partition key / expiry timestamp
+    keep_days: int
+    granularity: str = 'month'  # 'month' or 'day'
+    archive: bool = False       # detach into ARCHIVE_SCHEMA instead of dropping
+    premake: int = 2            # future partitions kept ready
+
+
+POLICIES: Dict[str, RetentionPolicy] = {
+    policy.table: policy for policy in (
+        RetentionPolicy('user_activity', 'created_at', keep_days=395, archive=True),
+        RetentionPolicy('notifications', 'created_at', keep_days=180),
+        RetentionPolicy('ad_impressions', 'created_at', keep_days=395, archive=True),
+        RetentionPolicy('engagement_snapshots', 'snapshot_hour', keep_days=7,
+                        granularity='day', premake=3),
+        RetentionPolicy('job_runs', 'started_at', keep_days=30),
+    )
+}
+
+_BOUND_RE = re.compile(r"TO \('([^']+)'\)")
+
+
+class RetentionManager:
+    """Create upcoming partitions and expire old ones"""
+
+    DELETE_BATCH_SIZE = 5000
+
+    @classmethod
+    def run(cls, now: datetime = None) -> Dict[str, Dict[str, int]]:
+        """Maintain every policy; per-table counts of partitions created/expired and rows deleted"""
+        results = {}
+        for table in POLICIES:
+            try:
+                results[table] = cls.maintain(table, now=now)
+            except Exception as e:
+                logger.error(f'Retention failed for {table}: {e}')
+                results[table] = {'error': 1}
+        return results
+
+    @classmethod
+    def maintain(cls, table: str, now: datetime = None) -> Dict[str, int]:
+        from app import db
+
+        policy = POLICIES[table]
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(days=policy.keep_days)
+        with db.engine.begin() as conn:
+            partitioned = is_partitioned(conn, table)
+        if not partitioned:
+            return {'created': 0, 'expired': 0, 'deleted': cls._delete_batches(policy, cutoff)}
+
+        created = cls.ensure_partitions(policy, now)
+        expired = cls.expire_partitions(policy, cutoff)
+        deleted = cls.expire_open_partitions(policy, cutoff)
+        return {'created': created, 'expired': expired, 'deleted': deleted}
+
+    @classmethod
+    def ensure_partitions(cls, policy: RetentionPolicy, now: datetime) -> int:
+        """Create partitions for the current period and the next policy.premake"""
+        from app import db
+
+        created = 0
+        start = period_start(now, policy.granularity)
+        existing = cls.partitions(policy.table)
+        names = {name for name, _ in existing}
+        default = f'{policy.table}_default' if f'{policy.table}_default' in names else None
+        # The legacy partition (and any already created) covers up to here
+        covered = max((upper for _, upper in existing if upper), default=None)
+        for _ in range(policy.premake + 1):
+            end = next_period(start, policy.granularity)
+            name = partition_name(policy.table, start, policy.granularity)
+            if name not in names and (covered is None or start >= covered):
+                try:
+                    with db.engine.begin() as conn:
+                        if default:
+                            create_partition_from_default(conn, policy, name, start, end, default)
+                        else:
+                            create_partition(conn, policy.table, name, start, end)
+                    created += 1
+                except Exception as e:
+                    logger.warning(f'Could not create partition {name}: {e}')
+            start = end
+        return created
+
+    @classmethod
+    def expire_partitions(cls, policy: RetentionPolicy, cutoff: datetime) -> int:
+        """Drop (or archive) partitions whose whole range is older than cutoff"""
+        from sqlalchemy import text
+        from app import db
+
+        expired = 0
+        for name, upper in cls.partitions(policy.table):
+            if upper is None or upper > cutoff:
+                continue
+            with db.engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE {policy.table} DETACH PARTITION {name}'))
+                if policy.archive:
+                    conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}'))
+                    conn.execute(text(f'ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}'))
+                else:
+                    conn.execute(text(f'DROP TABLE {name}'))
+            expired += 1
+            logger.info(f"{'Archived' if policy.archive else 'Dropped'} partition {name}")
+        return expired
+
+    @classmethod
+    def expire_open_partitions(cls, policy: RetentionPolicy, cutoff: datetime) -> int:
+        """
+        Delete expired rows, in batches, from the partitions that can't be
+        dropped whole: the legacy partition while its range still reaches
+        past the cutoff, and the unbounded default partition. Archiving
+        policies move the rows into ARCHIVE_SCHEMA.<partition>_expired
+        """
+        from sqlalchemy import text
+        from app import db
+
+        deleted = 0
+        for name, upper in cls.partitions(policy.table):
+            if upper is None or (name == f'{policy.table}_legacy' and upper > cutoff):
+                archive_to = None
+                if policy.archive:
+                    archive_to = f'{ARCHIVE_SCHEMA}.{name}_expired'
+                    with db.engine.begin() as conn:
+                        conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}'))
+                        conn.execute(text(f'CREATE TABLE IF NOT EXISTS {archive_to} (LIKE {name})'))
+                deleted += cls._delete_batches(policy, cutoff, table=name, archive_to=archive_to)
+        return deleted
+
+    @classmethod
+    def partitions(cls, table: str) -> List[Tuple[str, Optional[datetime]]]:
+        """(name, exclusive upper bound) for each partition; None bound for DEFAULT"""
+        from sqlalchemy import text
+        from app import db
+
+        with db.engine.begin() as conn:
+            rows = conn.execute(text(
+                "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+                "FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = :table AND p.relnamespace = 'public'::regnamespace"
+            ), {'table': table}).all()
+
+        result = []
+        for name, bound in rows:
+            match = _BOUND_RE.search(bound or '')
+            result.append((name, datetime.fromisoformat(match.group(1)) if match else None))
+        return sorted(result, key=lambda item: item[1] or datetime.max)
+
+    @classmethod
+    def _delete_batches(cls, policy: RetentionPolicy, cutoff: datetime, table: str = None,
+                        archive_to: str = None) -> int:
+        """
+        Delete expired rows from table (default: the policy's table) in short
+        transactions, oldest first; archive_to (PostgreSQL) receives the rows
+        """
+        from sqlalchemy import text
+        from app import db
+
+        table = table or policy.table
+        delete = (
+            f'DELETE FROM {table} WHERE id IN ('
+            f'SELECT id FROM {table} WHERE {policy.column} < :cutoff '
+            f'ORDER BY {policy.column} LIMIT :limit)'
+        )
+        if archive_to:
+            delete = f'WITH moved AS ({delete} RETURNING *) INSERT INTO {archive_to} SELECT * FROM moved'
+        deleted = 0
+        while True:
+            with db.engine.begin() as conn:
+                result = conn.execute(text(delete), {'cutoff': cutoff, 'limit': cls.DELETE_BATCH_SIZE})
+            deleted += result.rowcount or 0
+            if (result.rowcount or 0) < cls.DELETE_BATCH_SIZE:
+                return deleted
+
+
+def is_partitioned(conn, table: str) -> bool:
+    if conn.dialect.name != 'postgresql':
+        return False
+    from sqlalchemy import text
+
+    kind = conn.execute(text(
+        "SELECT c.relkind FROM pg_class c "
+        "WHERE c.relname = :table AND c.relnamespace = 'public'::regnamespace"
+    ), {'table': table}).scalar()
+    return kind == 'p'
+
+
+def create_partition(conn, table: str, name: str, start: datetime, end: datetime):
+    from sqlalchemy import text
+
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{start.isoformat(' ')}') TO ('{end.isoformat(' ')}')"
+    ))
+
+
+def create_partition_from_default(conn, policy: RetentionPolicy, name: str,
+                                  start: datetime, end: datetime, default: str):
+    """
+    Create a range partition when the default partition may already hold
+    rows in that range (PostgreSQL refuses to attach over them): detach the
+    default, create the partition, move the range's rows over and
+    reattach, all in the caller's transaction
+    """
+    from sqlalchemy import text
+
+    table, column = policy.table, policy.column
+    bounds = {'start': start, 'end': end}
+    conn.execute(text(f'ALTER TABLE {table} DETACH PARTITION {default}'))
+    create_partition(conn, table, name, start, end)
+    conn.execute(text(
+        f'INSERT INTO {name} SELECT * FROM {default} WHERE {column} >= :start AND {column} < :end'
+    ), bounds)
+    conn.execute(text(f'DELETE FROM {default} WHERE {column} >= :start AND {column} < :end'), bounds)
+    conn.execute(text(f'ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT'))
+
+
+def partition_name(table: str, start: datetime, granularity: str) -> str:
+    return f"{table}_p{start.strftime('%Y%m%d' if granularity == 'day' else '%Y%m')}"
+
+
+def period_start(moment: datetime, granularity: str) -> datetime:
+    start = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return start if granularity == 'day' else start.replace(day=1)
+
+
+def next_period(start: datetime, granularity: str) -> datetime:
+    if granularity == 'day':
+        return start + timedelta(days=1)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
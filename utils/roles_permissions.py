@@ -4,9 +4,10 @@ Provides role-based access control (RBAC) for the platform.
 """
 from functools import wraps
 from typing import List, Set, Optional, Dict
-from flask import abort, current_app
+from flask import abort, current_app, g, has_app_context
 from flask_login import current_user
 from app import db
+from utils.cache_service import CacheService, get_redis_client
 import logging
 
 logger = logging.getLogger(__name__)
@@ -78,22 +79,101 @@ DEFAULT_ROLES = {
 }
 
 
-def get_user_permissions(user) -> Set[str]:
-    """Get all permissions for a user based on their role."""
-    if user.is_admin:
-        return set(PERMISSIONS.keys())
+ROLE_VERSION_KEY = 'permissions:roles:version'
+
+
+class PermissionResolver:
+    """
+    Resolve a user's effective permission set once and reuse it.
+
+    Sets are memoized for the rest of the request (flask.g) and, with
+    Redis, shared across workers. Cache keys carry the user's role, so
+    reassigning a user never serves a stale set; editing a custom role
+    bumps ROLE_VERSION_KEY, which retires every cached set at once.
+    Without Redis that counter is per process, so a revocation could not
+    reach the other workers; custom roles are then resolved per request.
+    """
+    
+    CACHE_TTL = 600
     
-    role = getattr(user, 'role', 'member') or 'member'
+    @classmethod
+    def permissions_for(cls, user) -> frozenset:
+        if user.is_admin:
+            return _ALL_PERMISSIONS
+        
+        role = getattr(user, 'role', 'member') or 'member'
+        if role in DEFAULT_ROLES:
+            return _DEFAULT_ROLE_PERMISSIONS[role]
+        
+        memo = cls._request_memo()
+        memo_key = (user.id, role)
+        if memo is not None and memo_key in memo:
+            return memo[memo_key]
+        
+        if get_redis_client() is None:
+            permissions = cls._resolve(role)
+        else:
+            version = cls._version(memo)
+            cache_key = f'permissions:v{version}:{user.id}:{role}'
+            cached = CacheService.get(cache_key)
+            if cached is not None:
+                permissions = frozenset(cached)
+            else:
+                permissions = cls._resolve(role)
+                CacheService.set(cache_key, sorted(permissions), ttl=cls.CACHE_TTL)
+        
+        if memo is not None:
+            memo[memo_key] = permissions
+        return permissions
     
-    if role in DEFAULT_ROLES:
-        return set(DEFAULT_ROLES[role]['permissions'])
+    @classmethod
+    def invalidate(cls):
+        """Call after creating, editing or deleting a custom role"""
+        CacheService.increment(ROLE_VERSION_KEY)
+        memo = cls._request_memo()
+        if memo is not None:
+            memo.clear()
     
-    from models import CustomRole
-    custom_role = CustomRole.query.filter_by(name=role).first()
-    if custom_role:
-        return set(custom_role.permissions.split(',')) if custom_role.permissions else set()
+    @staticmethod
+    def _resolve(role: str) -> frozenset:
+        from models import CustomRole
+        
+        custom_role = CustomRole.query.filter_by(name=role).first()
+        if custom_role:
+            return frozenset(_split_permissions(custom_role.permissions))
+        return _DEFAULT_ROLE_PERMISSIONS['member']
     
-    return set(DEFAULT_ROLES['member']['permissions'])
+    @staticmethod
+    def _request_memo() -> Optional[dict]:
+        if not has_app_context():
+            return None
+        if '_permission_sets' not in g:
+            g._permission_sets = {}
+        return g._permission_sets
+    
+    @staticmethod
+    def _version(memo: Optional[dict]) -> int:
+        if memo is not None and 'version' in memo:
+            return memo['version']
+        version = CacheService.get(ROLE_VERSION_KEY) or 0
+        if memo is not None:
+            memo['version'] = version
+        return version
+
+
+def _split_permissions(value: Optional[str]) -> Set[str]:
+    return {p for p in (value or '').split(',') if p}
+
+
+_ALL_PERMISSIONS = frozenset(PERMISSIONS)
+_DEFAULT_ROLE_PERMISSIONS = {
+    name: frozenset(config['permissions']) for name, config in DEFAULT_ROLES.items()
+}
+
+
+def get_user_permissions(user) -> Set[str]:
+    """Get all permissions for a user based on their role."""
+    return set(PermissionResolver.permissions_for(user))
 
 
 def has_permission(user, permission: str) -> bool:
@@ -104,20 +184,19 @@ def has_permission(user, permission: str) -> bool:
     if user.is_admin:
         return True
     
-    permissions = get_user_permissions(user)
-    return permission in permissions
+    return permission in PermissionResolver.permissions_for(user)
 
 
 def has_any_permission(user, permissions: List[str]) -> bool:
     """Check if a user has any of the specified permissions."""
-    user_permissions = get_user_permissions(user)
-    return bool(user_permissions.intersection(set(permissions)))
+    user_permissions = PermissionResolver.permissions_for(user)
+    return not user_permissions.isdisjoint(permissions)
 
 
 def has_all_permissions(user, permissions: List[str]) -> bool:
     """Check if a user has all of the specified permissions."""
-    user_permissions = get_user_permissions(user)
-    return set(permissions).issubset(user_permissions)
+    user_permissions = PermissionResolver.permissions_for(user)
+    return user_permissions.issuperset(permissions)
 
 
 def permission_required(permission: str):
@@ -228,6 +307,7 @@ class RoleManager:
         )
         db.session.add(role)
         db.session.commit()
+        PermissionResolver.invalidate()
         
         return role.id
     
@@ -257,6 +337,7 @@ class RoleManager:
             role.color = color
         
         db.session.commit()
+        PermissionResolver.invalidate()
         return True
     
     @staticmethod
@@ -272,6 +353,7 @@ class RoleManager:
         
         db.session.delete(role)
         db.session.commit()
+        PermissionResolver.invalidate()
         
         return True
     
@@ -32,8 +32,9 @@ def run_code_review_job():
 def init_scheduler(app):
     """Initialize the background scheduler
     
-    To prevent multiple scheduler instances in multi-worker environments,
-    this only runs when explicitly enabled via SCHEDULER_ENABLED=true
+    Only runs when explicitly enabled via SCHEDULER_ENABLED=true. Jobs are
+    coordinated across processes (see utils.job_coordinator), so enabling it
+    on every worker still runs each job once per cluster
     """
     global _scheduler
     
@@ -64,6 +65,9 @@ def init_scheduler(app):
             max_instances=1
         )
         
+        from utils.job_coordinator import JobCoordinator
+        JobCoordinator.coordinate(_scheduler)
+        
         _scheduler.start()
         logger.info('Background scheduler started with hourly code review job')
         
@@ -80,6 +84,8 @@ def get_scheduler_status():
     if _scheduler is None:
         return {'running': False, 'jobs': []}
     
+    from utils.job_coordinator import LeaderElection
+    
     jobs = []
     for job in _scheduler.get_jobs():
         jobs.append({
@@ -91,5 +97,6 @@ def get_scheduler_status():
     
     return {
         'running': _scheduler.running,
+        'leader': LeaderElection.leader(),
         'jobs': jobs
     }
@@ -0,0 +1,426 @@
+"""
+Social Graph Service - Cached follow/connection adjacency for MedInvest
+Keeps per-user neighbour sets (following, followers, connections, pending
+requests) in Redis sets, or compact sorted int arrays in memory, so social
+pages read the graph instead of re-deriving it from Follow/Connection rows.
+"""
+import time
+import logging
+import threading
+from array import array
+from datetime import datetime
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Set
+
+from utils.cache_service import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Adjacency kinds tracked per user
+FOLLOWING = 'following'
+FOLLOWERS = 'followers'
+CONNECTIONS = 'connections'      # accepted, undirected
+PENDING_IN = 'pending_in'        # requests other users sent to this user
+PENDING_OUT = 'pending_out'      # requests this user sent
+DECLINED = 'declined'            # declined either way (still excluded from suggestions)
+
+EDGE_KINDS = (FOLLOWING, FOLLOWERS, CONNECTIONS, PENDING_IN, PENDING_OUT, DECLINED)
+CONNECTION_KINDS = (CONNECTIONS, PENDING_IN, PENDING_OUT, DECLINED)
+
+_memory_graph: Dict[int, dict] = {}
+_memory_loaded_at: Dict[int, float] = {}
+_memory_dirty: Set[int] = set()
+_memory_lock = threading.RLock()
+
+
+class SocialGraph:
+    """Per-user adjacency cache with Redis sets and an in-memory fallback"""
+
+    PREFIX = 'graph:'
+    DIRTY_KEY = 'graph:dirty'
+    TTL_REDIS = 86400      # 1 day - hooks keep Redis current, TTL bounds drift
+    TTL_MEMORY = 600       # 10 minutes - other workers' writes show up after this
+    MAX_MEMORY_USERS = 50000
+
+    # =========================================================================
+    # READS
+    # =========================================================================
+
+    @classmethod
+    def neighbors(cls, user_ids: Iterable[int], kind: str = FOLLOWING) -> Dict[int, Set[int]]:
+        """Get one adjacency kind for many users in a single round trip"""
+        user_ids = list(dict.fromkeys(int(uid) for uid in user_ids))
+        if not user_ids:
+            return {}
+
+        client = get_redis_client()
+        if client:
+            try:
+                cls._ensure_loaded_redis(client, user_ids)
+                pipe = client.pipeline()
+                for uid in user_ids:
+                    pipe.smembers(cls._key(kind, uid))
+                members = pipe.execute()
+                return {uid: {int(m) for m in ids} for uid, ids in zip(user_ids, members)}
+            except Exception as e:
+                logger.error(f'Social graph redis read error: {e}')
+
+        adjacency = cls._ensure_loaded_memory(user_ids)
+        return {uid: set(adjacency[uid][kind]) for uid in user_ids}
+
+    @classmethod
+    def snapshot(cls, user_id: int) -> Dict[str, Set[int]]:
+        """Get every adjacency kind for one user"""
+        client = get_redis_client()
+        if client:
+            try:
+                cls._ensure_loaded_redis(client, [user_id])
+                pipe = client.pipeline()
+                for kind in EDGE_KINDS:
+                    pipe.smembers(cls._key(kind, user_id))
+                members = pipe.execute()
+                return {kind: {int(m) for m in ids} for kind, ids in zip(EDGE_KINDS, members)}
+            except Exception as e:
+                logger.error(f'Social graph redis read error: {e}')
+
+        adjacency = cls._ensure_loaded_memory([user_id])[user_id]
+        return {kind: set(adjacency[kind]) for kind in EDGE_KINDS}
+
+    @classmethod
+    def following(cls, user_id: int) -> Set[int]:
+        """IDs of users that user_id follows"""
+        return cls.neighbors([user_id], FOLLOWING)[user_id]
+
+    @classmethod
+    def followers(cls, user_id: int) -> Set[int]:
+        """IDs of users following user_id"""
+        return cls.neighbors([user_id], FOLLOWERS)[user_id]
+
+    @classmethod
+    def connections(cls, user_id: int) -> Set[int]:
+        """IDs of accepted connections"""
+        return cls.neighbors([user_id], CONNECTIONS)[user_id]
+
+    @classmethod
+    def network_ids(cls, user_id: int) -> Set[int]:
+        """Accepted connections plus follows (the user's colleagues)"""
+        graph = cls.snapshot(user_id)
+        return graph[CONNECTIONS] | graph[FOLLOWING]
+
+    @classmethod
+    def excluded_ids(cls, user_id: int) -> Set[int]:
+        """Users that should never be suggested: self, follows and any connection state"""
+        graph = cls.snapshot(user_id)
+        excluded = {user_id} | graph[FOLLOWING]
+        for kind in CONNECTION_KINDS:
+            excluded |= graph[kind]
+        return excluded
+
+    @classmethod
+    def mutual_count(cls, a: int, b: int, kind: str = FOLLOWING) -> int:
+        """Number of users adjacent to both a and b"""
+        client = get_redis_client()
+        if client:
+            try:
+                cls._ensure_loaded_redis(client, [a, b])
+                return len(client.sinter(cls._key(kind, a), cls._key(kind, b)))
+            except Exception as e:
+                logger.error(f'Social graph redis read error: {e}')
+
+        adjacency = cls._ensure_loaded_memory([a, b])
+        left, right = adjacency[a][kind], adjacency[b][kind]
+        if len(left) > len(right):
+            left, right = right, left
+        return sum(1 for uid in left if _contains(right, uid))
+
+    @classmethod
+    def is_following(cls, follower_id: int, following_id: int) -> bool:
+        """Check a single follow edge"""
+        return following_id in cls.following(follower_id)
+
+    # =========================================================================
+    # WRITES (call after the Follow/Connection change is committed)
+    # =========================================================================
+
+    @classmethod
+    def on_follow(cls, follower_id: int, following_id: int):
+        cls._apply([
+            (follower_id, FOLLOWING, following_id, True),
+            (following_id, FOLLOWERS, follower_id, True),
+        ])
+
+    @classmethod
+    def on_unfollow(cls, follower_id: int, following_id: int):
+        cls._apply([
+            (follower_id, FOLLOWING, following_id, False),
+            (following_id, FOLLOWERS, follower_id, False),
+        ])
+
+    @classmethod
+    def on_connection_requested(cls, requester_id: int, addressee_id: int):
+        cls._set_connection_state(requester_id, addressee_id, 'pending')
+
+    @classmethod
+    def on_connection_accepted(cls, requester_id: int, addressee_id: int):
+        cls._set_connection_state(requester_id, addressee_id, 'accepted')
+
+    @classmethod
+    def on_connection_declined(cls, requester_id: int, addressee_id: int):
+        cls._set_connection_state(requester_id, addressee_id, 'declined')
+
+    @classmethod
+    def on_connection_removed(cls, a: int, b: int):
+        cls._set_connection_state(a, b, None)
+
+    @classmethod
+    def invalidate(cls, user_id: int):
+        """Drop cached adjacency so the next read reloads from the database"""
+        client = get_redis_client()
+        if client:
+            try:
+                client.delete(cls._loaded_key(user_id),
+                              *[cls._key(kind, user_id) for kind in EDGE_KINDS])
+            except Exception as e:
+                logger.error(f'Social graph invalidate error: {e}')
+        with _memory_lock:
+            _memory_graph.pop(user_id, None)
+            _memory_loaded_at.pop(user_id, None)
+
+    @classmethod
+    def mark_dirty(cls, user_ids: Iterable[int]):
+        """
+        Record users whose neighbourhood changed (consumed by suggestion refresh)
+
+        The set must be shared with the scheduler process, so without Redis
+        it lives in suggestion_dirty_users; the in-process set is only a last
+        resort if that write fails
+        """
+        user_ids = [int(uid) for uid in user_ids]
+        if not user_ids:
+            return
+        client = get_redis_client()
+        if client:
+            try:
+                client.sadd(cls.DIRTY_KEY, *user_ids)
+                return
+            except Exception as e:
+                logger.error(f'Social graph mark dirty error: {e}')
+        try:
+            _mark_dirty_db(user_ids)
+            return
+        except Exception as e:
+            logger.error(f'Social graph mark dirty (database) error: {e}')
+        with _memory_lock:
+            _memory_dirty.update(user_ids)
+
+    @classmethod
+    def pop_dirty(cls, limit: int = 1000) -> List[int]:
+        """Take up to limit users whose neighbourhood changed"""
+        client = get_redis_client()
+        if client:
+            try:
+                return [int(uid) for uid in client.spop(cls.DIRTY_KEY, limit) or []]
+            except Exception as e:
+                logger.error(f'Social graph pop dirty error: {e}')
+        with _memory_lock:
+            popped = [_memory_dirty.pop() for _ in range(min(limit, len(_memory_dirty)))]
+        try:
+            popped += _pop_dirty_db(limit - len(popped))
+        except Exception as e:
+            logger.error(f'Social graph pop dirty (database) error: {e}')
+        return popped
+
+    @classmethod
+    def _set_connection_state(cls, requester_id: int, addressee_id: int, status):
+        """Replace whatever connection edge exists between two users"""
+        ops = []
+        for kind in CONNECTION_KINDS:
+            ops.append((requester_id, kind, addressee_id, False))
+            ops.append((addressee_id, kind, requester_id, False))
+
+        if status == 'accepted':
+            ops.append((requester_id, CONNECTIONS, addressee_id, True))
+            ops.append((addressee_id, CONNECTIONS, requester_id, True))
+        elif status == 'pending':
+            ops.append((requester_id, PENDING_OUT, addressee_id, True))
+            ops.append((addressee_id, PENDING_IN, requester_id, True))
+        elif status == 'declined':
+            ops.append((requester_id, DECLINED, addressee_id, True))
+            ops.append((addressee_id, DECLINED, requester_id, True))
+
+        cls._apply(ops)
+
+    @classmethod
+    def _apply(cls, ops):
+        """Apply (user_id, kind, other_id, add) edge updates to loaded adjacency"""
+        cls.mark_dirty({op[0] for op in ops})
+
+        client = get_redis_client()
+        if client:
+            try:
+                pipe = client.pipeline()
+                for user_id, kind, other_id, add in ops:
+                    key = cls._key(kind, user_id)
+                    if add:
+                        pipe.sadd(key, other_id)
+                        pipe.expire(key, cls.TTL_REDIS)
+                    else:
+                        pipe.srem(key, other_id)
+                pipe.execute()
+            except Exception as e:
+                logger.error(f'Social graph redis write error: {e}')
+                for user_id in {op[0] for op in ops}:
+                    cls.invalidate(user_id)
+
+        with _memory_lock:
+            for user_id, kind, other_id, add in ops:
+                adjacency = _memory_graph.get(user_id)
+                if adjacency is None:
+                    continue
+                ids = adjacency[kind]
+                pos = bisect_left(ids, other_id)
+                present = pos < len(ids) and ids[pos] == other_id
+                if add and not present:
+                    ids.insert(pos, other_id)
+                elif not add and present:
+                    del ids[pos]
+
+    # =========================================================================
+    # LOADING
+    # =========================================================================
+
+    @classmethod
+    def _key(cls, kind: str, user_id: int) -> str:
+        return f'{cls.PREFIX}{kind}:{user_id}'
+
+    @classmethod
+    def _loaded_key(cls, user_id: int) -> str:
+        return f'{cls.PREFIX}loaded:{user_id}'
+
+    @classmethod
+    def _ensure_loaded_redis(cls, client, user_ids: List[int]):
+        pipe = client.pipeline()
+        for uid in user_ids:
+            pipe.exists(cls._loaded_key(uid))
+        missing = [uid for uid, loaded in zip(user_ids, pipe.execute()) if not loaded]
+        if not missing:
+            return
+
+        adjacency = load_adjacency(missing)
+        pipe = client.pipeline()
+        for uid in missing:
+            for kind in EDGE_KINDS:
+                key = cls._key(kind, uid)
+                pipe.delete(key)
+                if adjacency[uid][kind]:
+                    pipe.sadd(key, *adjacency[uid][kind])
+                    pipe.expire(key, cls.TTL_REDIS)
+            pipe.setex(cls._loaded_key(uid), cls.TTL_REDIS, 1)
+        pipe.execute()
+
+    @classmethod
+    def _ensure_loaded_memory(cls, user_ids: List[int]) -> Dict[int, dict]:
+        now = time.monotonic()
+        with _memory_lock:
+            result = {}
+            missing = []
+            for uid in user_ids:
+                loaded_at = _memory_loaded_at.get(uid)
+                if loaded_at is not None and now - loaded_at < cls.TTL_MEMORY:
+                    result[uid] = _memory_graph[uid]
+                else:
+                    missing.append(uid)
+
+        if missing:
+            adjacency = load_adjacency(missing)
+            with _memory_lock:
+                if len(_memory_graph) + len(missing) > cls.MAX_MEMORY_USERS:
+                    _memory_graph.clear()
+                    _memory_loaded_at.clear()
+                for uid in missing:
+                    compact = {kind: array('q', sorted(set(adjacency[uid][kind])))
+                               for kind in EDGE_KINDS}
+                    _memory_graph[uid] = compact
+                    _memory_loaded_at[uid] = now
+                    result[uid] = compact
+
+        return result
+
+
+def load_adjacency(user_ids: List[int]) -> Dict[int, Dict[str, List[int]]]:
+    """Build adjacency lists for user_ids with one Follow and one Connection query"""
+    from app import db
+    from models import Follow, Connection
+
+    adjacency = {uid: {kind: [] for kind in EDGE_KINDS} for uid in user_ids}
+
+    follows = db.session.query(Follow.follower_id, Follow.following_id).filter(
+        db.or_(Follow.follower_id.in_(user_ids), Follow.following_id.in_(user_ids))
+    ).all()
+    for follower_id, following_id in follows:
+        if follower_id in adjacency:
+            adjacency[follower_id][FOLLOWING].append(following_id)
+        if following_id in adjacency:
+            adjacency[following_id][FOLLOWERS].append(follower_id)
+
+    connections = db.session.query(
+        Connection.requester_id, Connection.addressee_id, Connection.status
+    ).filter(
+        db.or_(Connection.requester_id.in_(user_ids), Connection.addressee_id.in_(user_ids))
+    ).all()
+    for requester_id, addressee_id, status in connections:
+        if status == 'accepted':
+            out_kind, in_kind = CONNECTIONS, CONNECTIONS
+        elif status == 'pending':
+            out_kind, in_kind = PENDING_OUT, PENDING_IN
+        else:
+            out_kind, in_kind = DECLINED, DECLINED
+        if requester_id in adjacency:
+            adjacency[requester_id][out_kind].append(addressee_id)
+        if addressee_id in adjacency:
+            adjacency[addressee_id][in_kind].append(requester_id)
+
+    return adjacency
+
+
+def _contains(sorted_ids, value: int) -> bool:
+    pos = bisect_left(sorted_ids, value)
+    return pos < len(sorted_ids) and sorted_ids[pos] == value
+
+
+def _mark_dirty_db(user_ids: List[int]):
+    from app import db
+    from models import SuggestionDirtyUser
+
+    table = SuggestionDirtyUser.__table__
+    rows = [{'user_id': uid, 'marked_at': datetime.utcnow()} for uid in dict.fromkeys(user_ids)]
+    with db.engine.begin() as conn:
+        if conn.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif conn.dialect.name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            existing = {row[0] for row in conn.execute(
+                table.select().with_only_columns(table.c.user_id).where(table.c.user_id.in_(user_ids))
+            )}
+            rows = [row for row in rows if row['user_id'] not in existing]
+            if rows:
+                conn.execute(table.insert(), rows)
+            return
+        conn.execute(insert(table).values(rows).on_conflict_do_nothing(index_elements=['user_id']))
+
+
+def _pop_dirty_db(limit: int) -> List[int]:
+    from app import db
+    from models import SuggestionDirtyUser
+
+    if limit <= 0:
+        return []
+    table = SuggestionDirtyUser.__table__
+    with db.engine.begin() as conn:
+        user_ids = [row[0] for row in conn.execute(
+            table.select().with_only_columns(table.c.user_id).order_by(table.c.marked_at).limit(limit)
+        )]
+        if user_ids:
+            conn.execute(table.delete().where(table.c.user_id.in_(user_ids)))
+    return user_ids
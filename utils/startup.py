@@ -0,0 +1,129 @@
+"""
+Startup - Boot timing, lazily built clients and cached schema verification
+Keeps worker boot cheap: SDK clients are constructed on first use instead
+of at import, the table check is skipped when the database is already on
+a migration revision that has been verified against the current models,
+and each boot phase is timed so regressions show up in the logs
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Generic, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_MARKER_DIR = os.environ.get('SCHEMA_MARKER_DIR') or os.path.join(tempfile.gettempdir(), 'medinvest-schema')
+
+_boot_started = time.perf_counter()
+_phases: List[Dict[str, Any]] = []
+_last_checkpoint = [_boot_started]
+
+T = TypeVar('T')
+
+
+def boot_checkpoint(name: str):
+    """Record the time spent since the previous checkpoint as boot phase name"""
+    now = time.perf_counter()
+    _phases.append({'phase': name, 'ms': round((now - _last_checkpoint[0]) * 1000, 1)})
+    _last_checkpoint[0] = now
+
+
+def get_boot_timings() -> Dict[str, Any]:
+    return {'phases': list(_phases), 'total_ms': round(sum(p['ms'] for p in _phases), 1)}
+
+
+def log_boot_timings():
+    """Log per-phase timings once the app is fully assembled"""
+    timings = get_boot_timings()
+    detail = ', '.join(f"{p['phase']}={p['ms']:.0f}ms" for p in timings['phases'])
+    logger.info(f"Boot complete in {timings['total_ms']:.0f}ms ({detail})")
+
+
+class LazyClient(Generic[T]):
+    """Build an expensive client on first use, once per process"""
+
+    def __init__(self, factory: Callable[[], Optional[T]]):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._built = False
+        self._value: Optional[T] = None
+
+    def get(self) -> Optional[T]:
+        """The client, or None if the factory returned None or failed (retried next call)"""
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    try:
+                        self._value = self._factory()
+                    except Exception as e:
+                        logger.error(f'Failed to initialize client: {e}')
+                        return None
+                    self._built = True
+        return self._value
+
+    def reset(self):
+        with self._lock:
+            self._built = False
+            self._value = None
+
+
+def verify_schema(db, app) -> List[str]:
+    """
+    Create missing model tables, skipping the inspector pass when this exact
+    migration revision + model set was already verified for this database
+
+    Only databases stamped by Alembic are cached; an unstamped (fresh or
+    throwaway) database is always checked.
+    """
+    from utils.db_verify import verify_and_create_tables
+
+    fingerprint = _schema_fingerprint(db, app)
+    marker = _marker_path(app) if fingerprint else None
+    if marker and _read_marker(marker) == fingerprint:
+        logger.debug('Schema already verified for this revision; skipping table check')
+        return []
+
+    created = verify_and_create_tables(db, app)
+    if marker:
+        try:
+            os.makedirs(SCHEMA_MARKER_DIR, exist_ok=True)
+            tmp_path = f'{marker}.{os.getpid()}'
+            with open(tmp_path, 'w') as fh:
+                fh.write(fingerprint)
+            os.replace(tmp_path, marker)
+        except OSError as e:
+            logger.debug(f'Could not record schema verification: {e}')
+    return created
+
+
+def _schema_fingerprint(db, app) -> Optional[str]:
+    from sqlalchemy import text
+
+    try:
+        with app.app_context(), db.engine.connect() as conn:
+            revisions = sorted(row[0] for row in conn.execute(text('SELECT version_num FROM alembic_version')))
+    except Exception:
+        return None  # not managed by Alembic yet
+    if not revisions:
+        return None
+    models = sorted(
+        f"{name}:{','.join(sorted(table.columns.keys()))}" for name, table in db.metadata.tables.items()
+    )
+    return hashlib.sha256(json.dumps({'revisions': revisions, 'models': models}).encode()).hexdigest()
+
+
+def _marker_path(app) -> str:
+    url = str(app.config.get('SQLALCHEMY_DATABASE_URI', ''))
+    return os.path.join(SCHEMA_MARKER_DIR, hashlib.sha256(url.encode()).hexdigest()[:24])
+
+
+def _read_marker(path: str) -> Optional[str]:
+    try:
+        with open(path) as fh:
+            return fh.read().strip()
+    except OSError:
+        return None
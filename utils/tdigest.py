@@ -0,0 +1,121 @@
+"""
+T-Digest - Mergeable percentile sketch
+Approximates quantiles (p50/p95...) of large streams in a few hundred
+centroids, so percentile metrics can be stored and merged instead of
+re-sorting whole tables
+"""
+from typing import Iterable, List, Optional, Tuple
+
+
+class TDigest:
+    """Merging t-digest (Dunning) with the q(1-q) centroid size bound"""
+
+    def __init__(self, compression: float = 100.0):
+        self.compression = compression
+        self._centroids: List[Tuple[float, float]] = []  # (mean, weight), sorted by mean
+        self._buffer: List[Tuple[float, float]] = []
+        self.count = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float, weight: float = 1.0):
+        """Add one observation"""
+        value = float(value)
+        self._buffer.append((value, float(weight)))
+        self.count += weight
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if len(self._buffer) > 5 * self.compression:
+            self._compress()
+
+    def update(self, values: Iterable[float]):
+        """Add many observations"""
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: 'TDigest'):
+        """Fold another digest into this one"""
+        other._compress()
+        for mean, weight in other._centroids:
+            self._buffer.append((mean, weight))
+            self.count += weight
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        self._compress()
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated value at quantile q (0-1); None for an empty digest"""
+        self._compress()
+        centroids = self._centroids
+        if not centroids:
+            return None
+        if len(centroids) == 1 or q <= 0:
+            return centroids[0][0] if q > 0 else self.min
+        if q >= 1:
+            return self.max
+
+        target = q * self.count
+        cumulative = 0.0
+        for i, (mean, weight) in enumerate(centroids):
+            center = cumulative + weight / 2.0
+            if target < center:
+                if i == 0:
+                    # Interpolate between the minimum and the first centroid
+                    return self.min + (mean - self.min) * (target / center) if center else mean
+                prev_mean, prev_weight = centroids[i - 1]
+                prev_center = cumulative - prev_weight / 2.0
+                return prev_mean + (mean - prev_mean) * (target - prev_center) / (center - prev_center)
+            cumulative += weight
+
+        last_mean, last_weight = centroids[-1]
+        last_center = self.count - last_weight / 2.0
+        if self.count == last_center:
+            return last_mean
+        return last_mean + (self.max - last_mean) * (target - last_center) / (self.count - last_center)
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        items = sorted(self._centroids + self._buffer)
+        self._buffer = []
+
+        total = sum(weight for _, weight in items)
+        merged = []
+        cumulative = 0.0
+        cur_mean, cur_weight = items[0]
+        for mean, weight in items[1:]:
+            q = (cumulative + (cur_weight + weight) / 2.0) / total
+            limit = max(1.0, 4.0 * total * q * (1.0 - q) / self.compression)
+            if cur_weight + weight <= limit:
+                cur_mean = (cur_mean * cur_weight + mean * weight) / (cur_weight + weight)
+                cur_weight += weight
+            else:
+                merged.append((cur_mean, cur_weight))
+                cumulative += cur_weight
+                cur_mean, cur_weight = mean, weight
+        merged.append((cur_mean, cur_weight))
+        self._centroids = merged
+
+    def to_dict(self) -> dict:
+        """JSON-serializable form"""
+        self._compress()
+        return {
+            'compression': self.compression,
+            'count': self.count,
+            'min': self.min,
+            'max': self.max,
+            'centroids': [[m, w] for m, w in self._centroids],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'TDigest':
+        digest = cls(compression=data.get('compression', 100.0))
+        digest._centroids = [(float(m), float(w)) for m, w in data.get('centroids', [])]
+        digest.count = float(data.get('count', 0.0))
+        digest.min = data.get('min')
+        digest.max = data.get('max')
+        return digest
+
+    def __len__(self):
+        return int(self.count)
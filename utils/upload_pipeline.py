@@ -0,0 +1,103 @@
+"""
+Upload Pipeline - Single-pass, size-limited, content-addressed uploads
+Each file is streamed once in chunks into a temp file next to its final
+location while being hashed and size-checked, renamed to its SHA-256 name
+(identical files collapse to one copy), then pushed to Object Storage from
+disk. Multi-file uploads run concurrently.
+"""
+import os
+import hashlib
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+MAX_PARALLEL_UPLOADS = 4
+
+
+class UploadRejected(Exception):
+    """Raised when a file fails validation while streaming"""
+
+
+def store_upload(file, subdir: str, max_size: int, base_path: str) -> Dict[str, Any]:
+    """
+    Stream one FileStorage to uploads/<subdir>/<sha256>.<ext> and Object Storage
+
+    Returns dict with filename, file_size, sha256 and deduplicated;
+    raises UploadRejected for empty or oversized files.
+    """
+    from object_storage_utils import upload_file_from_path, OBJECT_STORAGE_AVAILABLE
+
+    if file.content_length and file.content_length > max_size:
+        raise UploadRejected(_too_large(max_size))
+
+    ext = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else ''
+    dest_dir = os.path.join(base_path, subdir)
+    fd, tmp_path = tempfile.mkstemp(dir=dest_dir, suffix='.part')
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = file.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadRejected(_too_large(max_size))
+                hasher.update(chunk)
+                out.write(chunk)
+        if size == 0:
+            raise UploadRejected('File is empty')
+
+        digest = hasher.hexdigest()
+        filename = f'{digest[:32]}.{ext}' if ext else digest[:32]
+        final_path = os.path.join(dest_dir, filename)
+        deduplicated = os.path.exists(final_path)
+        if deduplicated:
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, final_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    if OBJECT_STORAGE_AVAILABLE:
+        upload_file_from_path(final_path, f'uploads/{subdir}/{filename}')
+
+    return {
+        'filename': filename,
+        'file_size': size,
+        'sha256': digest,
+        'deduplicated': deduplicated,
+    }
+
+
+def store_uploads(jobs: List[tuple], base_path: str) -> List[Dict[str, Any]]:
+    """
+    Run store_upload for several (file, subdir, max_size) jobs in parallel
+
+    Results are in input order; a failed file yields {'error': ...}.
+    """
+    def run(job):
+        file, subdir, max_size = job
+        try:
+            return store_upload(file, subdir, max_size, base_path)
+        except UploadRejected as e:
+            return {'error': str(e)}
+        except Exception as e:
+            logger.error(f'Upload failed for {file.filename}: {e}')
+            return {'error': 'Upload failed'}
+
+    if len(jobs) <= 1:
+        return [run(job) for job in jobs]
+    with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_UPLOADS, len(jobs))) as executor:
+        return list(executor.map(run, jobs))
+
+
+def _too_large(max_size: int) -> str:
+    return f'File too large. Max size: {max_size // (1024*1024)}MB'
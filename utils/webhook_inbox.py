@@ -0,0 +1,273 @@
+"""
+Webhook Inbox - Durable, idempotent intake for provider webhooks
+Verified payloads are stored keyed by the provider's event ID and
+acknowledged immediately; a background consumer applies them later,
+exactly once and in order per ordering key. One consumer per source runs
+at a time cluster-wide, under a lease (Redis, else a PostgreSQL advisory
+lock) that is renewed while it drains. Redeliveries cost a single
+unique-index insert instead of a full handler run. Batch sources hand
+whole pages of payloads to their handler so it can coalesce them
+"""
+import json
+import logging
+import importlib
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from utils.job_coordinator import Lease, _Heartbeat
+
+logger = logging.getLogger(__name__)
+
+# source -> "module:function" applying one decoded payload (resolved lazily so
+# the consumer works from jobs.py without importing every blueprint)
+HANDLERS = {
+    'stripe': 'routes.subscription:apply_stripe_event',
+}
+# source -> "module:function" applying a list of decoded payloads, oldest first.
+# A batch whose handler raises goes back to pending and is retried whole (at
+# least once), so these handlers must skip items an earlier attempt already
+# applied and deal with their own per-item errors
+BATCH_HANDLERS = {
+    'facebook': 'routes.webhooks:apply_facebook_batch',
+}
+
+_dirty = set()
+_running = set()
+_state_lock = threading.Lock()
+
+
+class WebhookInbox:
+    """Record webhook events on receipt; drain them off the request path"""
+
+    MAX_ATTEMPTS = 5
+    BATCH_SIZE = 200
+    LOCK_TTL = 300            # consumer lease per source, renewed every LOCK_TTL / 3 while draining
+    RETENTION_DAYS = 30       # well past the providers' retry windows
+
+    @classmethod
+    def record(cls, source: str, external_id: str, payload: str, event_type: str = None,
+               ordering_key: str = None, event_created: int = None) -> bool:
+        """Store an event; False if it was already received (duplicate delivery)"""
+        from sqlalchemy.exc import IntegrityError
+        from app import db
+        from models import WebhookInboxEvent
+
+        db.session.add(WebhookInboxEvent(
+            source=source,
+            external_id=external_id,
+            event_type=event_type,
+            ordering_key=ordering_key,
+            event_created=event_created,
+            payload=payload,
+            status='pending',
+            attempts=0,
+        ))
+        try:
+            db.session.commit()
+            return True
+        except IntegrityError:
+            db.session.rollback()
+            return False
+
+    @classmethod
+    def kick(cls, source: str):
+        """Drain a source on a daemon thread; events arriving mid-drain trigger another pass"""
+        with _state_lock:
+            _dirty.add(source)
+            if source in _running:
+                return
+            _running.add(source)
+
+        app = _current_app()
+        if app is None:
+            with _state_lock:
+                _running.discard(source)
+            return
+
+        def run():
+            while True:
+                with _state_lock:
+                    if source not in _dirty:
+                        _running.discard(source)
+                        return
+                    _dirty.discard(source)
+                try:
+                    with app.app_context():
+                        cls.drain(source)
+                except Exception as e:
+                    logger.error(f'Webhook inbox drain failed for {source}: {e}')
+
+        threading.Thread(target=run, name=f'webhook-inbox-{source}', daemon=True).start()
+
+    @classmethod
+    def drain(cls, source: str, limit: int = None) -> Optional[Dict[str, int]]:
+        """Apply pending events for a source; None if another consumer holds the lease"""
+        lease = Lease(f'webhook_inbox:lock:{source}', cls.LOCK_TTL)
+        if not lease.acquire():
+            return None
+        lost = threading.Event()
+
+        def renew():
+            if not lease.renew():
+                lost.set()
+
+        heartbeat = _Heartbeat(f'webhook-inbox-lease-{source}', cls.LOCK_TTL / 3, renew).start()
+        try:
+            if source in BATCH_HANDLERS:
+                return cls._drain_batches(source, limit or cls.BATCH_SIZE, lost)
+            return cls._drain_locked(source, limit or cls.BATCH_SIZE, lost)
+        finally:
+            heartbeat.stop()
+            lease.release()
+
+    @classmethod
+    def _drain_locked(cls, source: str, limit: int, lost: threading.Event) -> Dict[str, int]:
+        from app import db
+        from models import WebhookInboxEvent
+
+        handler = _resolve_handler(HANDLERS[source])
+        events = WebhookInboxEvent.query.filter_by(source=source, status='pending').order_by(
+            WebhookInboxEvent.event_created.asc(), WebhookInboxEvent.id.asc()
+        ).limit(limit).all()
+
+        counts = {'processed': 0, 'retrying': 0, 'failed': 0, 'deferred': 0}
+        blocked = set()
+        for event in events:
+            if lost.is_set():
+                # Another consumer may own the source now; leave the rest to it
+                logger.warning(f'Webhook inbox lease for {source} lost, stopping drain')
+                break
+            # Keep per-key order: nothing after a failed event for that key runs this pass
+            if event.ordering_key and event.ordering_key in blocked:
+                counts['deferred'] += 1
+                continue
+            event_id = event.id
+            try:
+                # Marked in the same transaction the handler commits, so an
+                # event is applied and recorded as applied atomically
+                event.status = 'processed'
+                event.processed_at = datetime.utcnow()
+                event.error = None
+                handler(json.loads(event.payload))
+                db.session.commit()
+                counts['processed'] += 1
+            except Exception as e:
+                db.session.rollback()
+                event = WebhookInboxEvent.query.get(event_id)
+                event.attempts = (event.attempts or 0) + 1
+                event.error = str(e)[:2000]
+                event.processed_at = None
+                if event.attempts >= cls.MAX_ATTEMPTS:
+                    event.status = 'failed'
+                    counts['failed'] += 1
+                    logger.error(f'Webhook event {source}:{event.external_id} failed permanently: {e}')
+                else:
+                    event.status = 'pending'
+                    counts['retrying'] += 1
+                    if event.ordering_key:
+                        blocked.add(event.ordering_key)
+                    logger.warning(f'Webhook event {source}:{event.external_id} failed (attempt {event.attempts}): {e}')
+                db.session.commit()
+        return counts
+
+    @classmethod
+    def _drain_batches(cls, source: str, limit: int, lost: threading.Event,
+                       max_batches: int = 20) -> Dict[str, int]:
+        from app import db
+        from models import WebhookInboxEvent
+
+        handler = _resolve_handler(BATCH_HANDLERS[source])
+        counts = {'processed': 0, 'retrying': 0, 'failed': 0, 'deferred': 0, 'batches': 0}
+        for _ in range(max_batches):
+            if lost.is_set():
+                logger.warning(f'Webhook inbox lease for {source} lost, stopping drain')
+                break
+            events = WebhookInboxEvent.query.filter_by(source=source, status='pending').order_by(
+                WebhookInboxEvent.event_created.asc(), WebhookInboxEvent.id.asc()
+            ).limit(limit).all()
+            if not events:
+                break
+
+            payloads, applied = [], []
+            for event in events:
+                try:
+                    payloads.append(json.loads(event.payload))
+                    applied.append(event.id)
+                except ValueError as e:
+                    event.status = 'failed'
+                    event.error = f'invalid payload: {e}'
+                    event.processed_at = datetime.utcnow()
+                    counts['failed'] += 1
+            db.session.commit()
+
+            try:
+                handler(payloads)
+            except Exception as e:
+                # Nothing is lost: the batch goes back to pending and is
+                # retried (handlers dedupe what was already applied)
+                db.session.rollback()
+                logger.error(f'Webhook batch handler for {source} failed: {e}')
+                for event in WebhookInboxEvent.query.filter(WebhookInboxEvent.id.in_(applied)):
+                    event.attempts = (event.attempts or 0) + 1
+                    event.error = str(e)[:2000]
+                    if event.attempts >= cls.MAX_ATTEMPTS:
+                        event.status = 'failed'
+                        counts['failed'] += 1
+                    else:
+                        event.status = 'pending'
+                        counts['retrying'] += 1
+                db.session.commit()
+                break
+
+            now = datetime.utcnow()
+            WebhookInboxEvent.query.filter(WebhookInboxEvent.id.in_(applied)).update(
+                {'status': 'processed', 'processed_at': now, 'error': None}, synchronize_session=False
+            )
+            db.session.commit()
+            counts['processed'] += len(applied)
+            counts['batches'] += 1
+            if len(events) < limit:
+                break
+        return counts
+
+    @classmethod
+    def purge(cls, days: int = None) -> int:
+        """Delete processed events older than the retention window"""
+        from app import db
+        from models import WebhookInboxEvent
+
+        cutoff = datetime.utcnow() - timedelta(days=days or cls.RETENTION_DAYS)
+        deleted = WebhookInboxEvent.query.filter(
+            WebhookInboxEvent.status == 'processed',
+            WebhookInboxEvent.received_at < cutoff
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+    @classmethod
+    def stats(cls) -> Dict[str, Dict[str, int]]:
+        """Event counts per source and status"""
+        from app import db
+        from models import WebhookInboxEvent
+
+        rows = db.session.query(
+            WebhookInboxEvent.source, WebhookInboxEvent.status, db.func.count(WebhookInboxEvent.id)
+        ).group_by(WebhookInboxEvent.source, WebhookInboxEvent.status).all()
+        result: Dict[str, Dict[str, int]] = {}
+        for source, status, count in rows:
+            result.setdefault(source, {})[status] = count
+        return result
+
+
+def _resolve_handler(path: str) -> Callable:
+    module_name, func_name = path.split(':')
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def _current_app():
+    try:
+        from flask import current_app
+        return current_app._get_current_object()
+    except RuntimeError:
+        return None
@@ -0,0 +1,211 @@
+"""
+Widget Prefetcher - Scheduled refresh of third-party feed widgets
+News, Bloomberg headlines, YouTube Shorts and MIA alerts are fetched in the
+background into the shared cache; page renders only ever read the last good
+snapshot, so a slow or failing provider never holds up the feed
+"""
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from utils.cache_service import CacheService, get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def _fetch_news():
+    from utils.news_aggregator import get_medical_investment_news
+    return get_medical_investment_news(limit=15)
+
+
+def _fetch_bloomberg():
+    from utils.news_aggregator import get_bloomberg_headlines
+    return get_bloomberg_headlines(limit=10)
+
+
+def _fetch_youtube_shorts():
+    from utils.youtube_live import get_channel_shorts
+    return get_channel_shorts(max_results=6)
+
+
+def _fetch_mia():
+    from utils.mia_client import fetch_mia_signals
+    return fetch_mia_signals(limit=10)
+
+
+# name -> (fetcher, refresh interval in seconds)
+SOURCES: Dict[str, tuple] = {
+    'news': (_fetch_news, 600),
+    'bloomberg': (_fetch_bloomberg, 600),
+    'youtube_shorts': (_fetch_youtube_shorts, 1800),
+    'mia': (_fetch_mia, 300),
+}
+
+_in_flight = set()
+_in_flight_lock = threading.Lock()
+
+
+class WidgetPrefetcher:
+    """Last-good snapshots of external widget sources with freshness metadata"""
+
+    PREFIX = 'widgets:'
+    SNAPSHOT_TTL = 7 * 86400   # keep serving the last good data through long outages
+    LOCK_TTL = 120             # one refresh per source across workers
+
+    # =========================================================================
+    # READ PATH (never blocks on the network)
+    # =========================================================================
+
+    @classmethod
+    def get(cls, name: str, limit: int = None) -> List[Dict[str, Any]]:
+        """Last good items for a source; schedules a background refresh when stale"""
+        snapshot = CacheService.get(cls._snapshot_key(name))
+        fetched_at = snapshot.get('fetched_at') if snapshot else None
+        if fetched_at is None or time.time() - fetched_at > SOURCES[name][1]:
+            cls.refresh_async(name)
+        items = snapshot.get('items', []) if snapshot else []
+        return items[:limit] if limit else items
+
+    @classmethod
+    def status(cls) -> Dict[str, Dict[str, Any]]:
+        """Freshness and health per source, for admin/monitoring"""
+        now = time.time()
+        result = {}
+        for name, (_, interval) in SOURCES.items():
+            snapshot = CacheService.get(cls._snapshot_key(name)) or {}
+            meta = CacheService.get(cls._meta_key(name)) or {}
+            fetched_at = snapshot.get('fetched_at')
+            age = round(now - fetched_at, 1) if fetched_at else None
+            result[name] = {
+                'items': len(snapshot.get('items', [])),
+                'fetched_at': fetched_at,
+                'age_seconds': age,
+                'interval_seconds': interval,
+                'stale': age is None or age > interval,
+                'last_attempt_at': meta.get('last_attempt_at'),
+                'last_duration_ms': meta.get('last_duration_ms'),
+                'last_error': meta.get('last_error'),
+                'consecutive_failures': meta.get('consecutive_failures', 0),
+            }
+        return result
+
+    # =========================================================================
+    # REFRESH
+    # =========================================================================
+
+    @classmethod
+    def refresh(cls, name: str) -> bool:
+        """Fetch one source now; the snapshot is only replaced on success"""
+        fetcher, _ = SOURCES[name]
+        meta = CacheService.get(cls._meta_key(name)) or {}
+        started = time.time()
+        error = None
+        items = None
+        try:
+            items = fetcher()
+        except Exception as e:
+            error = str(e)[:300]
+
+        if error is None and not items:
+            # Providers swallow their own errors and return []; don't wipe good data
+            error = 'empty response'
+
+        meta['last_attempt_at'] = started
+        meta['last_duration_ms'] = round((time.time() - started) * 1000)
+        if error is None:
+            CacheService.set(cls._snapshot_key(name),
+                             {'items': items, 'fetched_at': time.time()},
+                             ttl=cls.SNAPSHOT_TTL)
+            meta['last_error'] = None
+            meta['consecutive_failures'] = 0
+        else:
+            meta['last_error'] = error
+            meta['consecutive_failures'] = meta.get('consecutive_failures', 0) + 1
+            logger.warning(f'Widget refresh failed for {name}: {error}')
+        CacheService.set(cls._meta_key(name), meta, ttl=cls.SNAPSHOT_TTL)
+        return error is None
+
+    @classmethod
+    def refresh_all(cls, only_stale: bool = False) -> Dict[str, bool]:
+        """Refresh sources concurrently (scheduled job entry point)"""
+        from flask import current_app
+        app = current_app._get_current_object()
+
+        names = list(SOURCES)
+        if only_stale:
+            status = cls.status()
+            names = [n for n in names if status[n]['stale']]
+
+        def run(name):
+            with app.app_context():
+                return cls._refresh_locked(name)
+
+        if not names:
+            return {}
+        with ThreadPoolExecutor(max_workers=len(names)) as executor:
+            return dict(zip(names, executor.map(run, names)))
+
+    @classmethod
+    def refresh_async(cls, name: str):
+        """Refresh a source on a daemon thread, at most once at a time per process"""
+        with _in_flight_lock:
+            if name in _in_flight:
+                return
+            _in_flight.add(name)
+
+        app = _current_app()
+        if app is None:
+            with _in_flight_lock:
+                _in_flight.discard(name)
+            return
+
+        def run():
+            try:
+                with app.app_context():
+                    cls._refresh_locked(name)
+            finally:
+                with _in_flight_lock:
+                    _in_flight.discard(name)
+
+        threading.Thread(target=run, name=f'widget-refresh-{name}', daemon=True).start()
+
+    @classmethod
+    def _refresh_locked(cls, name: str) -> Optional[bool]:
+        """Refresh unless another worker holds the source's refresh lock"""
+        client = get_redis_client()
+        lock_key = f'{cls.PREFIX}lock:{name}'
+        token = f'{os.getpid()}:{threading.get_ident()}'
+        if client:
+            try:
+                if not client.set(lock_key, token, nx=True, ex=cls.LOCK_TTL):
+                    return None
+            except Exception:
+                client = None
+        try:
+            return cls.refresh(name)
+        finally:
+            if client:
+                try:
+                    if client.get(lock_key) == token:
+                        client.delete(lock_key)
+                except Exception:
+                    pass
+
+    @classmethod
+    def _snapshot_key(cls, name: str) -> str:
+        return f'{cls.PREFIX}{name}'
+
+    @classmethod
+    def _meta_key(cls, name: str) -> str:
+        return f'{cls.PREFIX}meta:{name}'
+
+
+def _current_app():
+    try:
+        from flask import current_app
+        return current_app._get_current_object()
+    except RuntimeError:
+        return None
@@ -1,30 +1,146 @@
-"""Simple DB-backed worker for AI jobs.
+"""Concurrent DB-backed worker for AI jobs.
+
+Each worker leases batches of queued jobs (FOR UPDATE SKIP LOCKED, so any
+number of workers on any number of nodes can run side by side), runs them on
+a thread pool, renews the leases while they run and requeues jobs whose
+lease lapsed because their worker died. Idle workers block on a Redis wakeup
+signal pushed by enqueue_ai_job instead of polling; without Redis they poll.
+SIGTERM/SIGINT stop claiming, let running jobs finish for a grace period and
+hand any still running back to the queue.
 
 Usage:
-  python worker.py
+  python worker.py [--concurrency N]
 
 Environment:
   DATABASE_URL - same as app
   OPENAI_API_KEY - enable OpenAI calls
+  REDIS_URL - enable wakeup signals (optional)
+  AI_WORKER_CONCURRENCY - jobs run in parallel per worker (default 4)
+  AI_WORKER_POLL_SECONDS - max idle wait between queue checks (default 5)
+  AI_WORKER_SHUTDOWN_GRACE - seconds to wait for running jobs on shutdown (default 60)
 """
 
+import os
+import sys
 import time
+import signal
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 from app import app
-from ai_jobs import claim_next_job, process_job
+from ai_jobs import (
+    AI_JOB_VISIBILITY_TIMEOUT_SECONDS,
+    claim_jobs,
+    default_worker_id,
+    extend_leases,
+    process_job,
+    release_jobs,
+    requeue_stale_jobs,
+    wait_for_jobs,
+)
+
+logger = logging.getLogger(__name__)
+
+REAP_INTERVAL_SECONDS = 30
+
+
+class AiWorker:
+    """Claim, run and heartbeat AI jobs until asked to stop."""
+
+    def __init__(self, concurrency: int = 4, poll_seconds: float = 5.0, shutdown_grace: float = 60.0):
+        self.concurrency = max(1, concurrency)
+        self.poll_seconds = poll_seconds
+        self.shutdown_grace = shutdown_grace
+        self.worker_id = default_worker_id()
+        self.stop_event = threading.Event()
+        self._in_flight = {}  # future -> job_id
+        self._last_heartbeat = 0.0
+        self._last_reap = 0.0
+
+    def stop(self, *_):
+        if not self.stop_event.is_set():
+            logger.info(f"Worker {self.worker_id} shutting down...")
+        self.stop_event.set()
+
+    def run(self):
+        logger.info(f"Worker {self.worker_id} started with concurrency {self.concurrency}")
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="ai-job")
+        try:
+            while not self.stop_event.is_set():
+                self._maintenance()
+                free = self.concurrency - len(self._in_flight)
+                if free > 0:
+                    with app.app_context():
+                        job_ids = claim_jobs(free, self.worker_id)
+                    for job_id in job_ids:
+                        future = executor.submit(self._run_job, job_id)
+                        self._in_flight[future] = job_id
+                    if len(job_ids) == free:
+                        continue  # more may be waiting
+                    if not self._in_flight:
+                        wait_for_jobs(self.poll_seconds)
+                        continue
+                # Busy: wake when a slot frees up (or to heartbeat)
+                done, _ = wait(list(self._in_flight), timeout=self.poll_seconds, return_when=FIRST_COMPLETED)
+                self._collect(done)
+        finally:
+            self._drain()
+            executor.shutdown(wait=False)
+
+    def _run_job(self, job_id: int):
+        try:
+            process_job(job_id, worker_id=self.worker_id)
+        except Exception as e:
+            logger.error(f"AI job {job_id} crashed: {e}")
+
+    def _collect(self, done):
+        for future in done:
+            self._in_flight.pop(future, None)
+
+    def _maintenance(self):
+        self._collect([f for f in self._in_flight if f.done()])
+        now = time.monotonic()
+        if self._in_flight and now - self._last_heartbeat >= AI_JOB_VISIBILITY_TIMEOUT_SECONDS / 3:
+            with app.app_context():
+                extend_leases(list(self._in_flight.values()), self.worker_id)
+            self._last_heartbeat = now
+        if now - self._last_reap >= REAP_INTERVAL_SECONDS:
+            with app.app_context():
+                requeue_stale_jobs()
+            self._last_reap = now
 
+    def _drain(self):
+        """Let running jobs finish within the grace period, then release the rest."""
+        if not self._in_flight:
+            return
+        logger.info(f"Waiting up to {self.shutdown_grace:.0f}s for {len(self._in_flight)} running jobs")
+        done, pending = wait(list(self._in_flight), timeout=self.shutdown_grace)
+        self._collect(done)
+        if pending:
+            with app.app_context():
+                released = release_jobs(list(self._in_flight.values()), self.worker_id)
+            logger.warning(f"Released {released} unfinished jobs back to the queue")
+            # Abandoned threads would otherwise hold the interpreter open
+            logging.shutdown()
+            os._exit(0)
 
-def main(poll_seconds: float = 1.0):
-    with app.app_context():
-        pass
 
-    while True:
-        job = claim_next_job()
-        if not job:
-            time.sleep(poll_seconds)
-            continue
-        process_job(job.id)
+def main(concurrency: int = None, poll_seconds: float = None):
+    worker = AiWorker(
+        concurrency=concurrency or int(os.environ.get("AI_WORKER_CONCURRENCY", "4")),
+        poll_seconds=poll_seconds or float(os.environ.get("AI_WORKER_POLL_SECONDS", "5")),
+        shutdown_grace=float(os.environ.get("AI_WORKER_SHUTDOWN_GRACE", "60")),
+    )
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
 
 
 if __name__ == "__main__":
-    main()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="Run AI jobs")
+    parser.add_argument("--concurrency", type=int, default=None)
+    args = parser.parse_args(sys.argv[1:])
+    main(concurrency=args.concurrency)